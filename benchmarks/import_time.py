@@ -0,0 +1,75 @@
+"""
+启动耗时基准测试
+
+在全新的子进程中导入 GUI / CLI 启动路径上的模块，报告导入耗时，并检查重量级依赖
+没有被提前加载。超出预算或提前加载了重量级依赖时返回非零退出码，可接入 CI。
+
+用法：
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --budget-ms 200 --repeat 10
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 启动路径上的模块（gui.worker 需要 PyQt6，未安装时跳过）
+TARGETS = ["config", "core", "core.pipeline", "gui.worker"]
+
+# 这些依赖只应在真正执行对应阶段时才导入
+HEAVY_MODULES = ["newspaper", "fuzzywuzzy", "bs4", "selenium", "openai", "requests", "lxml"]
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = (time.perf_counter() - start) * 1000
+loaded = [name for name in {heavy!r} if name in sys.modules]
+print(json.dumps({{"ms": elapsed, "loaded": loaded}}))
+"""
+
+
+def measure(module, repeat):
+    """多次在新进程中导入模块，返回最短耗时（毫秒）和被加载的重量级依赖"""
+    timings, loaded = [], []
+    for _ in range(repeat):
+        result = subprocess.run(
+            [sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY_MODULES)],
+            cwd=ROOT, capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            return None, result.stderr.strip().splitlines()[-1:]
+        data = json.loads(result.stdout.strip().splitlines()[-1])
+        timings.append(data["ms"])
+        loaded = data["loaded"]
+    return min(timings), loaded
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure startup import time")
+    parser.add_argument("--budget-ms", type=float, default=150.0, help="max import time per module (default: 150)")
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreter runs per module (default: 5)")
+    args = parser.parse_args(argv)
+    
+    failed = False
+    print(f"{'module':<16}{'best ms':>10}  heavy deps loaded")
+    for module in TARGETS:
+        best, loaded = measure(module, args.repeat)
+        if best is None:
+            print(f"{module:<16}{'skipped':>10}  {' '.join(loaded)}")
+            continue
+        
+        over_budget = best > args.budget_ms
+        failed = failed or over_budget or bool(loaded)
+        flag = "  ❌" if over_budget or loaded else ""
+        print(f"{module:<16}{best:>10.1f}  {', '.join(loaded) or '-'}{flag}")
+    
+    print("\n❌ Startup regression detected" if failed else "\n✅ Startup within budget")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
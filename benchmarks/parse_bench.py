@@ -0,0 +1,143 @@
+"""
+HTML 解析微基准测试
+
+对比三种方式解析搜索结果页和渲染后的文章页的耗时，并校验结果一致：
+    full   - 原实现：BeautifulSoup(html, 'html.parser') 构建完整文档树后查找
+    lxml   - core.parsing 的 lxml 后端
+    strain - core.parsing 的回退后端（html.parser + SoupStrainer，只构建需要的标签）
+
+默认使用合成页面（结构与真实结果页一致，并带有同等体量的内联脚本和样式）；
+也可以用 --pages 指定保存下来的真实页面目录，文件名以 baidu / google / bing / article 开头。
+
+用法：
+    python benchmarks/parse_bench.py
+    python benchmarks/parse_bench.py --pages captured/ --repeat 50
+"""
+import argparse
+import glob
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from core import parsing
+from standins import render_engine_page, make_article
+
+KINDS = ("baidu", "google", "bing", "article")
+
+
+def synthetic_pages(results=30, noise_kb=300):
+    """生成带有内联脚本、样式和大量无关节点的页面，体量接近真实结果页"""
+    rng = random.Random(0)
+    filler = "".join(
+        f'<div class="nav-item"><span data-id="{i}">{rng.random():.6f}</span><a href="#s{i}">item</a></div>'
+        for i in range(noise_kb * 8)
+    )
+    script = "<script>var state = " + "{'k': 'v'}, " * (noise_kb * 40) + "null;</script>"
+    style = "<style>" + ".c{color:red} " * (noise_kb * 40) + "</style>"
+
+    pages = {}
+    for engine in ("baidu", "google", "bing"):
+        links = [f"https://news{i % 7}.example.com/a/{i}.html" for i in range(results)]
+        page = render_engine_page(engine, links)
+        pages[engine] = page.replace("<html><body>", f"<html><head>{style}{script}</head><body>{filler}")
+
+    title, paragraphs = make_article("/article/0.html", 4000)
+    pages["article"] = (
+        f"<html><head><title>{title}</title>{style}{script}</head><body>{filler}"
+        f"<article><h1>{title}</h1>{''.join(f'<p>{p}</p>' for p in paragraphs)}</article></body></html>"
+    )
+    return pages
+
+
+def load_pages(directory):
+    """读取目录中保存的真实页面"""
+    pages = {}
+    for kind in KINDS:
+        for path in sorted(glob.glob(os.path.join(directory, f"{kind}*.html"))):
+            with open(path, encoding="utf-8", errors="replace") as f:
+                pages[os.path.basename(path)] = f.read()
+    return pages
+
+
+def full_tree(kind, html):
+    """原实现：完整 html.parser 文档树"""
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, "html.parser")
+    if kind == "baidu":
+        results = soup.find_all("div", class_="result") or soup.find_all("div", class_="c-container")
+        return [a.get("href") for a in (r.find("a") for r in results) if a and a.get("href")]
+    if kind == "google":
+        return [a["href"] for a in (d.find("a", href=True) for d in soup.find_all("div", class_="yuRUbf")) if a]
+    if kind == "bing":
+        return [a["href"] for a in (li.find("a", href=True) for li in soup.find_all("li", class_="b_algo")) if a]
+    title = next((e.get_text().strip() for e in (soup.find(t) for t in ("h1", "h2", "title"))
+                  if e and e.get_text().strip()), "")
+    text = "\n".join(p.get_text(strip=True) for p in soup.find_all("p"))
+    return title, " ".join(text.split())
+
+
+def targeted(kind, html):
+    """core.parsing 的解析函数"""
+    if kind == "baidu":
+        return parsing.parse_baidu_results(html)
+    if kind == "google":
+        return parsing.parse_google_results(html)
+    if kind == "bing":
+        return parsing.parse_bing_results(html)
+    return parsing.extract_article(html)
+
+
+def timed(fn, kind, html, repeat):
+    """返回最短单次耗时（毫秒）和结果"""
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(kind, html)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare HTML parsing backends on result and article pages")
+    parser.add_argument("--pages", help="directory of captured pages (baidu*/google*/bing*/article*.html)")
+    parser.add_argument("--repeat", type=int, default=20, help="runs per page, best time is reported (default: 20)")
+    args = parser.parse_args(argv)
+
+    pages = load_pages(args.pages) if args.pages else synthetic_pages()
+    if not pages:
+        print(f"No pages found in {args.pages}")
+        return 1
+
+    has_lxml = parsing.backend() == "lxml"
+    print(f"{'page':<20}{'KB':>8}{'full ms':>10}{'lxml ms':>10}{'strain ms':>11}{'speedup':>9}  same")
+    mismatched = False
+    for name, html in pages.items():
+        kind = next(k for k in KINDS if name.startswith(k))
+        full_ms, expected = timed(full_tree, kind, html, args.repeat)
+
+        lxml_ms, lxml_result = timed(targeted, kind, html, args.repeat) if has_lxml else (None, expected)
+        saved, parsing._lxml_html = parsing._lxml_html, False
+        try:
+            strain_ms, strain_result = timed(targeted, kind, html, args.repeat)
+        finally:
+            parsing._lxml_html = saved
+
+        same = all(result == expected for result in (lxml_result, strain_result))
+        mismatched = mismatched or not same
+        best = min(ms for ms in (lxml_ms, strain_ms) if ms is not None)
+        print(f"{name:<20}{len(html.encode('utf-8')) / 1024:>8.0f}{full_ms:>10.2f}"
+              f"{lxml_ms if lxml_ms is not None else float('nan'):>10.2f}{strain_ms:>11.2f}"
+              f"{full_ms / best:>8.1f}x  {'yes' if same else 'NO'}")
+
+    if not has_lxml:
+        print("\nlxml is not installed; only the SoupStrainer fallback was measured")
+    return 1 if mismatched else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,178 @@
+"""
+离线端到端吞吐基准测试
+
+启动本地替身服务（搜索引擎结果页、合成新闻站点、兼容 OpenAI 的接口），
+对每个规模 N 在全新的子进程中运行一次完整的 StreamingPipeline（搜索 → 爬取 → 去重 → Map → Reduce → 报告），
+报告吞吐（篇/秒）、各阶段单次操作的 p50/p95 耗时以及进程峰值内存。
+
+不访问任何外部网络，也不消耗 API 额度；缓存全部绕过，动态爬虫不启用。
+
+用法：
+    python benchmarks/pipeline_bench.py
+    python benchmarks/pipeline_bench.py --sizes 10,100,1000 --site-latency 0.3 --llm-latency 1.0 --llm-rps 20
+    python benchmarks/pipeline_bench.py --json bench.json
+    python benchmarks/pipeline_bench.py --sizes 100 --stories 10    # 通稿改写，检验事件聚类
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 表格中展示的单次操作耗时（span_summary 中的分组名）
+SPANS = [
+    ("crawl", "crawl"), ("map", 'llm{purpose="map"}'),
+    ("batch", 'llm{purpose="map_batch"}'), ("reduce", 'llm{purpose="reduce"}')
+]
+
+
+def run_child(size, engine_url):
+    """在子进程中运行一次流水线，最后一行输出 JSON 结果"""
+    sys.path.insert(0, ROOT)
+    from core.searcher import NewsSearcher
+    from core.reporter import ReportGenerator
+    from core.pipeline import StreamingPipeline, PipelineError
+
+    NewsSearcher.GOOGLE_URL = f"{engine_url}/google"
+    NewsSearcher.BAIDU_URL = f"{engine_url}/baidu"
+    NewsSearcher.BING_URL = f"{engine_url}/bing"
+    ReportGenerator.OUTPUT_DIR = os.path.join(os.environ["NEWS_CACHE_DIR"], "reports")
+
+    pipeline = StreamingPipeline("bench", size, use_dynamic=False, log=lambda message: None)
+    error, articles = None, 0
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        try:
+            data = pipeline.run()
+            pipeline.generate_report(data)
+            articles = len(data.get("sources", []))
+        except PipelineError as e:
+            error = str(e)
+    elapsed = time.perf_counter() - start
+
+    metrics = pipeline.metrics.to_dict()
+    counters = {}
+    for counter in metrics["counters"]:
+        counters[counter["name"]] = counters.get(counter["name"], 0) + counter["value"]
+    # ru_maxrss 在 Linux 上以 KB 为单位，在 macOS 上以字节为单位
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    print(json.dumps({
+        "size": size,
+        "articles": articles,
+        "seconds": round(elapsed, 3),
+        "articles_per_second": round(articles / elapsed, 2) if elapsed else 0.0,
+        "peak_rss_mb": round(peak_rss, 1),
+        "stages": metrics["stages"],
+        "spans": metrics["spans"],
+        "counters": counters,
+        "error": error
+    }, ensure_ascii=False))
+
+
+def measure(size, env):
+    """启动子进程测量一个规模，返回结果字典"""
+    result = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", str(size)],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        return {"size": size, "error": (result.stderr.strip().splitlines() or ["unknown error"])[-1]}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def format_row(result):
+    """格式化一行结果"""
+    if result.get("error") and not result.get("articles"):
+        return f"{result['size']:>6}  failed: {result['error']}"
+    cells = [
+        f"{result['size']:>6}",
+        f"{result['articles']:>8}",
+        f"{result['seconds']:>8.2f}",
+        f"{result['articles_per_second']:>8.2f}"
+    ]
+    for _, group in SPANS:
+        stats = result["spans"].get(group)
+        cells.append(f"{stats['p50']:>7.3f}/{stats['p95']:<7.3f}" if stats else f"{'-':>15}")
+    cells.append(f"{result.get('llm_served', 0):>9}")
+    cells.append(f"{result['peak_rss_mb']:>8.1f}")
+    return "  ".join(cells)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline end-to-end pipeline benchmark against local stand-ins")
+    parser.add_argument("--sizes", default="10,50,100,500,1000", help="comma separated article counts (default: 10,50,100,500,1000)")
+    parser.add_argument("--sites", type=int, default=8, help="number of synthetic news sites (default: 8)")
+    parser.add_argument("--site-latency", type=float, default=0.2, help="mean news page latency in seconds (default: 0.2)")
+    parser.add_argument("--page-size", type=int, default=3000, help="article body length in characters (default: 3000)")
+    parser.add_argument("--stories", type=int, default=0, help="serve rewrites of this many stories instead of distinct articles, 0 = all distinct (default: 0)")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="base chat completion latency in seconds (default: 0.5)")
+    parser.add_argument("--llm-per-token", type=float, default=0.0, help="extra latency per completion token (default: 0)")
+    parser.add_argument("--llm-rps", type=int, default=0, help="requests per second before returning 429, 0 = unlimited (default: 0)")
+    parser.add_argument("--json", help="write all results to this JSON file")
+    parser.add_argument("--child", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child is not None:
+        run_child(args.child, os.environ["BENCH_ENGINE_URL"])
+        return 0
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from standins import StandinServer, EngineHandler, NewsSiteHandler, LLMHandler
+
+    sites = [
+        StandinServer(NewsSiteHandler, latency=args.site_latency, size=args.page_size, stories=args.stories).start()
+        for _ in range(args.sites)
+    ]
+    engine = StandinServer(EngineHandler, sites=[site.url for site in sites], baidu_results=50).start()
+    llm = StandinServer(
+        LLMHandler, latency=args.llm_latency, per_token=args.llm_per_token, rps=args.llm_rps
+    ).start()
+
+    results = []
+    with tempfile.TemporaryDirectory() as cache_dir:
+        env = dict(
+            os.environ,
+            BENCH_ENGINE_URL=engine.url,
+            DEEPSEEK_BASE_URL=llm.url,
+            OPENAI_API_KEY="bench",
+            GOOGLE_COOKIE="bench=1",
+            NEWS_CACHE_DIR=cache_dir,
+            SUMMARY_CACHE_BYPASS="1",
+            CRAWL_CACHE_BYPASS="1",
+            SEARCH_CACHE_BYPASS="1",
+            METRICS_PROMETHEUS=""
+        )
+
+        print(f"{args.sites} sites @ {args.site_latency}s, {args.page_size} chars/page; "
+              f"LLM @ {args.llm_latency}s, rps limit {args.llm_rps or 'none'}\n")
+        print(f"{'N':>6}  {'articles':>8}  {'seconds':>8}  {'art/s':>8}  "
+              f"{'crawl p50/p95':>15}  {'map p50/p95':>15}  {'batch p50/p95':>15}  {'reduce p50/p95':>15}  "
+              f"{'LLM calls':>9}  {'peak MB':>8}")
+        for size in [int(value) for value in args.sizes.split(",") if value.strip()]:
+            served_before, rejected_before = llm.httpd.counts["served"], llm.httpd.counts["rejected"]
+            result = measure(size, env)
+            result["llm_served"] = llm.httpd.counts["served"] - served_before
+            result["llm_rejected"] = llm.httpd.counts["rejected"] - rejected_before
+            results.append(result)
+            print(format_row(result), flush=True)
+
+    for server in sites + [engine, llm]:
+        server.stop()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\nResults written to {args.json}")
+
+    return 1 if any(result.get("error") for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
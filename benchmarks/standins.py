@@ -0,0 +1,320 @@
+"""
+离线基准测试使用的本地替身服务
+
+- EngineHandler：仿照 Google（div.yuRUbf）、Bing（li.b_algo）、百度（div.result）结构的搜索结果页
+- NewsSiteHandler：合成新闻站点，延迟与页面大小可配置，同一路径总是返回相同内容
+- LLMHandler：兼容 OpenAI 的 chat/completions 接口，延迟与每秒请求数上限可配置，超限返回 429
+
+所有服务都只监听 127.0.0.1，端口由系统分配。
+"""
+import json
+import random
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+# 合成正文使用的词表（含常见虚词，便于正文抽取器识别段落）
+WORDS = (
+    "经济 市场 企业 政府 发布 数据 增长 下降 投资 技术 创新 政策 项目 城市 居民 "
+    "消费 出口 产业 科技 能源 交通 教育 医疗 环境 专家 表示 认为 指出 预计 报告 "
+    "会议 合作 发展 改革 服务 平台 用户 行业 规模 价格 资金 风险 研究 团队 "
+    "的 是 在 了 和 与 对 将 也 并 已经 目前 今年 去年 同比 持续 进一步"
+).split()
+
+# 合并总结请求的提示词（NewsAnalyzer.batch_prompt），捕获文章篇数
+BATCH_PROMPT = re.compile(r"请分别为以下 (\d+) 篇新闻文本")
+
+
+class StandinServer:
+    """在后台线程中运行的本地 HTTP 服务"""
+
+    def __init__(self, handler, **options):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.httpd.daemon_threads = True
+        self.httpd.request_queue_size = 128
+        self.httpd.options = options
+        self.httpd.lock = threading.Lock()
+        self.httpd.counts = {"served": 0, "rejected": 0}
+        self.httpd.window = []
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """替身服务的公共部分"""
+
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def options(self):
+        return self.server.options
+
+    def count(self, name):
+        with self.server.lock:
+            self.server.counts[name] += 1
+
+    def send_body(self, body, content_type="text/html; charset=utf-8", status=200, headers=None):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        try:
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # 客户端已取消请求
+
+    def log_message(self, format, *args):
+        pass
+
+
+def article_links(sites, engine, count):
+    """生成指向合成站点的链接，按站点轮转，每个引擎使用独立的路径前缀"""
+    return [f"{sites[i % len(sites)]}/{engine}/{i}.html" for i in range(count)]
+
+
+def render_engine_page(engine, links):
+    """按各引擎真实页面中被解析的结构生成结果页"""
+    if engine == "google":
+        items = "".join(
+            f'<div class="g"><div class="yuRUbf"><a href="{url}"><h3>结果 {i}</h3></a></div></div>'
+            for i, url in enumerate(links)
+        )
+        return f'<html><body><div id="search">{items}</div></body></html>'
+    if engine == "bing":
+        items = "".join(
+            f'<li class="b_algo"><h2><a href="{url}">结果 {i}</a></h2><p>摘要</p></li>'
+            for i, url in enumerate(links)
+        )
+        return f'<html><body><ol id="b_results">{items}</ol></body></html>'
+    items = "".join(
+        f'<div class="result c-container"><h3><a href="{url}">结果 {i}</a></h3></div>'
+        for i, url in enumerate(links)
+    )
+    return f'<html><body><div id="content_left">{items}</div></body></html>'
+
+
+class EngineHandler(_Handler):
+    """
+    搜索引擎替身：/google、/bing、/baidu
+
+    选项：sites（站点根地址列表）、baidu_results（百度每页结果数，百度 URL 不带数量参数）
+    """
+
+    def do_GET(self):
+        parsed = urlparse(self.path)
+        query = parse_qs(parsed.query)
+        engine = parsed.path.strip("/")
+        if engine == "google":
+            count = int(query.get("num", ["10"])[0])
+        elif engine == "bing":
+            count = int(query.get("count", ["20"])[0])
+        elif engine == "baidu":
+            count = self.options.get("baidu_results", 50)
+        else:
+            self.send_body("not found", status=404)
+            return
+
+        links = article_links(self.options["sites"], engine, count)
+        self.count("served")
+        self.send_body(render_engine_page(engine, links))
+
+
+def _word(rng):
+    """词表中的常用词与随机汉字词混合，保证不同文章之间不会被判为转载"""
+    if rng.random() < 0.4:
+        return rng.choice(WORDS)
+    return chr(rng.randint(0x4E00, 0x9FA5)) + chr(rng.randint(0x4E00, 0x9FA5))
+
+
+def make_article(path, size):
+    """根据路径生成确定性的合成文章，返回 (标题, 段落列表)"""
+    rng = random.Random(path)
+    title = "".join(_word(rng) for _ in range(6)) + "：" + "".join(_word(rng) for _ in range(4))
+    paragraphs, length = [], 0
+    while length < size:
+        sentences = [
+            "".join(_word(rng) for _ in range(rng.randint(8, 16))) + "。"
+            for _ in range(rng.randint(3, 6))
+        ]
+        paragraph = "".join(sentences)
+        paragraphs.append(paragraph)
+        length += len(paragraph)
+    return title, paragraphs
+
+
+def make_syndicated(path, stories, size):
+    """
+    模拟通稿改写：路径映射到 stories 个事件之一，各站点删去约四成句子、换掉标题并补写新内容，
+    正文相似度低于转载去重的阈值，但仍是同一事件
+    """
+    _, base = make_article(f"/story/{zlib.crc32(path.encode()) % stories}", size)
+    rng = random.Random(path)
+    title = "".join(_word(rng) for _ in range(6)) + "：" + "".join(_word(rng) for _ in range(4))
+    paragraphs = []
+    for paragraph in base:
+        kept = [sentence + "。" for sentence in paragraph.split("。") if sentence and rng.random() > 0.4]
+        if rng.random() < 0.3:
+            kept.append("".join(_word(rng) for _ in range(rng.randint(8, 16))) + "。")
+        if kept:
+            paragraphs.append("".join(kept))
+    return title, paragraphs
+
+
+class NewsSiteHandler(_Handler):
+    """
+    合成新闻站点
+
+    选项：latency（平均响应延迟，秒）、jitter（延迟抖动比例）、size（正文字数）、
+          stories（大于 0 时文章是这么多个事件的改写稿，见 make_syndicated）
+    """
+
+    def do_GET(self):
+        latency = self.options.get("latency", 0.0)
+        if latency:
+            jitter = self.options.get("jitter", 0.5)
+            time.sleep(latency * random.uniform(1 - jitter, 1 + jitter))
+
+        stories = self.options.get("stories", 0)
+        if stories:
+            title, paragraphs = make_syndicated(self.path, stories, self.options.get("size", 3000))
+        else:
+            title, paragraphs = make_article(self.path, self.options.get("size", 3000))
+        body = "".join(f"<p>{paragraph}</p>" for paragraph in paragraphs)
+        html = f"""<!DOCTYPE html>
+<html lang="zh-CN"><head><meta charset="utf-8"><title>{title}</title>
+<meta property="og:title" content="{title}">
+<meta name="description" content="{paragraphs[0][:80]}"></head>
+<body><header><nav><a href="/">首页</a> <a href="/news">新闻</a></nav></header>
+<article><h1>{title}</h1><div class="content">{body}</div></article>
+<footer>版权所有 合成新闻站点</footer></body></html>"""
+        self.count("served")
+        self.send_body(html)
+
+
+class LLMHandler(_Handler):
+    """
+    兼容 OpenAI 的 chat/completions 接口
+
+    选项：latency（每次请求的基础延迟，秒）、per_token（每个输出 token 的额外延迟，秒）、
+          rps（每秒允许的请求数，0 表示不限流）
+    """
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if not self.path.endswith("/chat/completions"):
+            self.send_body("not found", status=404)
+            return
+
+        if self._over_limit():
+            self.count("rejected")
+            error = {"error": {"message": "Rate limit reached", "type": "rate_limit_error"}}
+            self.send_body(json.dumps(error), "application/json", status=429, headers={"Retry-After": "1"})
+            return
+
+        prompt = "".join(message.get("content", "") for message in request.get("messages", []))
+        batch = BATCH_PROMPT.search(prompt)
+        if batch:
+            content = json.dumps({"articles": [
+                {"id": i + 1, "summary": "合成摘要内容。" * 12, "key_points": ["要点一", "要点二", "要点三"]}
+                for i in range(int(batch.group(1)))
+            ]}, ensure_ascii=False)
+        elif request.get("response_format", {}).get("type") == "json_object":
+            content = json.dumps({
+                "main_summary": "合成的综合摘要。" * 10,
+                "key_sub_themes": ["市场反应", "政策影响", "技术进展"],
+                "key_entities": ["企业A", "机构B", "城市C", "专家D", "平台E"],
+                "timeline": [{"date": "2025-11", "event": "合成事件", "source": ""}]
+            }, ensure_ascii=False)
+        else:
+            content = "摘要：" + "合成摘要内容。" * 12 + "\n关键点：\n1. 要点一\n2. 要点二\n3. 要点三"
+
+        completion_tokens = len(content) // 2
+        usage = {
+            "prompt_tokens": len(prompt) // 2,
+            "completion_tokens": completion_tokens,
+            "total_tokens": len(prompt) // 2 + completion_tokens
+        }
+        if request.get("stream"):
+            self._stream(request, content, usage)
+            return
+        time.sleep(self.options.get("latency", 0.0) + self.options.get("per_token", 0.0) * completion_tokens)
+
+        self.count("served")
+        response = {
+            "id": "chatcmpl-bench",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "bench"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": usage
+        }
+        self.send_body(json.dumps(response, ensure_ascii=False), "application/json")
+
+    def _stream(self, request, content, usage):
+        """以 SSE 分块输出（stream=True），按 per_token 延迟逐块发送；要求 include_usage 时最后附带 usage 分块"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def event(delta, finish_reason=None, usage=None):
+            chunk = {
+                "id": "chatcmpl-bench",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": request.get("model", "bench"),
+                "choices": [] if usage else [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            if usage:
+                chunk["usage"] = usage
+            self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        try:
+            time.sleep(self.options.get("latency", 0.0))
+            event({"role": "assistant", "content": ""})
+            for start in range(0, len(content), 8):
+                piece = content[start:start + 8]
+                time.sleep(self.options.get("per_token", 0.0) * len(piece) / 2)
+                event({"content": piece})
+            event({}, finish_reason="stop")
+            if request.get("stream_options", {}).get("include_usage"):
+                event({}, usage=usage)
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.count("served")
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # 客户端已取消请求
+
+    def _over_limit(self):
+        """滑动一秒窗口内的请求数是否超过 rps"""
+        rps = self.options.get("rps", 0)
+        if not rps:
+            return False
+        now = time.monotonic()
+        with self.server.lock:
+            window = self.server.window
+            window[:] = [t for t in window if now - t < 1.0]
+            if len(window) >= rps:
+                return True
+            window.append(now)
+            return False
@@ -0,0 +1,157 @@
+"""
+AI 新闻事件摘要生成器
+无界面批处理入口：从文件或标准输入读取关键词，并行生成报告
+
+用法：
+    python cli.py keywords.txt --workers 4
+    cat keywords.txt | python cli.py - --mode process
+    python cli.py keywords.txt --monitor    # 定期运行时只处理新出现的链接
+    python cli.py keywords.txt --source store    # 只用本地文章库中的文章，不联网搜索和爬取
+    python cli.py keywords.txt --progressive    # 实时输出模型生成的内容，报告预览随摘要完成更新
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from datetime import datetime
+from config import API_KEY
+
+
+def read_keywords(source):
+    """读取关键词（每行一个，忽略空行和 # 开头的注释）"""
+    if source == "-":
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(source, encoding="utf-8") as f:
+            lines = f.read().splitlines()
+    
+    keywords = []
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith("#") and line not in keywords:
+            keywords.append(line)
+    return keywords
+
+
+def run_keyword(keyword, max_links, timelimit, use_dynamic, output_dir, incremental=False, source="web",
+                progressive=False):
+    """
+    处理单个关键词（可在子进程中执行）
+    
+    Returns:
+        运行结果字典：keyword、status、report、articles、new_articles、error、seconds、stages、compression
+    """
+    from core.reporter import ReportGenerator
+    from core.pipeline import StreamingPipeline, PipelineError
+    
+    ReportGenerator.OUTPUT_DIR = output_dir
+    start = time.monotonic()
+    result = {"keyword": keyword, "status": "failed", "report": None, "articles": 0, "error": None}
+    pipeline = StreamingPipeline(
+        keyword, max_links, timelimit,
+        use_dynamic=use_dynamic,
+        log=lambda message: print(f"[{keyword}] {message}", flush=True),
+        incremental=incremental,
+        source=source,
+        progressive=progressive
+    )
+    
+    try:
+        data = pipeline.run()
+        result["report"] = pipeline.generate_report(data)
+        result["articles"] = len(data.get("sources", []))
+        result["new_articles"] = len(data.get("new_sources", data.get("sources", [])))
+        result["status"] = "ok"
+    except PipelineError as e:
+        result["error"] = str(e)
+    except Exception as e:
+        result["error"] = f"Exception: {str(e)}"
+    
+    result["seconds"] = round(time.monotonic() - start, 2)
+    result["stages"] = pipeline.metrics.stage_breakdown()
+    result["compression"] = pipeline.metrics.compression_summary()
+    return result
+
+
+def parse_args(argv=None):
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="Omnisight headless batch runner")
+    parser.add_argument("keywords", help="keyword file (one per line), or - to read from stdin")
+    parser.add_argument("--max-links", type=int, default=10, help="links to search per keyword (default: 10)")
+    parser.add_argument("--timelimit", choices=["a", "d", "w", "m", "y"], default="a", help="a = any time, or past d(ay) / w(eek) / m(onth) / y(ear)")
+    parser.add_argument("--workers", type=int, default=2, help="keywords processed in parallel (default: 2)")
+    parser.add_argument("--mode", choices=["thread", "process"], default="thread", help="run keywords in threads or separate processes")
+    parser.add_argument("--no-dynamic", action="store_true", help="disable the Selenium fallback crawler")
+    parser.add_argument("--source", choices=["web", "store", "both"], default="web", help="where articles come from: web search, the local article store only (no network), or stored articles topped up with web results")
+    parser.add_argument("--monitor", action="store_true", help="incremental mode: only crawl and summarize links not seen in earlier --monitor runs, then merge them into the previous analysis")
+    parser.add_argument("--progressive", action="store_true", help="stream model output into the log and write a report preview (sources and per-article summaries) that is updated in place when the analysis completes")
+    parser.add_argument("--output-dir", default="reports", help="directory for HTML reports and the run summary")
+    parser.add_argument("--summary", help="path of the JSON run summary (default: <output-dir>/run_summary_<timestamp>.json)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """主函数"""
+    args = parse_args(argv)
+    
+    if not API_KEY:
+        print("❌ Fatal Error: API Key not found. Set OPENAI_API_KEY in .env", file=sys.stderr)
+        return 2
+    
+    keywords = read_keywords(args.keywords)
+    if not keywords:
+        print("❌ No keywords to process", file=sys.stderr)
+        return 2
+    
+    started_at = datetime.now()
+    start = time.monotonic()
+    print(f"🚀 Processing {len(keywords)} keywords with {args.workers} {args.mode} workers...")
+    
+    executor_cls = ProcessPoolExecutor if args.mode == "process" else ThreadPoolExecutor
+    results = {}
+    with executor_cls(max_workers=max(1, args.workers)) as executor:
+        futures = {
+            executor.submit(
+                run_keyword, keyword, args.max_links, args.timelimit,
+                not args.no_dynamic, args.output_dir, args.monitor, args.source, args.progressive
+            ): keyword
+            for keyword in keywords
+        }
+        for future in as_completed(futures):
+            result = future.result()
+            results[result["keyword"]] = result
+            icon = "✅" if result["status"] == "ok" else "❌"
+            print(f"{icon} [{result['keyword']}] {result['report'] or result['error']} ({result['seconds']}s)")
+    
+    ordered = [results[keyword] for keyword in keywords]
+    succeeded = sum(1 for result in ordered if result["status"] == "ok")
+    summary = {
+        "started_at": started_at.isoformat(timespec="seconds"),
+        "finished_at": datetime.now().isoformat(timespec="seconds"),
+        "seconds": round(time.monotonic() - start, 2),
+        "mode": args.mode,
+        "monitor": args.monitor,
+        "source": args.source,
+        "workers": args.workers,
+        "succeeded": succeeded,
+        "failed": len(ordered) - succeeded,
+        "results": ordered
+    }
+    
+    summary_path = args.summary or os.path.join(
+        args.output_dir, f"run_summary_{started_at.strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    summary_dir = os.path.dirname(summary_path)
+    if summary_dir:
+        os.makedirs(summary_dir, exist_ok=True)
+    with open(summary_path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    
+    print(f"\n🎉 Done: {succeeded}/{len(ordered)} succeeded in {summary['seconds']}s. Summary: {summary_path}")
+    return 0 if succeeded == len(ordered) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
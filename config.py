@@ -2,21 +2,41 @@
 配置管理模块
 """
 import os
+import threading
 from dotenv import load_dotenv
-from openai import OpenAI
 
 # 加载环境变量
 load_dotenv()
 
 # API 配置
 API_KEY = os.getenv("OPENAI_API_KEY")
-API_BASE_URL = "https://api.deepseek.com"
+# 可通过 DEEPSEEK_BASE_URL 指向兼容 OpenAI 接口的代理或本地测试服务
+API_BASE_URL = os.getenv("DEEPSEEK_BASE_URL", "https://api.deepseek.com")
 
-# DeepSeek 客户端
-client = OpenAI(
-    api_key=API_KEY,
-    base_url=API_BASE_URL
-)
+# DeepSeek 客户端（首次使用时创建，进程内复用）
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """获取 DeepSeek 客户端（延迟导入 openai，避免拖慢启动）"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from openai import OpenAI
+                _client = OpenAI(
+                    api_key=API_KEY,
+                    base_url=API_BASE_URL
+                )
+    return _client
+
+
+def __getattr__(name):
+    """兼容旧代码的 `from config import client`"""
+    if name == "client":
+        return get_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # 搜索配置
 SEARCH_HEADERS = {
@@ -32,7 +52,91 @@ GOOGLE_COOKIE = os.getenv("GOOGLE_COOKIE", "").strip().replace('\n', '').replace
 
 # 去重配置
 SIMILARITY_THRESHOLD = 85  # 文章标题相似度阈值
+DEDUP_BODY_THRESHOLD = 0.6  # 正文相似度阈值（估计的 Jaccard 系数），用于识别改了标题的转载
+DEDUP_BODY_CHARS = 3000  # 参与正文比对的最大字数
+DEDUP_LSH_BANDS = 21  # LSH 分段数
+DEDUP_LSH_ROWS = 3  # 每段包含的签名位数（签名长度 = 分段数 × 位数）
+
+# 报道聚类配置（去重之后把报道同一子事件的文章归为一簇，只总结簇代表）
+CLUSTER_ENABLED = True
+CLUSTER_SIMILARITY = 0.5  # 与簇代表的 TF-IDF 余弦相似度不低于该值时并入该簇
+CLUSTER_BODY_CHARS = 3000  # 参与聚类的最大正文字数
+CLUSTER_HASH_DIMS = 1 << 14  # 特征哈希的维度
 
 # AI 配置
 AI_MODEL = "deepseek-chat"
 AI_TEMPERATURE = 0.3
+
+# 并发搜索配置
+SEARCH_CONCURRENT = True  # 是否同时请求 Google / 百度 / Bing
+SEARCH_DEADLINE = 20  # 并发搜索的全局截止时间（秒）
+
+# HTTP 连接池配置
+HTTP_POOL_HOSTS = 32  # 最多缓存多少个主机的连接池
+HTTP_POOL_MAXSIZE = 8  # 单个主机保持的最大连接数
+HTTP_MAX_RETRIES = 1  # 连接失败时的重试次数
+
+# 并发爬取配置
+CRAWL_MAX_WORKERS = 8  # 静态爬虫的全局并发数
+CRAWL_PER_HOST_LIMIT = 2  # 同一站点同时进行的请求数上限
+
+# 动态爬虫配置
+DYNAMIC_POOL_SIZE = 2  # 常驻 Chrome 实例数（同时也是动态爬取的并发数）
+DYNAMIC_DRIVER_MAX_PAGES = 30  # 单个 Chrome 实例处理多少页面后重建
+DYNAMIC_PAGE_LOAD_TIMEOUT = 30  # 页面加载超时（秒）
+DYNAMIC_READY_TIMEOUT = 10  # 等待页面就绪的上限（秒）
+DYNAMIC_READY_STABLE = 0.6  # 正文长度/网络请求保持不变多久视为就绪（秒）
+DYNAMIC_READY_POLL = 0.2  # 就绪检测的轮询间隔（秒）
+
+# LLM 调用配置
+MAP_MAX_WORKERS = 5  # Map 阶段同时进行的请求数
+LLM_MAX_RETRIES = 4  # 429 / 5xx / 网络错误时的重试次数
+LLM_BACKOFF_BASE = 1.0  # 退避基准时间（秒），按指数增长
+LLM_BACKOFF_MAX = 30.0  # 单次退避的最长时间（秒）
+
+# 缓存配置
+CACHE_DIR = os.getenv("NEWS_CACHE_DIR", ".cache")  # 缓存数据库所在目录
+SUMMARY_CACHE_ENABLED = os.getenv("SUMMARY_CACHE_BYPASS", "").lower() not in ("1", "true", "yes")
+SUMMARY_CACHE_MAX_MB = 50  # 摘要缓存大小上限，超出后按最近最少使用淘汰
+CRAWL_CACHE_ENABLED = os.getenv("CRAWL_CACHE_BYPASS", "").lower() not in ("1", "true", "yes")
+CRAWL_CACHE_TTL = 24 * 3600  # 爬取结果的有效期（秒），过期后带 ETag / Last-Modified 重新验证
+CRAWL_CACHE_NEGATIVE_TTL = 6 * 3600  # 失败结果（太短、被拦截）的有效期（秒），超时等暂时性失败不缓存
+CRAWL_CACHE_MAX_MB = 200  # 爬取缓存大小上限
+SEARCH_CACHE_ENABLED = os.getenv("SEARCH_CACHE_BYPASS", "").lower() not in ("1", "true", "yes")
+SEARCH_CACHE_TTL = 1800  # 搜索结果的有效期（秒），有效期内重复查询不再请求搜索引擎
+SEARCH_CACHE_MAX_MB = 20  # 搜索缓存大小上限
+MAP_INPUT_TOKEN_BUDGET = 1500  # Map 阶段每篇正文的 token 预算，超出时抽取最重要的句子
+MAP_BATCH_ENABLED = True  # 把多篇短文章合并到一次 Map 请求中
+MAP_BATCH_SHORT_TOKENS = 800  # 正文不超过该 token 数的文章才参与合并
+MAP_BATCH_TOKEN_BUDGET = 3000  # 单次合并请求的正文 token 预算
+MAP_BATCH_MAX_ARTICLES = 8  # 单次合并请求最多包含的文章数
+MAP_BATCH_WAIT = 2.0  # 流水线中短文章最多等待多久凑批（秒），超时后不满一批也立即提交
+REDUCE_TOKEN_BUDGET = 24000  # 单次 Reduce 请求的输入 token 预算，超出时分批整合
+
+# 流水线配置
+PIPELINE_QUEUE_SIZE = 8  # 爬取结果队列容量，Map 阶段跟不上时爬虫会暂停
+
+# 站点爬取策略路由配置
+ROUTER_ENABLED = os.getenv("CRAWL_ROUTER_BYPASS", "").lower() not in ("1", "true", "yes")
+ROUTER_MIN_TRIALS = 3  # 某种爬取方式在站点上至少尝试多少次后才参与路由判断
+ROUTER_MIN_SUCCESS = 0.2  # 成功率低于该值的爬取方式视为不可用
+ROUTER_LENGTH_RATIO = 2.0  # 两种方式都可用时，动态渲染的平均正文长度达到静态的该倍数则直接动态渲染（静态只取到片段）
+ROUTER_REPROBE = 0.1  # 被绕开或跳过的站点按该概率重新走完整流程（静态 → 动态）
+ROUTER_DECAY = 0.9  # 每次新结果之前旧统计的衰减系数，站点改版后能逐渐恢复
+ROUTER_MAX_MB = 5  # 站点统计数据库大小上限
+
+# 本地文章库配置
+ARTICLE_STORE_ENABLED = os.getenv("ARTICLE_STORE_BYPASS", "").lower() not in ("1", "true", "yes")
+ARTICLE_STORE_MAX_MB = 500  # 文章库大小上限，超出后按最近最少使用淘汰
+
+# 关键词监控配置（增量模式）
+MONITOR_MAX_MB = 200  # 监控状态数据库大小上限（保存已处理的文章和摘要）
+MONITOR_SEED_ARTICLES = 300  # 新文章只和最近这么多篇已总结的文章去重、聚类（更早的文章仍按链接跳过）
+
+# 流式输出与渐进式报告配置
+STREAM_LINE_CHARS = 60  # 流式输出转发到日志时，没有换行的长输出每隔多少字符断一行
+PREVIEW_REFRESH_INTERVAL = 2.0  # 渐进式报告预览的最短重写间隔（秒），预览页面按同样间隔自动刷新
+
+# 运行指标配置
+METRICS_ENABLED = True  # 每次运行在报告旁输出 <报告名>.metrics.json
+METRICS_PROMETHEUS = os.getenv("METRICS_PROMETHEUS", "").lower() in ("1", "true", "yes")  # 额外输出 Prometheus 文本格式
@@ -1,9 +1,28 @@
 """
 核心功能模块
+
+各模块在首次访问时才导入，避免 `import core` 就加载 newspaper3k、BeautifulSoup 等重量级依赖
 """
-from .searcher import NewsSearcher
-from .crawler import NewsCrawler
-from .analyzer import NewsAnalyzer
-from .reporter import ReportGenerator
+import importlib
+
+_EXPORTS = {
+    'NewsSearcher': '.searcher',
+    'NewsCrawler': '.crawler',
+    'NewsAnalyzer': '.analyzer',
+    'ReportGenerator': '.reporter',
+}
 
 __all__ = ['NewsSearcher', 'NewsCrawler', 'NewsAnalyzer', 'ReportGenerator']
+
+
+def __getattr__(name):
+    """按需导入导出的类"""
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,486 @@
+"""
+异步接口模块
+供异步 Web 服务嵌入：搜索、爬取、总结基于 httpx.AsyncClient 和 AsyncOpenAI，不为每个请求占用线程。
+同一个 AsyncSession 可以被多个关键词任务共享，站点并发和 DeepSeek 并发在所有任务间统一限制；
+取消 analyze_keyword 所在的任务时，其下所有未完成的请求会一并取消。
+
+示例：
+    async with AsyncSession() as session:
+        results = await asyncio.gather(*(analyze_keyword(k, session=session) for k in keywords))
+
+CPU 密集的解析（lxml、newspaper、SQLite 缓存）放到默认线程池执行；动态爬虫基于 Selenium，
+use_dynamic=True 时同样在线程池中运行，取消时无法中断正在渲染的页面。
+"""
+import asyncio
+import json
+import time
+from collections import defaultdict
+from core.searcher import NewsSearcher
+from core.crawler import NewsCrawler
+from core.analyzer import NewsAnalyzer
+from core.parsing import parse_baidu_results, parse_google_results, parse_google_redirects, parse_bing_results
+from core.dedup import NearDuplicateIndex
+from core.cluster import StoryClusters
+from core.cache import SearchCache, CrawlCache, SummaryCache
+from core.router import DomainRouter
+from core.store import ArticleStore
+from core.http_pool import HostLimiter
+from core.llm import LLM
+from core.metrics import Metrics, RunMetrics
+from core.pipeline import PipelineError
+from config import (
+    API_KEY, API_BASE_URL, AI_MODEL, AI_TEMPERATURE, SEARCH_HEADERS, SEARCH_DEADLINE,
+    HTTP_POOL_HOSTS, HTTP_POOL_MAXSIZE, CRAWL_PER_HOST_LIMIT, MAP_MAX_WORKERS,
+    LLM_MAX_RETRIES, REDUCE_TOKEN_BUDGET,
+    SEARCH_CACHE_ENABLED, SEARCH_CACHE_TTL,
+    CRAWL_CACHE_ENABLED, CRAWL_CACHE_TTL, CRAWL_CACHE_NEGATIVE_TTL,
+    SUMMARY_CACHE_ENABLED
+)
+
+# 各引擎的结果页解析函数
+ENGINE_PARSERS = {
+    "google": parse_google_results,
+    "baidu": parse_baidu_results,
+    "bing": parse_bing_results,
+}
+
+
+def _detect_encoding(content):
+    """服务器未声明编码时按内容猜测（与 HttpPool.decode 的行为一致）"""
+    from charset_normalizer import from_bytes
+    best = from_bytes(content).best()
+    return best.encoding if best else "utf-8"
+
+
+class AsyncSession:
+    """
+    异步客户端集合（HTTP 连接池 + DeepSeek 客户端 + 并发限制）
+
+    在同一个事件循环中创建和使用；用完后调用 aclose()，或作为 async with 上下文使用。
+    """
+
+    def __init__(self, per_host_limit=CRAWL_PER_HOST_LIMIT, llm_concurrency=MAP_MAX_WORKERS):
+        """
+        Args:
+            per_host_limit: 同一站点同时进行的请求数上限（所有关键词任务共享）
+            llm_concurrency: 同时进行的 DeepSeek 请求数上限（所有关键词任务共享）
+        """
+        import httpx
+        from openai import AsyncOpenAI
+
+        self.http = httpx.AsyncClient(
+            headers=SEARCH_HEADERS,
+            follow_redirects=True,
+            timeout=10,
+            limits=httpx.Limits(
+                max_connections=HTTP_POOL_HOSTS * HTTP_POOL_MAXSIZE,
+                max_keepalive_connections=HTTP_POOL_HOSTS
+            ),
+            default_encoding=_detect_encoding
+        )
+        # 关闭 SDK 内置重试，重试和全局限流暂停与同步接口共用 LLM 的逻辑
+        self.llm = AsyncOpenAI(api_key=API_KEY, base_url=API_BASE_URL, max_retries=0)
+        self._host_slots = defaultdict(lambda: asyncio.Semaphore(per_host_limit))
+        self._llm_slots = asyncio.Semaphore(llm_concurrency)
+
+    def host_slot(self, url):
+        """URL 所在站点的并发名额"""
+        return self._host_slots[HostLimiter.host_of(url)]
+
+    async def aclose(self):
+        """关闭连接"""
+        await self.http.aclose()
+        await self.llm.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+
+async def chat(session, prompt, temperature, purpose="llm", **kwargs):
+    """
+    异步版 LLM.chat：429 / 5xx 时退避重试，429 触发的全局暂停与同步调用共享
+
+    Raises:
+        重试耗尽或不可重试的错误时抛出原始异常
+    """
+    from openai import RateLimitError
+
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        remaining = LLM.pause_remaining()
+        if remaining > 0:
+            await asyncio.sleep(remaining)
+        try:
+            async with session._llm_slots:
+                with Metrics.span("llm", purpose=purpose) as span:
+                    response = await session.llm.chat.completions.create(
+                        model=AI_MODEL,
+                        messages=[{"role": "user", "content": prompt}],
+                        temperature=temperature,
+                        **kwargs
+                    )
+                    span["outcome"] = "ok"
+            LLM._record_usage(response, purpose)
+            return response.choices[0].message.content.strip()
+        except Exception as e:
+            if attempt >= LLM_MAX_RETRIES or not LLM._is_retryable(e):
+                raise
+
+            delay = LLM._backoff_delay(e, attempt)
+            if isinstance(e, RateLimitError):
+                LLM._pause(delay)
+            Metrics.incr("llm_retries", purpose=purpose, reason=LLM._describe(e))
+            print(f" [!] DeepSeek 请求失败（{LLM._describe(e)}），{delay:.1f}s 后第 {attempt + 1} 次重试...")
+            await asyncio.sleep(delay)
+
+
+async def search_engine(session, engine, keyword, count, timelimit='a', use_cache=True):
+    """请求单个搜索引擎，优先读取缓存，返回过滤后的链接"""
+    cache = SearchCache.default() if use_cache and SEARCH_CACHE_ENABLED else None
+    with Metrics.span("search", engine=engine) as span:
+        links = await asyncio.to_thread(cache.get, engine, keyword, timelimit, count, SEARCH_CACHE_TTL) if cache else None
+        span["outcome"] = "cache" if links is not None else "fetched"
+
+        if links is None:
+            links = await _fetch_engine(session, engine, keyword, count, timelimit)
+            if cache and links:
+                await asyncio.to_thread(cache.put, engine, keyword, timelimit, count, links)
+
+    Metrics.incr("search_results", len(links), engine=engine)
+    return links
+
+
+async def _fetch_engine(session, engine, keyword, count, timelimit):
+    """下载并解析结果页，失败时返回空列表"""
+    if engine == "baidu":
+        url = NewsSearcher.build_baidu_url(keyword, timelimit)
+    else:
+        url = getattr(NewsSearcher, f"build_{engine}_url")(keyword, count, timelimit)
+
+    try:
+        print(f"🔍 [{engine}] 正在搜索: {keyword}")
+        response = await session.http.get(
+            url, headers=NewsSearcher.engine_headers(engine), timeout=15 if engine == "google" else 10
+        )
+        if response.status_code != 200:
+            print(f"⚠️ {engine} 返回状态码: {response.status_code}")
+            return []
+        if engine != "google":
+            response.encoding = "utf-8"
+
+        candidates = await asyncio.to_thread(ENGINE_PARSERS[engine], response.text)
+        links = [url for url in candidates if NewsSearcher.accept_link(engine, url)]
+        if engine == "google" and not links:
+            candidates = await asyncio.to_thread(parse_google_redirects, response.text)
+            links = [url for url in candidates if NewsSearcher.accept_link(engine, url)]
+        return links[:count]
+    except Exception as e:
+        print(f"⚠️ {engine} 搜索失败: {e}")
+        return []
+
+
+async def search(session, keyword, max_results=10, timelimit='a', deadline=SEARCH_DEADLINE, use_cache=True):
+    """
+    同时请求各引擎，按 Google > 百度 > Bing 的优先级合并去重
+
+    超过 deadline 仍未返回的引擎会被取消，其结果丢弃。
+    """
+    engines = NewsSearcher.engine_plan(max_results)
+    tasks = [
+        asyncio.create_task(search_engine(session, engine, keyword, count, timelimit, use_cache))
+        for _, engine, count in engines
+    ]
+    try:
+        await asyncio.wait(tasks, timeout=deadline)
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    all_links, seen_urls = [], set()
+    for (name, _, _), task in zip(engines, tasks):
+        if not task.done() or task.cancelled() or task.exception():
+            print(f"   ⚠️ {name} 超过截止时间或失败，结果已丢弃")
+            continue
+        for url in task.result():
+            if len(all_links) >= max_results:
+                break
+            if url not in seen_urls and not any(domain in url for domain in NewsSearcher.BLOCKED_DOMAINS):
+                all_links.append(url)
+                seen_urls.add(url)
+    return all_links
+
+
+async def crawl(session, url, use_cache=True, use_dynamic=False):
+    """
+    爬取单篇文章：按站点历史选择方式，静态失败且启用动态爬虫时交给 DynamicCrawler
+
+    Returns:
+        文章字典，失败返回 None
+    """
+    if NewsCrawler.is_blocked_domain(url):
+        print(f" [!] 跳过黑名单网站: {url}")
+        return None
+
+    decision = await asyncio.to_thread(DomainRouter.route, url, use_dynamic)
+    if decision == DomainRouter.SKIP:
+        print(f" [!] 跳过历史上无法爬取的站点: {url}")
+        return None
+
+    article = None
+    if decision == DomainRouter.STATIC:
+        article = await crawl_static(session, url, use_cache)
+    if article is None and use_dynamic:
+        try:
+            from core.dynamic_crawler import DynamicCrawler
+        except ImportError:
+            return None
+        article = await asyncio.to_thread(DynamicCrawler.crawl_article, url)
+    return article
+
+
+async def crawl_static(session, url, use_cache=True):
+    """异步版 NewsCrawler.crawl_article（共享爬取缓存和站点统计）"""
+    start = time.perf_counter()
+    with Metrics.span("crawl", strategy="static", host=HostLimiter.host_of(url)) as span:
+        article = await _fetch_static(session, url, use_cache, span)
+    await asyncio.to_thread(DomainRouter.record, url, "static", span.get("outcome"), article, time.perf_counter() - start)
+    if span.get("outcome") == "ok":
+        await asyncio.to_thread(ArticleStore.save, article)
+    return article
+
+
+async def _fetch_static(session, url, use_cache, span):
+    """下载并解析文章，缓存规则与 NewsCrawler._fetch_article 相同"""
+    import httpx
+
+    cache = CrawlCache.default() if use_cache and CRAWL_CACHE_ENABLED else None
+    cached = await asyncio.to_thread(cache.lookup, url, "static") if cache else None
+    headers = None
+
+    if cached:
+        if cached["status"] != "ok" and cached["age"] < CRAWL_CACHE_NEGATIVE_TTL:
+            cache.record(True)
+            span["outcome"] = "cache"
+            return None
+        if cached["status"] == "ok":
+            if cached["age"] < CRAWL_CACHE_TTL:
+                cache.record(True)
+                span["outcome"] = "cache"
+                return NewsCrawler._cached_article(url, cached)
+            headers = NewsCrawler._conditional_headers(cached)
+
+    status, article, response = "failed", None, None
+    try:
+        print(f" [→] 正在爬取: {url}")
+        async with session.host_slot(url):
+            response = await session.http.get(url, headers=headers)
+
+        if response.status_code == 304 and cached:
+            await asyncio.to_thread(cache.touch, url, "static")
+            cache.record(True)
+            span["outcome"] = "not_modified"
+            return NewsCrawler._cached_article(url, cached)
+
+        Metrics.incr("crawl_bytes", len(response.content), strategy="static")
+        response.raise_for_status()
+        # 解码（可能需要猜测编码）和 newspaper 解析都比较耗 CPU，放到线程池
+        status, article = await asyncio.to_thread(lambda: NewsCrawler.parse_article(url, response.text))
+    except httpx.HTTPStatusError as e:
+        if e.response.status_code in NewsCrawler.BLOCKED_STATUS_CODES:
+            status = "blocked"
+        print(f" [!] 爬取失败: {url}")
+        print(f"     错误: {str(e)[:100]}")
+    except Exception as e:
+        print(f" [!] 爬取失败: {url}")
+        print(f"     错误: {str(e)[:100]}")
+
+    span["outcome"] = status
+    if cache:
+        cache.record(False)
+        validators = response.headers if response is not None and status == "ok" else {}
+        await asyncio.to_thread(
+            cache.store, url, "static", status, article,
+            validators.get("ETag"), validators.get("Last-Modified")
+        )
+    return article
+
+
+async def summarize(session, text, use_cache=True):
+    """异步版 NewsAnalyzer.summarize_article（共享摘要缓存）"""
+    cache = SummaryCache.default() if use_cache and SUMMARY_CACHE_ENABLED else None
+    if cache:
+        cached = await asyncio.to_thread(cache.get, text, NewsAnalyzer.SUMMARY_PROMPT_VERSION)
+        if cached is not None:
+            return cached
+
+    # 提示词构造包含抽取式压缩（纯 Python 计算），放到线程池中执行，不阻塞事件循环
+    prompt = await asyncio.to_thread(NewsAnalyzer.summary_prompt, text)
+    try:
+        summary = await chat(session, prompt, temperature=0.0, purpose="map")
+    except Exception as e:
+        print(f" [!] DeepSeek 摘要失败: {e}")
+        return "摘要生成失败..."
+
+    if cache:
+        await asyncio.to_thread(cache.put, text, NewsAnalyzer.SUMMARY_PROMPT_VERSION, summary)
+    return summary
+
+
+async def consolidate(session, summaries, keyword, token_budget=REDUCE_TOKEN_BUDGET):
+    """
+    异步版 NewsAnalyzer.consolidate_summaries：超出预算时分批并发整合，再逐层合并
+
+    Returns:
+        结构化数据字典，失败时返回错误信息字符串
+    """
+    async def reduce_batch(batch):
+        content = await chat(
+            session, NewsAnalyzer.reduce_prompt(batch, keyword),
+            temperature=AI_TEMPERATURE, purpose="reduce", response_format={"type": "json_object"}
+        )
+        return json.loads(content)
+
+    if LLM.estimate_tokens("\n---\n".join(summaries)) <= token_budget:
+        try:
+            return await reduce_batch(summaries)
+        except Exception as e:
+            return f"DeepSeek 最终整合失败：{str(e)}"
+
+    async def reduce_with_retry(batch):
+        # 与 NewsAnalyzer.consolidate_summaries 相同：失败的一批拆成两半重试，仍失败的部分本地拼接
+        try:
+            return [await reduce_batch(batch)]
+        except Exception as e:
+            print(f" [!] 分批整合失败（{len(batch)} 条摘要），拆成两半重试: {e}")
+        halves = NewsAnalyzer._halves(batch)
+        results = await asyncio.gather(*(reduce_batch(half) for half in halves), return_exceptions=True)
+        return [
+            NewsAnalyzer._fallback_partial(half, result) if isinstance(result, BaseException) else result
+            for half, result in zip(halves, results)
+        ]
+
+    batches = NewsAnalyzer._partition(summaries, token_budget)
+    print(f"🌲 [Reduce] 摘要超出预算，分 {len(batches)} 批并发整合...")
+    groups = await asyncio.gather(*(reduce_with_retry(batch) for batch in batches))
+    partials = [partial for group in groups for partial in group]
+    if all(partial.get("fallback") for partial in partials):
+        return "DeepSeek 最终整合失败：所有分批整合均失败"
+    for partial in partials:
+        partial.pop("fallback", None)
+
+    async def merge_group(group):
+        if len(group) == 1:
+            return json.loads(group[0])
+        try:
+            content = await chat(
+                session, NewsAnalyzer.merge_prompt(group, keyword),
+                temperature=AI_TEMPERATURE, purpose="merge", response_format={"type": "json_object"}
+            )
+            return json.loads(content)
+        except Exception as e:
+            print(f" [!] 合并失败，改为本地合并: {e}")
+            return NewsAnalyzer._merge_locally([json.loads(item) for item in group])
+
+    while len(partials) > 1:
+        serialized = [json.dumps(partial, ensure_ascii=False) for partial in partials]
+        groups = NewsAnalyzer._partition(serialized, token_budget)
+        if len(groups) == len(partials):
+            groups = [serialized[i:i + 2] for i in range(0, len(serialized), 2)]
+        print(f"🌲 [Reduce] 合并 {len(partials)} 份阶段性结果 → {len(groups)} 份...")
+        partials = await asyncio.gather(*(merge_group(group) for group in groups))
+    return partials[0]
+
+
+async def analyze_keyword(keyword, max_links=10, timelimit='a', session=None, use_dynamic=False, use_cache=True):
+    """
+    完整分析一个关键词：搜索 → 流式爬取 / 去重 / 总结 → 整合
+
+    Args:
+        keyword: 事件关键词
+        max_links: 搜索的链接数量
+        timelimit: 时间范围（a / d / w / m / y）
+        session: 共享的 AsyncSession；为 None 时临时创建并在结束时关闭
+        use_dynamic: 静态爬取失败时是否在线程池中运行动态爬虫
+        use_cache: 是否使用搜索、爬取和摘要缓存
+
+    Returns:
+        与 StreamingPipeline.run 相同的结构化数据（附带 sources 和 timings）
+
+    Raises:
+        PipelineError: 无法产出结果
+        asyncio.CancelledError: 任务被取消（所有子请求已取消）
+    """
+    owns_session = session is None
+    session = session or AsyncSession()
+    metrics = RunMetrics(keyword)
+    try:
+        with Metrics.activate(metrics):
+            data = await _analyze(session, keyword, max_links, timelimit, use_dynamic, use_cache)
+        data["timings"] = metrics.stage_breakdown()
+        return data
+    finally:
+        if owns_session:
+            await session.aclose()
+
+
+async def _analyze(session, keyword, max_links, timelimit, use_dynamic, use_cache):
+    """analyze_keyword 的主体（在指标上下文中调用）"""
+    with Metrics.stage("search"):
+        links = await search(session, keyword, max_links, timelimit, use_cache=use_cache)
+    if not links:
+        raise PipelineError("No news links found")
+
+    async def crawl_indexed(index):
+        return index, await crawl(session, links[index], use_cache, use_dynamic)
+
+    async def summarize_stage(article):
+        with Metrics.stage("map"):
+            return await summarize(session, article["text"], use_cache)
+
+    index = NearDuplicateIndex()
+    clusters = StoryClusters()
+    crawl_tasks = [asyncio.create_task(crawl_indexed(i)) for i in range(len(links))]
+    pending = []
+    crawled_count = 0
+    try:
+        # 每爬完一篇就去重并立即提交总结
+        with Metrics.stage("crawl"):
+            for next_done in asyncio.as_completed(crawl_tasks):
+                link_index, article = await next_done
+                if not article:
+                    continue
+                crawled_count += 1
+                with Metrics.stage("dedup"), Metrics.span("dedup"):
+                    duplicate = index.check_and_add(article)
+                if duplicate:
+                    continue
+                # 与已有事件簇代表足够相似的文章并入该簇，不再单独总结
+                cluster_id, is_new = clusters.assign(article)
+                if is_new:
+                    pending.append((link_index, article, cluster_id, asyncio.create_task(summarize_stage(article))))
+
+        pending.sort(key=lambda item: item[0])
+        summaries = await asyncio.gather(*(task for _, _, _, task in pending))
+    finally:
+        # 正常结束时这里都已完成；被取消或出错时取消所有未完成的子任务
+        children = crawl_tasks + [task for _, _, _, task in pending]
+        for task in children:
+            task.cancel()
+        await asyncio.gather(*children, return_exceptions=True)
+
+    if not crawled_count:
+        raise PipelineError(f"Failed to crawl articles. All {len(links)} links failed. Check if they are blocked domains or have anti-crawling protection.")
+    if not pending:
+        raise PipelineError("No articles after deduplication")
+
+    articles = [article for _, article, _, _ in pending]
+    members = [clusters.members[cluster_id] for _, _, cluster_id, _ in pending]
+    with Metrics.stage("reduce"):
+        data = await consolidate(session, NewsAnalyzer.label_summaries(articles, summaries, members), keyword)
+    if isinstance(data, str):
+        raise PipelineError(f"AI analysis failed: {data}")
+
+    data["sources"] = NewsAnalyzer.cluster_sources(articles, members)
+    return data
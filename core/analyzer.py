@@ -2,20 +2,37 @@
 AI 分析模块
 """
 import json
-from config import client, AI_MODEL, AI_TEMPERATURE
+from concurrent.futures import ThreadPoolExecutor
+from core.llm import LLM
+from core.compress import compress
+from core.cache import SummaryCache
+from core.cluster import StoryClusters
+from core.metrics import Metrics
+from config import (
+    AI_TEMPERATURE, MAP_MAX_WORKERS, SUMMARY_CACHE_ENABLED,
+    MAP_INPUT_TOKEN_BUDGET, REDUCE_TOKEN_BUDGET,
+    MAP_BATCH_ENABLED, MAP_BATCH_SHORT_TOKENS, MAP_BATCH_TOKEN_BUDGET, MAP_BATCH_MAX_ARTICLES
+)
 
 
 class NewsAnalyzer:
     """新闻分析器（基于 DeepSeek）"""
     
+    # 摘要提示词版本，修改 summarize_article 的提示词时需要同步更新，使旧缓存失效
+    SUMMARY_PROMPT_VERSION = "v2"
+    
     @staticmethod
-    def summarize_article(text):
-        """Map 阶段：总结单篇文章"""
-        prompt = f"""
+    def summary_prompt(text):
+        """Map 阶段的提示词（正文先抽取式压缩到 MAP_INPUT_TOKEN_BUDGET 以内）"""
+        compressed = compress(text, MAP_INPUT_TOKEN_BUDGET)
+        Metrics.incr("map_input_tokens", LLM.estimate_tokens(text))
+        Metrics.incr("map_compressed_tokens", LLM.estimate_tokens(compressed))
+        
+        return f"""
         请为以下新闻文本生成一个非常简洁的摘要（约100字）和3个关键点。
 
         文本：
-        {text[:4000]} 
+        {compressed} 
 
         输出：
         摘要：[此处为摘要]
@@ -24,24 +41,239 @@ class NewsAnalyzer:
         - [关键点2]
         - [关键点3]
         """
+    
+    @classmethod
+    def summarize_article(cls, text, use_cache=True, on_token=None):
+        """
+        Map 阶段：总结单篇文章
+        
+        Args:
+            text: 文章正文
+            use_cache: 是否使用摘要缓存（False 时强制重新生成）
+            on_token: 流式输出回调（见 LLM.chat），命中缓存时不调用
+        """
+        cache = SummaryCache.default() if use_cache and SUMMARY_CACHE_ENABLED else None
+        if cache:
+            cached = cache.get(text, cls.SUMMARY_PROMPT_VERSION)
+            if cached is not None:
+                return cached
+        
+        prompt = cls.summary_prompt(text)
         
         try:
-            response = client.chat.completions.create(
-                model=AI_MODEL,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.0
-            )
-            return response.choices[0].message.content.strip()
+            summary = LLM.chat(prompt, temperature=0.0, purpose="map", on_token=on_token)
         except Exception as e:
             print(f" [!] DeepSeek 摘要失败: {e}")
             return "摘要生成失败..."
+        
+        if cache:
+            cache.put(text, cls.SUMMARY_PROMPT_VERSION, summary)
+        return summary
+    
+    @staticmethod
+    def is_batchable(text):
+        """正文足够短、可以和其他文章合并到一次 Map 请求中"""
+        return MAP_BATCH_ENABLED and LLM.estimate_tokens(text) <= MAP_BATCH_SHORT_TOKENS
+    
+    @classmethod
+    def pack_batches(cls, texts, token_budget=MAP_BATCH_TOKEN_BUDGET, max_articles=MAP_BATCH_MAX_ARTICLES):
+        """
+        规划 Map 请求：短文章按 token 预算和篇数上限合并，其余文章单独请求
+        
+        Returns:
+            下标分组列表，例如 [[0], [1, 3, 4], [2]]
+        """
+        groups, batch, used = [], [], 0
+        for i, text in enumerate(texts):
+            if not cls.is_batchable(text):
+                groups.append([i])
+                continue
+            tokens = LLM.estimate_tokens(text)
+            if batch and (used + tokens > token_budget or len(batch) >= max_articles):
+                groups.append(batch)
+                batch, used = [], 0
+            batch.append(i)
+            used += tokens
+        if batch:
+            groups.append(batch)
+        return groups
+    
+    @staticmethod
+    def batch_prompt(texts):
+        """多篇文章合并总结的提示词（要求 JSON 输出，每篇一项）"""
+        articles = "\n\n".join(f"文章 {i + 1}：\n{text}" for i, text in enumerate(texts))
+        
+        return f"""
+        请分别为以下 {len(texts)} 篇新闻文本各生成一个非常简洁的摘要（约100字）和3个关键点。
+        你必须严格按 JSON 格式输出，不要包含 Markdown 标记，格式如下：
+        {{"articles": [{{"id": 1, "summary": "摘要", "key_points": ["关键点1", "关键点2", "关键点3"]}}]}}
+        每篇文章都必须输出一项，id 与输入中的文章编号一致，不要把不同文章的内容混在一起。
+
+        {articles}
+        """
+    
+    @staticmethod
+    def parse_batch(content, count):
+        """
+        解析合并请求的输出，转换为与单篇总结相同的文本格式
+        
+        Returns:
+            长度为 count 的列表，缺失或格式不对的文章为 None
+        """
+        summaries = [None] * count
+        try:
+            items = json.loads(content).get("articles", [])
+        except (ValueError, AttributeError):
+            return summaries
+        
+        for item in items if isinstance(items, list) else []:
+            if not isinstance(item, dict):
+                continue
+            try:
+                index = int(item.get("id")) - 1
+            except (TypeError, ValueError):
+                continue
+            summary, key_points = item.get("summary"), item.get("key_points")
+            if 0 <= index < count and isinstance(summary, str) and summary.strip() and isinstance(key_points, list):
+                points = "\n".join(f"- {point}" for point in key_points)
+                summaries[index] = f"摘要：{summary.strip()}\n关键点：\n{points}"
+        return summaries
+    
+    @classmethod
+    def summarize_batch(cls, texts, use_cache=True):
+        """
+        Map 阶段：在一次请求中总结多篇短文章
+        
+        已缓存的文章直接使用缓存；请求失败或输出中缺少某篇时，该篇退回单独总结。
+        
+        Returns:
+            与 texts 一一对应的摘要列表
+        """
+        cache = SummaryCache.default() if use_cache and SUMMARY_CACHE_ENABLED else None
+        summaries = [cache.get(text, cls.SUMMARY_PROMPT_VERSION) if cache else None for text in texts]
+        missing = [i for i, summary in enumerate(summaries) if summary is None]
+        
+        if len(missing) > 1:
+            compressed = [compress(texts[i], MAP_INPUT_TOKEN_BUDGET) for i in missing]
+            for i, text in zip(missing, compressed):
+                Metrics.incr("map_input_tokens", LLM.estimate_tokens(texts[i]))
+                Metrics.incr("map_compressed_tokens", LLM.estimate_tokens(text))
+            
+            try:
+                content = LLM.chat(
+                    cls.batch_prompt(compressed),
+                    temperature=0.0,
+                    purpose="map_batch",
+                    response_format={"type": "json_object"}
+                )
+                results = cls.parse_batch(content, len(missing))
+            except Exception as e:
+                print(f" [!] 合并总结失败，改为逐篇总结: {e}")
+                results = [None] * len(missing)
+            
+            Metrics.incr("map_batches")
+            Metrics.incr("map_batch_articles", len(missing))
+            for i, summary in zip(missing, results):
+                if summary is not None:
+                    summaries[i] = summary
+                    if cache:
+                        cache.put(texts[i], cls.SUMMARY_PROMPT_VERSION, summary)
+        
+        # 单篇未命中、或合并输出中缺失的文章逐篇总结
+        for i, summary in enumerate(summaries):
+            if summary is None:
+                if len(missing) > 1:
+                    Metrics.incr("map_batch_fallbacks")
+                summaries[i] = cls.summarize_article(texts[i], use_cache)
+        return summaries
+    
+    # Reduce 阶段输出的列表字段
+    LIST_FIELDS = ("key_sub_themes", "key_entities", "timeline")
+    
+    @classmethod
+    def consolidate_summaries(cls, summaries, keyword, token_budget=REDUCE_TOKEN_BUDGET, max_workers=MAP_MAX_WORKERS,
+                              on_token=None):
+        """
+        Reduce 阶段：整合所有摘要
+        
+        摘要总量不超过 token_budget 时一次整合；否则按预算分批并行整合为阶段性 JSON，
+        再逐层合并，每次请求携带的摘要内容都不超过预算。
+        
+        Args:
+            on_token: 流式输出回调（见 LLM.chat），分批整合时只用于最后一次合并，避免并行输出交错
+        """
+        if LLM.estimate_tokens("\n---\n".join(summaries)) <= token_budget:
+            try:
+                return cls._reduce_batch(summaries, keyword, on_token)
+            except Exception as e:
+                return f"DeepSeek 最终整合失败：{str(e)}"
+        
+        batches = cls._partition(summaries, token_budget)
+        print(f"🌲 [Reduce] 摘要超出预算，分 {len(batches)} 批并行整合...")
+        
+        def reduce_batch(batch):
+            try:
+                return [cls._reduce_batch(batch, keyword)]
+            except Exception as e:
+                print(f" [!] 分批整合失败（{len(batch)} 条摘要），拆成两半重试: {e}")
+            partials = []
+            for half in cls._halves(batch):
+                try:
+                    partials.append(cls._reduce_batch(half, keyword))
+                except Exception as e:
+                    partials.append(cls._fallback_partial(half, e))
+            return partials
+        
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            partials = [partial for group in executor.map(Metrics.bind(reduce_batch), batches) for partial in group]
+        
+        if all(partial.get("fallback") for partial in partials):
+            return "DeepSeek 最终整合失败：所有分批整合均失败"
+        for partial in partials:
+            partial.pop("fallback", None)
+        
+        return cls._merge_partials(partials, keyword, token_budget, max_workers, on_token)
+    
+    @staticmethod
+    def _halves(batch):
+        """把失败的一批摘要拆成两半重试（只有一条时不拆）"""
+        middle = len(batch) // 2
+        return [batch[:middle], batch[middle:]] if middle else [batch]
+    
+    @classmethod
+    def _fallback_partial(cls, summaries, error):
+        """
+        重试仍失败时，不经模型把这批摘要直接拼成阶段性结果，保证这些文章仍出现在整合结果中
+        
+        结果带 fallback 标记（合并前去掉），用于判断是否所有分批都没有经过模型整合。
+        """
+        print(f" [!] 重试仍失败，{len(summaries)} 条摘要改为本地拼接（不经模型整合）: {error}")
+        Metrics.incr("reduce_fallback_summaries", len(summaries))
+        partial = {"main_summary": "\n".join(summaries), "fallback": True}
+        partial.update({field: [] for field in cls.LIST_FIELDS})
+        return partial
+    
+    @staticmethod
+    def _partition(items, token_budget):
+        """按 token 预算把文本切分成若干批（单条超出预算时独占一批）"""
+        batches, current, used = [], [], 0
+        for item in items:
+            tokens = LLM.estimate_tokens(item)
+            if current and used + tokens > token_budget:
+                batches.append(current)
+                current, used = [], 0
+            current.append(item)
+            used += tokens
+        if current:
+            batches.append(current)
+        return batches
     
     @staticmethod
-    def consolidate_summaries(summaries, keyword):
-        """Reduce 阶段：整合所有摘要"""
+    def reduce_prompt(summaries, keyword):
+        """Reduce 阶段的提示词（要求 JSON 输出）"""
         context = "\n---\n".join(summaries)
         
-        prompt = f"""
+        return f"""
         基于以下关于「{keyword}」的 **摘要信息**，提取4类信息。
         你必须严格按 JSON 格式输出，不要包含 Markdown 标记。
 
@@ -56,39 +288,230 @@ class NewsAnalyzer:
         - 如果文章中没有明确日期，可以根据上下文推断大致时间
         - 当前时间是 2025年11月，不要生成2026年或更晚的日期
         - source 字段应该填写提到该事件的文章URL
+        - 如果摘要注明了同一事件的报道篇数，篇数越多说明该事件越受关注，应在主摘要和子主题中优先体现
 
         摘要信息输入：
         {context}
         """
+    
+    @staticmethod
+    def _reduce_batch(summaries, keyword, on_token=None):
+        """整合一批摘要，返回结构化数据"""
+        prompt = NewsAnalyzer.reduce_prompt(summaries, keyword)
         
-        try:
-            response = client.chat.completions.create(
-                model=AI_MODEL,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=AI_TEMPERATURE,
-                response_format={"type": "json_object"}
-            )
-            return json.loads(response.choices[0].message.content.strip())
-        except Exception as e:
-            return f"DeepSeek 最终整合失败：{str(e)}"
+        content = LLM.chat(
+            prompt,
+            temperature=AI_TEMPERATURE,
+            purpose="reduce",
+            on_token=on_token,
+            response_format={"type": "json_object"}
+        )
+        return json.loads(content)
     
     @classmethod
-    def analyze(cls, articles, keyword):
-        """执行完整的 Map-Reduce 分析"""
-        print("🚀 [Map-Reduce] Map阶段：正在并行总结文章...")
+    def _merge_partials(cls, partials, keyword, token_budget, max_workers, on_token=None):
+        """逐层合并阶段性结果，直到只剩一份（on_token 只用于最后一层的合并）"""
+        while len(partials) > 1:
+            serialized = [json.dumps(partial, ensure_ascii=False) for partial in partials]
+            groups = cls._partition(serialized, token_budget)
+            # 每组至少两份，保证每一层都在收敛
+            if len(groups) == len(partials):
+                groups = [serialized[i:i + 2] for i in range(0, len(serialized), 2)]
+            print(f"🌲 [Reduce] 合并 {len(partials)} 份阶段性结果 → {len(groups)} 份...")
+            
+            last_layer = len(groups) == 1
+            
+            def merge_group(group):
+                group_partials = [json.loads(item) for item in group]
+                if len(group) == 1:
+                    return group_partials[0]
+                try:
+                    return cls._merge_group(group, keyword, on_token if last_layer else None)
+                except Exception as e:
+                    print(f" [!] 合并失败，改为本地合并: {e}")
+                    return cls._merge_locally(group_partials)
+            
+            with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+                partials = list(executor.map(Metrics.bind(merge_group), groups))
+        
+        return partials[0]
+    
+    @staticmethod
+    def merge_prompt(serialized_partials, keyword):
+        """合并阶段性结果的提示词（要求 JSON 输出）"""
+        context = "\n---\n".join(serialized_partials)
+        
+        return f"""
+        以下是关于「{keyword}」的多份 **阶段性分析结果**（JSON），每份来自不同批次的新闻摘要。
+        请把它们合并为一份，你必须严格按 JSON 格式输出，不要包含 Markdown 标记。
+
+        输出字段与输入相同：
+        1. main_summary：主摘要（150-200字，综合所有阶段性摘要）；
+        2. key_sub_themes: 关键子主题（列表，合并同义主题）；
+        3. key_entities：关键实体（列表，去除重复，保留最重要的）；
+        4. timeline：时间线（列表，合并重复事件并按 date 排序，保留 date、event、source 字段）；
+
+        **重要提示**：
+        - 不要编造输入中没有的事件或日期
+        - source 字段保持输入中的文章URL
+
+        阶段性结果输入：
+        {context}
+        """
+    
+    @staticmethod
+    def _merge_group(serialized_partials, keyword, on_token=None):
+        """调用 DeepSeek 合并一组阶段性结果"""
+        prompt = NewsAnalyzer.merge_prompt(serialized_partials, keyword)
+        
+        content = LLM.chat(
+            prompt,
+            temperature=AI_TEMPERATURE,
+            purpose="merge",
+            on_token=on_token,
+            response_format={"type": "json_object"}
+        )
+        return json.loads(content)
+    
+    @classmethod
+    def _merge_locally(cls, partials):
+        """不调用模型的兜底合并：拼接摘要，列表字段去重，时间线按日期排序"""
+        merged = {"main_summary": " ".join(p.get("main_summary", "") for p in partials).strip()}
+        
+        for field in cls.LIST_FIELDS:
+            items, seen = [], set()
+            for partial in partials:
+                for item in partial.get(field, []):
+                    key = json.dumps(item, ensure_ascii=False, sort_keys=True)
+                    if key not in seen:
+                        seen.add(key)
+                        items.append(item)
+            merged[field] = items
+        
+        merged["timeline"].sort(key=lambda item: str(item.get("date", "")) if isinstance(item, dict) else "")
+        return merged
+    
+    @classmethod
+    def analyze(cls, articles, keyword, max_workers=MAP_MAX_WORKERS, use_cache=True):
+        """
+        执行完整的 Map-Reduce 分析
+        
+        Args:
+            articles: 文章列表
+            keyword: 事件关键词
+            max_workers: Map 阶段同时进行的请求数
+            use_cache: 是否使用摘要缓存
+        """
+        # 报道同一子事件的文章只总结簇代表
+        clusters = StoryClusters.group(articles)
+        if len(clusters) < len(articles):
+            print(f"🧩 [Cluster] {len(articles)} 篇文章归为 {len(clusters)} 个事件簇，只总结每簇的代表文章")
+        articles = [members[0] for members in clusters]
+        
+        texts = [article['text'] for article in articles]
+        groups = cls.pack_batches(texts)
+        print(f"🚀 [Map-Reduce] Map阶段：正在并行总结文章（并发 {max_workers}，{len(articles)} 篇合并为 {len(groups)} 次请求）...")
         
-        summaries = []
-        for i, article in enumerate(articles):
-            print(f"  -> 处理文章 {i + 1}/{len(articles)}: {article['title'][:20]}...")
-            summary = cls.summarize_article(article['text'])
-            summaries.append(f"摘要 {i + 1} (来源: {article['url']}):\n{summary}\n")
+        def summarize(group):
+            for i in group:
+                print(f"  -> 处理文章 {i + 1}/{len(articles)}: {articles[i]['title'][:20]}...")
+            if len(group) == 1:
+                return [cls.summarize_article(texts[group[0]], use_cache)]
+            return cls.summarize_batch([texts[i] for i in group], use_cache)
+        
+        # 按分组结果回填，摘要编号与文章一一对应
+        results = [None] * len(articles)
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            for group, summaries in zip(groups, executor.map(Metrics.bind(summarize), groups)):
+                for i, summary in zip(group, summaries):
+                    results[i] = summary
+        
+        if use_cache and SUMMARY_CACHE_ENABLED:
+            stats = SummaryCache.default().stats()
+            print(f"💾 [Cache] 摘要缓存: 命中 {stats['hits']} / 未命中 {stats['misses']}（共 {stats['entries']} 条）")
+        
+        return cls.reduce(articles, results, keyword, clusters)
+    
+    # 摘要标注中最多列出的同簇其他来源数
+    CLUSTER_SOURCES_SHOWN = 5
+    
+    @classmethod
+    def label_summaries(cls, articles, summaries, clusters=None):
+        """
+        给摘要加上编号和来源链接，作为 Reduce 的输入
+        
+        Args:
+            clusters: 与 articles 一一对应的簇成员列表（第一篇为该文章本身）；
+                      簇大小和其他来源会写进标注，作为 Reduce 的权重
+        """
+        labels = []
+        for i, (article, summary) in enumerate(zip(articles, summaries)):
+            members = clusters[i] if clusters else [article]
+            source = f"来源: {article['url']}"
+            if len(members) > 1:
+                others = [member['url'] for member in members[1:]]
+                shown = ", ".join(others[:cls.CLUSTER_SOURCES_SHOWN])
+                more = f" 等 {len(others)} 个" if len(others) > cls.CLUSTER_SOURCES_SHOWN else ""
+                source += f"；同一事件共 {len(members)} 篇报道，其他来源: {shown}{more}"
+            labels.append(f"摘要 {i + 1} ({source}):\n{summary}\n")
+        return labels
+    
+    @staticmethod
+    def cluster_sources(articles, clusters=None):
+        """全部来源链接（簇成员紧跟在簇代表之后）"""
+        if not clusters:
+            return [article['url'] for article in articles]
+        return [member['url'] for members in clusters for member in members]
+    
+    @classmethod
+    def reduce(cls, articles, summaries, keyword, clusters=None, on_token=None):
+        """
+        Reduce 阶段：整合与文章一一对应的摘要，并附上来源链接
+        
+        Args:
+            clusters: 与 articles 一一对应的簇成员列表，None 表示每篇文章自成一簇
+            on_token: 整合结果的流式输出回调（见 LLM.chat）
+        
+        Returns:
+            结构化数据字典，失败时返回错误信息字符串
+        """
+        summaries = cls.label_summaries(articles, summaries, clusters)
         
         print("🚀 [Map-Reduce] Reduce阶段：正在整合全局信息...")
-        structured_data = cls.consolidate_summaries(summaries, keyword)
+        structured_data = cls.consolidate_summaries(summaries, keyword, on_token=on_token)
         
         if isinstance(structured_data, str):
             return structured_data
         
         # 添加来源链接
-        structured_data["sources"] = [article['url'] for article in articles]
+        structured_data["sources"] = cls.cluster_sources(articles, clusters)
         return structured_data
+    
+    @classmethod
+    def update(cls, previous, articles, summaries, keyword, clusters=None, on_token=None):
+        """
+        增量 Reduce：把新文章的摘要合并进上一次的整合结果
+        
+        新摘要先整合为一份阶段性结果，再与上一次的结果合并（与分层 Reduce 的合并方式相同），
+        请求量只与新文章数量有关。
+        
+        Returns:
+            结构化数据字典（sources 为新旧来源的并集），失败时返回错误信息字符串
+        """
+        partial = cls.reduce(articles, summaries, keyword, clusters, on_token)
+        if isinstance(partial, str):
+            return partial
+        
+        new_sources = partial.pop("sources")
+        base = {field: value for field, value in previous.items() if field in ("main_summary",) + cls.LIST_FIELDS}
+        print("🔁 [Reduce] 合并新摘要与上一次的分析结果...")
+        try:
+            merged = cls._merge_group(
+                [json.dumps(item, ensure_ascii=False) for item in (base, partial)], keyword, on_token
+            )
+        except Exception as e:
+            print(f" [!] 合并失败，改为本地合并: {e}")
+            merged = cls._merge_locally([base, partial])
+        
+        merged["sources"] = list(dict.fromkeys(previous.get("sources", []) + new_sources))
+        return merged
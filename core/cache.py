@@ -0,0 +1,326 @@
+"""
+本地缓存模块
+基于 SQLite 的持久化缓存，GUI 和批处理任务共用同一份数据
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from config import CACHE_DIR, AI_MODEL, SUMMARY_CACHE_MAX_MB, CRAWL_CACHE_MAX_MB, SEARCH_CACHE_MAX_MB
+
+
+class SqliteCache:
+    """
+    SQLite 缓存基类
+    
+    每个进程一个连接，线程间用锁串行访问；总大小超过上限时按 last_access 淘汰最旧的条目。
+    子类需要定义 TABLE 和 SCHEMA，且表中包含 size 和 last_access 两列。
+    """
+    
+    TABLE = None
+    SCHEMA = None
+    
+    def __init__(self, path, max_bytes):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._conn = None
+        self._lock = threading.RLock()
+    
+    def _connection(self):
+        """获取数据库连接（首次调用时建表）"""
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")  # 允许多个进程同时读写
+            conn.executescript(self.SCHEMA)
+            self._conn = conn
+        return self._conn
+    
+    def _execute(self, sql, params=()):
+        """执行 SQL 并返回全部结果"""
+        with self._lock:
+            return self._connection().execute(sql, params).fetchall()
+    
+    def record(self, hit):
+        """更新命中计数"""
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+    
+    def _evict(self):
+        """总大小超过上限时，淘汰最近最少使用的条目直到降到上限的 90%"""
+        with self._lock:
+            total = self._execute(f"SELECT COALESCE(SUM(size), 0) FROM {self.TABLE}")[0][0]
+            if total <= self.max_bytes:
+                return
+            
+            target = total - int(self.max_bytes * 0.9)
+            freed, rowids = 0, []
+            for rowid, size in self._execute(f"SELECT rowid, size FROM {self.TABLE} ORDER BY last_access"):
+                if freed >= target:
+                    break
+                rowids.append((rowid,))
+                freed += size
+            
+            self._connection().executemany(f"DELETE FROM {self.TABLE} WHERE rowid = ?", rowids)
+    
+    def stats(self):
+        """返回命中统计和占用情况"""
+        with self._lock:
+            entries, size = self._execute(f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {self.TABLE}")[0]
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "entries": entries,
+                "bytes": size
+            }
+    
+    def clear(self):
+        """清空缓存"""
+        self._execute(f"DELETE FROM {self.TABLE}")
+
+
+class SummaryCache(SqliteCache):
+    """
+    文章摘要缓存
+    
+    以「文章文本 + AI_MODEL + 提示词版本」的哈希为键，相同文章不会重复调用 DeepSeek。
+    """
+    
+    TABLE = "summaries"
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS summaries (
+        key TEXT PRIMARY KEY,
+        summary TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        created_at REAL NOT NULL,
+        last_access REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_summaries_access ON summaries(last_access);
+    """
+    
+    _default = None
+    _default_lock = threading.Lock()
+    
+    @classmethod
+    def default(cls):
+        """获取进程内共享的缓存实例"""
+        with cls._default_lock:
+            if cls._default is None:
+                cls._default = cls(os.path.join(CACHE_DIR, "summaries.db"), SUMMARY_CACHE_MAX_MB * 1024 * 1024)
+            return cls._default
+    
+    @staticmethod
+    def make_key(text, prompt_version):
+        """计算缓存键"""
+        digest = hashlib.sha256()
+        for part in (AI_MODEL, prompt_version, text):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+    
+    def get(self, text, prompt_version):
+        """查询摘要，未命中返回 None"""
+        key = self.make_key(text, prompt_version)
+        with self._lock:
+            rows = self._execute("SELECT summary FROM summaries WHERE key = ?", (key,))
+            if rows:
+                self._execute("UPDATE summaries SET last_access = ? WHERE key = ?", (time.time(), key))
+            self.record(bool(rows))
+        return rows[0][0] if rows else None
+    
+    def put(self, text, prompt_version, summary):
+        """写入摘要"""
+        key = self.make_key(text, prompt_version)
+        now = time.time()
+        with self._lock:
+            self._execute(
+                "INSERT OR REPLACE INTO summaries (key, summary, size, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, summary, len(summary.encode("utf-8")), now, now)
+            )
+            self._evict()
+
+
+class CrawlCache(SqliteCache):
+    """
+    爬取结果缓存
+    
+    以 (URL, 爬取方式) 为键，保存提取出的标题、正文、发布日期以及响应的 ETag / Last-Modified。
+    status 取值：
+        ok       成功
+        short    内容太短
+        blocked  被站点拦截（401 / 403 / 429 / 451）
+        failed   请求或解析失败（超时、DNS、5xx 等）
+    short 和 blocked 作为失败结果缓存 CRAWL_CACHE_NEGATIVE_TTL；failed 多为暂时性错误，不写入缓存，
+    已有的成功条目（连同 ETag / Last-Modified）保持不变，下次运行重新请求。
+    """
+    
+    # 会被缓存的失败结果
+    NEGATIVE_STATUSES = ("short", "blocked")
+    
+    TABLE = "crawl"
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS crawl (
+        url TEXT NOT NULL,
+        strategy TEXT NOT NULL,
+        status TEXT NOT NULL,
+        title TEXT,
+        text TEXT,
+        publish_date TEXT,
+        etag TEXT,
+        last_modified TEXT,
+        fetched_at REAL NOT NULL,
+        size INTEGER NOT NULL,
+        last_access REAL NOT NULL,
+        PRIMARY KEY (url, strategy)
+    );
+    CREATE INDEX IF NOT EXISTS idx_crawl_access ON crawl(last_access);
+    """
+    
+    _default = None
+    _default_lock = threading.Lock()
+    
+    @classmethod
+    def default(cls):
+        """获取进程内共享的缓存实例"""
+        with cls._default_lock:
+            if cls._default is None:
+                cls._default = cls(os.path.join(CACHE_DIR, "crawl.db"), CRAWL_CACHE_MAX_MB * 1024 * 1024)
+            return cls._default
+    
+    def _connection(self):
+        """获取数据库连接（旧版本建的表没有 publish_date 列，首次连接时补上）"""
+        if self._conn is None:
+            conn = super()._connection()
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(crawl)")}
+            if "publish_date" not in columns:
+                conn.execute("ALTER TABLE crawl ADD COLUMN publish_date TEXT")
+        return self._conn
+    
+    def lookup(self, url, strategy):
+        """
+        查询缓存条目
+        
+        Returns:
+            包含 status、title、text、publish_date、etag、last_modified、age（秒）的字典，未找到返回 None
+        """
+        with self._lock:
+            rows = self._execute(
+                "SELECT status, title, text, publish_date, etag, last_modified, fetched_at "
+                "FROM crawl WHERE url = ? AND strategy = ?",
+                (url, strategy)
+            )
+            if not rows:
+                return None
+            self._execute("UPDATE crawl SET last_access = ? WHERE url = ? AND strategy = ?", (time.time(), url, strategy))
+        
+        status, title, text, publish_date, etag, last_modified, fetched_at = rows[0]
+        return {
+            "status": status,
+            "title": title,
+            "text": text,
+            "publish_date": publish_date,
+            "etag": etag,
+            "last_modified": last_modified,
+            "age": time.time() - fetched_at
+        }
+    
+    def store(self, url, strategy, status, article=None, etag=None, last_modified=None):
+        """写入爬取结果（article 为 None 表示失败结果；暂时性失败 failed 不写入）"""
+        if status != "ok" and status not in self.NEGATIVE_STATUSES:
+            return
+        title = article["title"] if article else None
+        text = article["text"] if article else None
+        publish_date = article.get("publish_date") if article else None
+        size = len(url) + len((title or "").encode("utf-8")) + len((text or "").encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            self._execute(
+                "INSERT OR REPLACE INTO crawl "
+                "(url, strategy, status, title, text, publish_date, etag, last_modified, fetched_at, size, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, strategy, status, title, text, publish_date, etag, last_modified, now, size, now)
+            )
+            self._evict()
+    
+    def touch(self, url, strategy):
+        """重新验证通过（304），刷新抓取时间"""
+        now = time.time()
+        self._execute(
+            "UPDATE crawl SET fetched_at = ?, last_access = ? WHERE url = ? AND strategy = ?",
+            (now, now, url, strategy)
+        )
+
+
+class SearchCache(SqliteCache):
+    """
+    搜索结果缓存
+    
+    以 (搜索引擎, 关键词, 时间范围) 为键保存链接列表；请求数量不超过缓存时的数量才算命中。
+    """
+    
+    TABLE = "search"
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS search (
+        engine TEXT NOT NULL,
+        keyword TEXT NOT NULL,
+        timelimit TEXT NOT NULL,
+        max_results INTEGER NOT NULL,
+        links TEXT NOT NULL,
+        fetched_at REAL NOT NULL,
+        size INTEGER NOT NULL,
+        last_access REAL NOT NULL,
+        PRIMARY KEY (engine, keyword, timelimit)
+    );
+    CREATE INDEX IF NOT EXISTS idx_search_access ON search(last_access);
+    """
+    
+    _default = None
+    _default_lock = threading.Lock()
+    
+    @classmethod
+    def default(cls):
+        """获取进程内共享的缓存实例"""
+        with cls._default_lock:
+            if cls._default is None:
+                cls._default = cls(os.path.join(CACHE_DIR, "search.db"), SEARCH_CACHE_MAX_MB * 1024 * 1024)
+            return cls._default
+    
+    def get(self, engine, keyword, timelimit, max_results, ttl):
+        """查询有效期内的搜索结果，未命中返回 None"""
+        with self._lock:
+            rows = self._execute(
+                "SELECT max_results, links, fetched_at FROM search WHERE engine = ? AND keyword = ? AND timelimit = ?",
+                (engine, keyword, timelimit)
+            )
+            hit = bool(rows) and rows[0][0] >= max_results and time.time() - rows[0][2] < ttl
+            if hit:
+                self._execute(
+                    "UPDATE search SET last_access = ? WHERE engine = ? AND keyword = ? AND timelimit = ?",
+                    (time.time(), engine, keyword, timelimit)
+                )
+            self.record(hit)
+        return json.loads(rows[0][1])[:max_results] if hit else None
+    
+    def put(self, engine, keyword, timelimit, max_results, links):
+        """写入搜索结果"""
+        payload = json.dumps(links, ensure_ascii=False)
+        now = time.time()
+        with self._lock:
+            self._execute(
+                "INSERT OR REPLACE INTO search "
+                "(engine, keyword, timelimit, max_results, links, fetched_at, size, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (engine, keyword, timelimit, max_results, payload, now, len(payload.encode("utf-8")), now)
+            )
+            self._evict()
@@ -0,0 +1,180 @@
+"""
+报道聚类模块
+去重之后仍有不少文章报道同一个子事件（改写过的通稿、跟进报道）。按正文的 TF-IDF 向量做在线领袖聚类：
+新文章与各簇代表的余弦相似度达到阈值时并入最相似的簇，否则自成一簇并作为该簇的代表。
+只有簇代表送去 Map 总结，簇大小和成员链接作为权重交给 Reduce。
+优先使用 NumPy 向量化计算（词项哈希到固定维度，簇代表按稀疏向量保存），未安装时退回纯 Python 实现
+"""
+import math
+from collections import Counter
+from core.compress import terms
+from core.metrics import Metrics
+from config import CLUSTER_ENABLED, CLUSTER_SIMILARITY, CLUSTER_BODY_CHARS, CLUSTER_HASH_DIMS
+
+_numpy = None
+
+
+def _np():
+    """延迟导入 numpy，未安装时返回 None"""
+    global _numpy
+    if _numpy is None:
+        try:
+            import numpy
+            _numpy = numpy
+        except ImportError:
+            _numpy = False
+    return _numpy or None
+
+
+class StoryClusters:
+    """
+    在线报道聚类
+
+    IDF 随收录的文章数增量更新；簇代表保存原始词频（log 缩放），比较时乘以当前 IDF，
+    因此后到的文章不会因为早期 IDF 不准而一直被错误归类。
+    """
+
+    def __init__(self, threshold=CLUSTER_SIMILARITY, dims=CLUSTER_HASH_DIMS, enabled=CLUSTER_ENABLED):
+        self.threshold = threshold
+        self.dims = dims
+        self.enabled = enabled
+        self.members = []  # 每个簇的成员文章，第一篇为代表
+        self._doc_count = 0
+        self._numpy = _np()
+        if self._numpy:
+            np = self._numpy
+            self._df = np.zeros(dims)
+            # 簇代表按稀疏向量保存：每个代表的非零维度编号（升序）、对应词频及词频的平方，
+            # 所有代表依次拼接在一维数组中，容量不足时成倍扩展，前 _size 个元素有效
+            self._indices = np.zeros(1024, dtype=np.int64)
+            self._weights = np.zeros(1024, dtype=np.float32)
+            self._weights_sq = np.zeros(1024, dtype=np.float32)
+            self._owners = np.zeros(1024, dtype=np.int64)  # 每个元素所属的簇代表
+            self._size = 0
+            self._rows = 0
+        else:
+            self._df = Counter()
+            self._leaders = []
+
+    @classmethod
+    def group(cls, articles, **options):
+        """
+        把一批文章聚类
+
+        Returns:
+            簇列表，每个簇是成员文章列表（第一篇为代表），簇按代表在输入中的顺序排列
+        """
+        clusters = cls(**options)
+        for article in articles:
+            clusters.assign(article)
+        return clusters.members
+
+    def assign(self, article):
+        """
+        把文章归入最相似的簇，没有足够相似的簇时新建一簇
+
+        Returns:
+            (簇编号, 是否为新簇的代表)
+        """
+        cluster_id = None
+        if self.enabled:
+            with Metrics.span("cluster"):
+                features = terms((article.get('text') or "")[:CLUSTER_BODY_CHARS])
+                if self._numpy:
+                    cluster_id = self._assign_vectorized(features)
+                else:
+                    cluster_id = self._assign_python(features)
+
+        if cluster_id is None:
+            self.members.append([article])
+            return len(self.members) - 1, True
+        self.members[cluster_id].append(article)
+        Metrics.incr("cluster_joins")
+        return cluster_id, False
+
+    def _idf(self, df):
+        """平滑 IDF"""
+        return math.log((self._doc_count + 1) / (df + 1)) + 1
+
+    def _assign_vectorized(self, features):
+        """NumPy 实现：返回匹配的簇编号，没有匹配时收录为新簇代表并返回 None"""
+        np = self._numpy
+        hashed = np.fromiter((hash(feature) % self.dims for feature in features), dtype=np.int64, count=len(features))
+        indices, counts = np.unique(hashed, return_counts=True)
+        tf = np.log1p(counts).astype(np.float32)
+
+        self._doc_count += 1
+        self._df[indices] += 1
+
+        query = tf * self._idf_at(indices)
+        query_norm = float(np.sqrt(query @ query))
+        if query_norm and self._rows:
+            # 只在查询的非零维度上计算点积：找出代表中与查询共有的维度
+            leader_indices = self._indices[:self._size]
+            positions = np.minimum(np.searchsorted(indices, leader_indices), len(indices) - 1)
+            shared = np.flatnonzero(indices[positions] == leader_indices)
+            shared_idf = self._idf_at(leader_indices[shared])
+            dots = np.bincount(
+                self._owners[shared], weights=self._weights[shared] * shared_idf * query[positions[shared]],
+                minlength=self._rows
+            )
+            best = int(np.argmax(dots))
+            if dots[best] > 0:
+                # 余弦相似度 = (L·idf)·q / (|L·idf| |q|)，IDF 随文章数变化，|L·idf|² 由代表自身维度上的 tf² 与 idf² 计算
+                candidates = np.flatnonzero(dots > 0)
+                norms = np.sqrt(np.bincount(
+                    self._owners[:self._size], weights=self._weights_sq[:self._size] * self._idf_at(leader_indices) ** 2,
+                    minlength=self._rows
+                ))[candidates]
+                similarities = dots[candidates] / (norms * query_norm)
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    return int(candidates[best])
+
+        end = self._size + len(indices)
+        if end > len(self._indices):
+            capacity = max(end, 2 * len(self._indices))
+            for name in ("_indices", "_weights", "_weights_sq", "_owners"):
+                grown = np.zeros(capacity, dtype=getattr(self, name).dtype)
+                grown[:self._size] = getattr(self, name)[:self._size]
+                setattr(self, name, grown)
+        self._indices[self._size:end] = indices
+        self._weights[self._size:end] = tf
+        self._weights_sq[self._size:end] = tf * tf
+        self._owners[self._size:end] = self._rows
+        self._size = end
+        self._rows += 1
+        return None
+
+    def _idf_at(self, indices):
+        """指定维度上的平滑 IDF（NumPy 实现）"""
+        np = self._numpy
+        return (np.log((self._doc_count + 1) / (self._df[indices] + 1)) + 1).astype(np.float32)
+
+    def _assign_python(self, features):
+        """纯 Python 实现：与向量化实现相同，但不做特征哈希"""
+        tf = {feature: math.log1p(count) for feature, count in Counter(features).items()}
+
+        self._doc_count += 1
+        self._df.update(tf.keys())
+
+        query = {feature: weight * self._idf(self._df[feature]) for feature, weight in tf.items()}
+        query_norm = math.sqrt(sum(weight * weight for weight in query.values()))
+        if query_norm:
+            best, best_similarity = None, 0.0
+            for cluster_id, leader in enumerate(self._leaders):
+                norm = math.sqrt(sum((weight * self._idf(self._df[feature])) ** 2 for feature, weight in leader.items()))
+                if not norm:
+                    continue
+                dot = sum(
+                    leader[feature] * self._idf(self._df[feature]) * query[feature]
+                    for feature in leader.keys() & query.keys()
+                )
+                similarity = dot / (norm * query_norm)
+                if similarity > best_similarity:
+                    best, best_similarity = cluster_id, similarity
+            if best is not None and best_similarity >= self.threshold:
+                return best
+
+        self._leaders.append(tf)
+        return None
@@ -0,0 +1,125 @@
+"""
+正文抽取式压缩模块
+在 Map 阶段之前挑选最能代表全文的句子，替代按字符截断：
+句子用 TF-IDF 向量表示，按与全文中心向量的相似度打分（新闻开头的句子略微加权），
+在 token 预算内贪心选取并去掉彼此高度相似的句子，最后按原文顺序拼接。纯本地计算，不依赖模型。
+"""
+import math
+import re
+from collections import Counter
+from core.dedup import tokenize
+from core.llm import LLM, CJK_PATTERN
+
+# 句子边界：中文句末标点、英文句末标点后的空白、换行
+SENTENCE_SPLIT = re.compile(r'(?<=[。！？!?；;])|(?<=[.!?])\s+|\n+')
+
+MAX_SENTENCE_CHARS = 300  # 没有标点的超长片段按此长度切开
+LEAD_WEIGHT = 0.5  # 开头句子的加权（第 i 句乘以 1 + LEAD_WEIGHT / (i + 1)）
+REDUNDANCY_THRESHOLD = 0.7  # 与已选句子的余弦相似度超过该值时跳过
+
+
+def split_sentences(text):
+    """切分句子，去掉空句，超长片段按 MAX_SENTENCE_CHARS 切开"""
+    sentences = []
+    for piece in SENTENCE_SPLIT.split(text):
+        piece = piece.strip()
+        for start in range(0, len(piece), MAX_SENTENCE_CHARS):
+            sentences.append(piece[start:start + MAX_SENTENCE_CHARS])
+    return sentences
+
+
+def terms(sentence):
+    """句子的检索词：中日韩文用相邻字的二元组，其他语言用单词"""
+    tokens = tokenize(sentence)
+    result = []
+    for i, token in enumerate(tokens):
+        if CJK_PATTERN.match(token):
+            if i + 1 < len(tokens) and CJK_PATTERN.match(tokens[i + 1]):
+                result.append(token + tokens[i + 1])
+        else:
+            result.append(token)
+    return result
+
+
+def _normalize(vector):
+    """归一化为单位向量（之后余弦相似度就是点积）"""
+    norm = math.sqrt(sum(w * w for w in vector.values()))
+    return {term: w / norm for term, w in vector.items()} if norm else vector
+
+
+def _dot(a, b):
+    """稀疏向量的点积"""
+    return sum(a[term] * b[term] for term in a.keys() & b.keys())
+
+
+def score_sentences(sentences):
+    """
+    句子打分
+
+    Returns:
+        (分数列表, 归一化的 TF-IDF 向量列表)，与 sentences 一一对应
+    """
+    counts = [Counter(terms(sentence)) for sentence in sentences]
+    document_frequency = Counter(term for count in counts for term in count)
+    total = len(sentences)
+
+    vectors = []
+    for count in counts:
+        vectors.append(_normalize({
+            term: (1 + math.log(tf)) * (math.log((total + 1) / (document_frequency[term] + 1)) + 1)
+            for term, tf in count.items()
+        }))
+
+    centroid = Counter()
+    for vector in vectors:
+        centroid.update(vector)
+    centroid = _normalize(centroid)
+
+    scores = [
+        _dot(vector, centroid) * (1 + LEAD_WEIGHT / (i + 1))
+        for i, vector in enumerate(vectors)
+    ]
+    return scores, vectors
+
+
+def compress(text, token_budget):
+    """
+    把正文压缩到 token_budget 以内
+
+    未超出预算的正文原样返回；否则按分数贪心选取句子（跳过放不下的和与已选句高度相似的），
+    按原文顺序拼接，相邻句子直接连接，中间有省略的位置换行。
+
+    Returns:
+        压缩后的正文
+    """
+    if LLM.estimate_tokens(text) <= token_budget:
+        return text
+
+    sentences = split_sentences(text)
+    if not sentences:
+        return text
+    scores, vectors = score_sentences(sentences)
+
+    selected, used = [], 0
+    for i in sorted(range(len(sentences)), key=lambda i: scores[i], reverse=True):
+        tokens = LLM.estimate_tokens(sentences[i])
+        if used + tokens > token_budget:
+            continue
+        if any(_dot(vectors[i], vectors[j]) > REDUNDANCY_THRESHOLD for j in selected):
+            continue
+        selected.append(i)
+        used += tokens
+
+    if not selected:
+        # 单句就超出预算（极少见），退回按比例截断
+        return text[:max(1, int(len(text) * token_budget / LLM.estimate_tokens(text)))]
+
+    selected.sort()
+    parts = [sentences[selected[0]]]
+    for previous, current in zip(selected, selected[1:]):
+        if current != previous + 1:
+            parts.append("\n")
+        elif sentences[previous][-1].isascii() and sentences[current][0].isascii():
+            parts.append(" ")
+        parts.append(sentences[current])
+    return "".join(parts)
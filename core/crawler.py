@@ -1,9 +1,19 @@
 """
 新闻爬取模块
 """
-from newspaper import Article
-from fuzzywuzzy import fuzz
-from config import SIMILARITY_THRESHOLD
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from core.dedup import NearDuplicateIndex
+from core.http_pool import HttpPool, HostLimiter
+from core.cache import CrawlCache
+from core.metrics import Metrics
+from core.router import DomainRouter
+from core.store import ArticleStore
+from config import (
+    CRAWL_MAX_WORKERS, CRAWL_PER_HOST_LIMIT,
+    CRAWL_CACHE_ENABLED, CRAWL_CACHE_TTL, CRAWL_CACHE_NEGATIVE_TTL
+)
 
 
 class NewsCrawler:
@@ -26,93 +36,256 @@ class NewsCrawler:
         """检查URL是否在黑名单中"""
         return any(domain in url for domain in cls.BLOCKED_DOMAINS)
     
+    # 视为被站点拦截的状态码
+    BLOCKED_STATUS_CODES = (401, 403, 429, 451)
+    
     @classmethod
-    def crawl_article(cls, url):
-        """爬取单篇文章"""
+    def crawl_article(cls, url, use_cache=True):
+        """
+        爬取单篇文章
+        
+        Args:
+            url: 文章URL
+            use_cache: 是否使用爬取缓存（有效期内直接返回，过期后发送条件请求）
+        """
         # 过滤黑名单网站
         if cls.is_blocked_domain(url):
             print(f" [!] 跳过黑名单网站: {url}")
             return None
         
+        start = time.perf_counter()
+        with Metrics.span("crawl", strategy="static", host=HostLimiter.host_of(url)) as span:
+            article = cls._fetch_article(url, use_cache, span)
+        DomainRouter.record(url, "static", span.get("outcome"), article, time.perf_counter() - start)
+        if span.get("outcome") == "ok":
+            ArticleStore.save(article)
+        return article
+    
+    @classmethod
+    def _fetch_article(cls, url, use_cache, span):
+        """下载并解析文章，span 中记录结果类型（ok / short / blocked / failed / cache / not_modified）"""
+        cache = CrawlCache.default() if use_cache and CRAWL_CACHE_ENABLED else None
+        cached = cache.lookup(url, "static") if cache else None
+        headers = None
+        
+        if cached:
+            if cached["status"] != "ok" and cached["age"] < CRAWL_CACHE_NEGATIVE_TTL:
+                cache.record(True)
+                span["outcome"] = "cache"
+                print(f" [!] 跳过近期失败的链接（{cached['status']}）: {url}")
+                return None
+            if cached["status"] == "ok":
+                if cached["age"] < CRAWL_CACHE_TTL:
+                    cache.record(True)
+                    span["outcome"] = "cache"
+                    print(f" [✓] 缓存命中: {cached['title'][:50]}...")
+                    return cls._cached_article(url, cached)
+                headers = cls._conditional_headers(cached)
+        
+        import requests
+        
+        status, article, response = "failed", None, None
         try:
             print(f" [→] 正在爬取: {url}")
-            article = Article(url)  # 不指定语言，让 newspaper 自动检测
-            article.download()
-            article.parse()
+            # 通过共享连接池下载，同一新闻站点的请求复用连接
+            response = HttpPool.get(url, headers=headers, timeout=10)
             
-            if len(article.text) > 200:
-                print(f" [✓] 成功: {article.title[:50]}... ({len(article.text)} 字)")
-                return {
-                    "url": url,
-                    "title": article.title,
-                    "text": article.text
-                }
-            else:
-                print(f" [!] 内容太短 ({len(article.text)} 字): {url}")
+            # 内容未变化，跳过下载和解析
+            if response.status_code == 304 and cached:
+                cache.touch(url, "static")
+                cache.record(True)
+                span["outcome"] = "not_modified"
+                print(f" [✓] 未修改（304）: {cached['title'][:50]}...")
+                return cls._cached_article(url, cached)
+            
+            Metrics.incr("crawl_bytes", len(response.content), strategy="static")
+            response.raise_for_status()
+            
+            status, article = cls.parse_article(url, HttpPool.decode(response))
+        except requests.HTTPError as e:
+            if e.response is not None and e.response.status_code in cls.BLOCKED_STATUS_CODES:
+                status = "blocked"
+            print(f" [!] 爬取失败: {url}")
+            print(f"     错误: {str(e)[:100]}")
         except Exception as e:
             print(f" [!] 爬取失败: {url}")
             print(f"     错误: {str(e)[:100]}")
         
-        return None
+        span["outcome"] = status
+        if cache:
+            cache.record(False)
+            validators = response.headers if response is not None and status == "ok" else {}
+            cache.store(
+                url, "static", status, article,
+                etag=validators.get("ETag"),
+                last_modified=validators.get("Last-Modified")
+            )
+        
+        return article
+    
+    @staticmethod
+    def parse_article(url, html):
+        """
+        用 newspaper 从已下载的页面中提取文章
+        
+        Returns:
+            (状态, 文章)，正文太短时状态为 short、文章为 None
+        """
+        from newspaper import Article
+        
+        parsed = Article(url)  # 不指定语言，让 newspaper 自动检测
+        parsed.download(input_html=html)
+        parsed.parse()
+        
+        if len(parsed.text) > 200:
+            print(f" [✓] 成功: {parsed.title[:50]}... ({len(parsed.text)} 字)")
+            publish_date = parsed.publish_date
+            return "ok", {
+                "url": url,
+                "title": parsed.title,
+                "text": parsed.text,
+                "publish_date": publish_date.isoformat() if hasattr(publish_date, "isoformat") else publish_date or None
+            }
+        
+        print(f" [!] 内容太短 ({len(parsed.text)} 字): {url}")
+        return "short", None
+    
+    @staticmethod
+    def _cached_article(url, cached):
+        """由缓存条目构造文章"""
+        return {
+            "url": url,
+            "title": cached["title"],
+            "text": cached["text"],
+            "publish_date": cached["publish_date"]
+        }
+    
+    @staticmethod
+    def _conditional_headers(cached):
+        """根据缓存的校验信息构造条件请求头"""
+        headers = {}
+        if cached["etag"]:
+            headers["If-None-Match"] = cached["etag"]
+        if cached["last_modified"]:
+            headers["If-Modified-Since"] = cached["last_modified"]
+        return headers or None
     
     @classmethod
-    def crawl_articles(cls, urls, use_dynamic=False):
+    def crawl_articles(cls, urls, use_dynamic=False, max_workers=CRAWL_MAX_WORKERS, per_host_limit=CRAWL_PER_HOST_LIMIT):
         """
         批量爬取文章
         
         Args:
             urls: URL列表
             use_dynamic: 是否使用动态爬虫（Selenium）
+            max_workers: 静态爬虫的全局并发数（1 表示逐个爬取）
+            per_host_limit: 同一站点的并发上限
+        """
+        results = {}
+        cls.crawl_routed(urls, results.__setitem__, use_dynamic, max_workers, per_host_limit)
+        # 按输入顺序返回
+        return [results[index] for index in sorted(results)]
+    
+    @classmethod
+    def crawl_routed(cls, urls, on_article, use_dynamic=False, max_workers=CRAWL_MAX_WORKERS,
+                     per_host_limit=CRAWL_PER_HOST_LIMIT, log=print, stop=None):
         """
-        articles = []
-        failed_urls = []
+        按站点历史爬取一组链接，每爬到一篇就调用 on_article(下标, 文章)（在爬取线程中调用）
+        
+        每个链接由 DomainRouter 选择爬取方式：static 先静态爬取，失败再交给动态爬虫；
+        dynamic 直接动态渲染；skip 跳过。动态爬虫不可用时 dynamic 退化为 static 流程。
+        批量爬取和流式流水线共用这一流程。
         
-        # 第一轮：使用静态爬虫
-        for url in urls:
-            article = cls.crawl_article(url)
+        Args:
+            urls: URL列表
+            on_article: 爬取成功的回调
+            use_dynamic: 是否使用动态爬虫（Selenium）
+            max_workers: 静态爬虫的全局并发数
+            per_host_limit: 同一站点的并发上限
+            log: 日志回调
+            stop: threading.Event，设置后不再开始新的爬取（已开始的爬取照常完成）
+        """
+        limiter = HostLimiter(per_host_limit)
+        dynamic_executor = None
+        dynamic_futures = []
+        
+        def stopped():
+            return stop is not None and stop.is_set()
+        
+        def crawl_dynamic(index):
+            if stopped():
+                return
+            article = DynamicCrawler.crawl_article(urls[index])
             if article:
-                articles.append(article)
-            else:
-                failed_urls.append(url)
+                on_article(index, article)
+        
+        def crawl_one(index):
+            if stopped():
+                return
+            url = urls[index]
+            decision = DomainRouter.route(url, dynamic_executor is not None)
+            if decision == DomainRouter.SKIP:
+                log(f"   ⏭️ Skipping host that keeps failing: {url}")
+                return
+            if decision == DomainRouter.STATIC:
+                with limiter.limit(url):
+                    article = cls.crawl_article(url)
+                if article:
+                    on_article(index, article)
+                    return
+            if dynamic_executor is not None and not stopped():
+                dynamic_futures.append(dynamic_executor.submit(Metrics.bind(crawl_dynamic), index))
         
-        # 第二轮：如果启用动态爬虫且有失败的URL，尝试用Selenium
-        if use_dynamic and failed_urls:
-            print(f"\n🔄 [Dynamic] 尝试用动态爬虫重新爬取 {len(failed_urls)} 个失败的链接...")
+        if use_dynamic and urls:
             try:
                 from core.dynamic_crawler import DynamicCrawler
-                
-                for url in failed_urls:
-                    article = DynamicCrawler.crawl_article(url)
-                    if article:
-                        articles.append(article)
+                dynamic_executor = ThreadPoolExecutor(max_workers=DynamicCrawler.pool().size)
             except ImportError:
-                print("⚠️ 动态爬虫未安装，跳过。运行: pip install selenium")
-            except Exception as e:
-                print(f"⚠️ 动态爬虫失败: {e}")
+                log("⚠️ Dynamic crawler unavailable, skipping. Run: pip install selenium")
         
-        return articles
+        try:
+            # 按站点轮流提交，避免同一站点的链接扎堆占满工作线程
+            with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+                list(executor.map(Metrics.bind(crawl_one), cls._interleave_by_host(urls)))
+        finally:
+            if dynamic_executor is not None:
+                if dynamic_futures:
+                    log(f"🔄 Retrying {len(dynamic_futures)} failed links with the dynamic crawler...")
+                dynamic_executor.shutdown(wait=True)
+    
+    @staticmethod
+    def _interleave_by_host(urls):
+        """返回按站点轮转排列的下标顺序"""
+        buckets = OrderedDict()
+        for index, url in enumerate(urls):
+            buckets.setdefault(HostLimiter.host_of(url), []).append(index)
+        
+        order = []
+        queues = list(buckets.values())
+        while queues:
+            for queue in queues:
+                order.append(queue.pop(0))
+            queues = [queue for queue in queues if queue]
+        return order
     
     @staticmethod
     def deduplicate(articles):
-        """使用模糊匹配去重"""
+        """使用 MinHash + LSH 索引去重（标题相似或正文相似）"""
         unique_articles = []
-        seen_titles = []
+        index = NearDuplicateIndex()
         
         print(f"🔍 [Cleaning] 正在去重处理 {len(articles)} 篇文章...")
         
         for article in articles:
-            is_duplicate = False
+            with Metrics.span("dedup"):
+                duplicate = index.check_and_add(article)
             
-            for seen_title in seen_titles:
-                similarity = fuzz.token_sort_ratio(article['title'], seen_title)
-                if similarity > SIMILARITY_THRESHOLD:
-                    is_duplicate = True
-                    print(f" [!] 剔除重复内容 (相似度 {similarity}%): {article['title']}")
-                    break
-            
-            if not is_duplicate:
+            if duplicate is None:
                 unique_articles.append(article)
-                seen_titles.append(article['title'])
+            elif duplicate[0] == "title":
+                print(f" [!] 剔除重复内容 (相似度 {duplicate[1]}%): {article['title']}")
+            else:
+                print(f" [!] 剔除转载内容 (正文相似度 {duplicate[1]}%): {article['title']}")
         
         print(f"✅ [Cleaning] 去重完成. 剩余 {len(unique_articles)} 篇独立文章.")
         return unique_articles
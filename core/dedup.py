@@ -0,0 +1,164 @@
+"""
+近似重复检测模块
+使用 One Permutation MinHash 签名 + LSH 分桶，只和同桶的候选文章比较，避免两两比对
+"""
+import re
+from config import (
+    SIMILARITY_THRESHOLD, DEDUP_BODY_THRESHOLD, DEDUP_BODY_CHARS,
+    DEDUP_LSH_BANDS, DEDUP_LSH_ROWS
+)
+
+# 中日韩字符逐字切分，其他语言按单词切分
+TOKEN_PATTERN = re.compile(r'[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af]|[0-9a-z]+')
+
+HASH_MASK = (1 << 64) - 1
+
+
+def tokenize(text):
+    """切分词元（中日韩文按字，其他按词，统一小写）"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def shingles(tokens, n):
+    """生成 n 元词组集合，词元不足 n 个时整体作为一个词组"""
+    if len(tokens) <= n:
+        return {" ".join(tokens)} if tokens else set()
+    return {" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1)}
+
+
+def signature(features, num_bins):
+    """
+    计算 One Permutation MinHash 签名
+    
+    每个特征只哈希一次，按哈希值分到 num_bins 个桶中取最小值；空桶用右侧最近的非空桶填充
+    （rotation densification）。使用内置 hash，签名只在当前进程内可比较。
+    
+    Returns:
+        长度为 num_bins 的元组，没有特征时返回 None
+    """
+    mins = [None] * num_bins
+    for feature in features:
+        h = hash(feature) & HASH_MASK
+        index, value = h % num_bins, h // num_bins
+        if mins[index] is None or value < mins[index]:
+            mins[index] = value
+    
+    if all(value is None for value in mins):
+        return None
+    
+    filled = list(mins)
+    for i in range(num_bins):
+        if mins[i] is None:
+            distance = 1
+            while mins[(i + distance) % num_bins] is None:
+                distance += 1
+            # 加上偏移量，避免借用同一个桶的两个空桶被误判为相同
+            filled[i] = mins[(i + distance) % num_bins] + distance * (HASH_MASK // num_bins + 1)
+    return tuple(filled)
+
+
+def estimate_similarity(sig_a, sig_b):
+    """由签名估计 Jaccard 相似度"""
+    return sum(a == b for a, b in zip(sig_a, sig_b)) / len(sig_a)
+
+
+class LSHIndex:
+    """LSH 分桶索引：签名的任一分段完全相同即成为候选"""
+    
+    def __init__(self, bands=DEDUP_LSH_BANDS, rows=DEDUP_LSH_ROWS):
+        self.bands = bands
+        self.rows = rows
+        self._buckets = {}
+    
+    @property
+    def num_bins(self):
+        return self.bands * self.rows
+    
+    def _keys(self, sig):
+        for band in range(self.bands):
+            yield band, sig[band * self.rows:(band + 1) * self.rows]
+    
+    def add(self, doc_id, sig):
+        """加入索引"""
+        for key in self._keys(sig):
+            self._buckets.setdefault(key, []).append(doc_id)
+    
+    def candidates(self, sig):
+        """返回候选文档编号（按加入顺序）"""
+        found = set()
+        for key in self._keys(sig):
+            found.update(self._buckets.get(key, ()))
+        return sorted(found)
+
+
+class NearDuplicateIndex:
+    """
+    增量式近似重复检测
+    
+    同时检查两类重复：
+    1. 标题相似：LSH 召回候选，再用 fuzz.token_sort_ratio 按 SIMILARITY_THRESHOLD 确认
+    2. 正文相似：按正文词组签名估计 Jaccard 系数，识别改写标题的通稿转载
+    """
+    
+    def __init__(self, title_threshold=SIMILARITY_THRESHOLD, body_threshold=DEDUP_BODY_THRESHOLD):
+        self.title_threshold = title_threshold
+        self.body_threshold = body_threshold
+        self._title_index = LSHIndex()
+        self._body_index = LSHIndex()
+        self._titles = []
+        self._body_sigs = []
+    
+    def _signatures(self, article):
+        """计算标题签名和正文签名"""
+        num_bins = self._title_index.num_bins
+        title_tokens = tokenize(article.get('title') or "")
+        # 标题用单字/单词 + 二元组，语序调整后仍能召回
+        title_sig = signature(shingles(title_tokens, 1) | shingles(title_tokens, 2), num_bins)
+        body_tokens = tokenize((article.get('text') or "")[:DEDUP_BODY_CHARS])
+        body_sig = signature(shingles(body_tokens, 3), num_bins)
+        return title_sig, body_sig
+    
+    def find_duplicate(self, article, signatures=None):
+        """
+        查找已收录的重复文章
+        
+        Returns:
+            (类型, 相似度百分比, 重复文章的标题)，没有重复时返回 None
+        """
+        from fuzzywuzzy import fuzz
+        
+        title_sig, body_sig = signatures or self._signatures(article)
+        title = article.get('title') or ""
+        
+        if title_sig:
+            for doc_id in self._title_index.candidates(title_sig):
+                similarity = fuzz.token_sort_ratio(title, self._titles[doc_id])
+                if similarity > self.title_threshold:
+                    return "title", similarity, self._titles[doc_id]
+        
+        if body_sig:
+            for doc_id in self._body_index.candidates(body_sig):
+                similarity = estimate_similarity(body_sig, self._body_sigs[doc_id])
+                if similarity >= self.body_threshold:
+                    return "body", round(similarity * 100), self._titles[doc_id]
+        
+        return None
+    
+    def add(self, article, signatures=None):
+        """收录文章"""
+        title_sig, body_sig = signatures or self._signatures(article)
+        doc_id = len(self._titles)
+        self._titles.append(article.get('title') or "")
+        self._body_sigs.append(body_sig)
+        if title_sig:
+            self._title_index.add(doc_id, title_sig)
+        if body_sig:
+            self._body_index.add(doc_id, body_sig)
+    
+    def check_and_add(self, article):
+        """检查文章是否重复，不重复则收录；返回值同 find_duplicate"""
+        signatures = self._signatures(article)
+        duplicate = self.find_duplicate(article, signatures)
+        if duplicate is None:
+            self.add(article, signatures)
+        return duplicate
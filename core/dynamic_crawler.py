@@ -3,20 +3,167 @@
 使用 Selenium + Chrome 无头浏览器
 """
 import time
+import atexit
+import queue
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from bs4 import BeautifulSoup
+from core.parsing import extract_article
+from core.cache import CrawlCache
+from core.http_pool import HostLimiter
+from core.metrics import Metrics
+from core.router import DomainRouter
+from core.store import ArticleStore
+from config import (
+    DYNAMIC_POOL_SIZE, DYNAMIC_DRIVER_MAX_PAGES, DYNAMIC_PAGE_LOAD_TIMEOUT,
+    DYNAMIC_READY_TIMEOUT, DYNAMIC_READY_STABLE, DYNAMIC_READY_POLL,
+    CRAWL_CACHE_ENABLED, CRAWL_CACHE_TTL, CRAWL_CACHE_NEGATIVE_TTL
+)
+
+# 就绪检测脚本：文档状态、正文长度、已发起的资源请求数
+READY_PROBE_SCRIPT = """
+return [
+    document.readyState,
+    document.body ? document.body.innerText.length : 0,
+    performance.getEntriesByType('resource').length
+];
+"""
+
+
+class DriverPool:
+    """
+    常驻 Chrome 驱动池
+    
+    每个 URL 租用一个驱动，用完归还；驱动处理 max_pages 个页面或崩溃后重建。
+    """
+    
+    def __init__(self, factory, size=DYNAMIC_POOL_SIZE, max_pages=DYNAMIC_DRIVER_MAX_PAGES):
+        self.factory = factory
+        self.size = size
+        self.max_pages = max_pages
+        self._idle = queue.LifoQueue()  # 优先复用最近用过的驱动
+        self._slots = threading.BoundedSemaphore(size)
+        self._pages = {}  # id(driver) -> 已处理页面数
+        self._broken = set()
+        self._lock = threading.Lock()
+        self._closed = False
+    
+    @contextmanager
+    def lease(self):
+        """租用一个驱动，初始化失败时得到 None"""
+        self._slots.acquire()
+        driver = None
+        try:
+            driver = self._checkout()
+            yield driver
+        finally:
+            if driver:
+                self._checkin(driver)
+            self._slots.release()
+    
+    def mark_broken(self, driver):
+        """标记驱动已损坏，归还时直接销毁"""
+        with self._lock:
+            self._broken.add(id(driver))
+    
+    def _checkout(self):
+        """取出一个健康的空闲驱动，没有则新建"""
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if self._is_healthy(driver):
+                return driver
+            self._destroy(driver)
+        
+        driver = self.factory()
+        if driver:
+            with self._lock:
+                self._pages[id(driver)] = 0
+        return driver
+    
+    def _checkin(self, driver):
+        """归还驱动，达到页面上限或已损坏时销毁"""
+        with self._lock:
+            pages = self._pages.get(id(driver), 0) + 1
+            self._pages[id(driver)] = pages
+            broken = id(driver) in self._broken
+        
+        if self._closed or broken or pages >= self.max_pages:
+            self._destroy(driver)
+        else:
+            self._idle.put(driver)
+    
+    @staticmethod
+    def _is_healthy(driver):
+        """检查浏览器会话是否仍然可用"""
+        try:
+            driver.execute_script("return 1")
+            return True
+        except Exception:
+            return False
+    
+    def _destroy(self, driver):
+        """关闭驱动并清理记录"""
+        with self._lock:
+            self._pages.pop(id(driver), None)
+            self._broken.discard(id(driver))
+        try:
+            driver.quit()
+        except Exception:
+            pass
+    
+    def close(self):
+        """关闭所有空闲驱动（租出的驱动归还时会被销毁）"""
+        self._closed = True
+        while True:
+            try:
+                self._destroy(self._idle.get_nowait())
+            except queue.Empty:
+                break
 
 
 class DynamicCrawler:
     """动态网页爬虫（支持JavaScript）"""
     
-    @staticmethod
-    def setup_driver():
+    _driver_path = None  # chromedriver 路径，每个进程只解析一次
+    _pool = None
+    _lock = threading.Lock()
+    
+    @classmethod
+    def _resolve_driver_path(cls):
+        """
+        解析 chromedriver 路径（每个进程只执行一次）
+        
+        返回 webdriver-manager 安装的驱动路径；未安装 webdriver-manager 时返回空字符串，
+        表示使用系统的 chromedriver。
+        """
+        with cls._lock:
+            if cls._driver_path is None:
+                try:
+                    from webdriver_manager.chrome import ChromeDriverManager
+                    cls._driver_path = ChromeDriverManager().install()
+                    print("✅ 使用 webdriver-manager 自动管理驱动")
+                except ImportError:
+                    cls._driver_path = ""
+                    print("✅ 使用系统 chromedriver")
+            return cls._driver_path
+    
+    @classmethod
+    def pool(cls):
+        """获取共享的驱动池（首次调用时创建）"""
+        with cls._lock:
+            if cls._pool is None:
+                cls._pool = DriverPool(cls.setup_driver)
+                atexit.register(cls._pool.close)
+            return cls._pool
+    
+    @classmethod
+    def setup_driver(cls):
         """配置Chrome无头浏览器"""
         chrome_options = Options()
         chrome_options.add_argument('--headless')  # 无头模式
@@ -25,19 +172,18 @@ class DynamicCrawler:
         chrome_options.add_argument('--disable-gpu')
         chrome_options.add_argument('--window-size=1920,1080')
         chrome_options.add_argument('user-agent=Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36')
+        # DOM 解析完成即返回，剩余的等待交给 wait_until_ready
+        chrome_options.page_load_strategy = 'eager'
         
         try:
-            # 尝试使用 webdriver-manager 自动管理驱动
-            try:
-                from webdriver_manager.chrome import ChromeDriverManager
-                service = Service(ChromeDriverManager().install())
-                driver = webdriver.Chrome(service=service, options=chrome_options)
-                print("✅ 使用 webdriver-manager 自动管理驱动")
-            except ImportError:
+            driver_path = cls._resolve_driver_path()
+            if driver_path:
+                driver = webdriver.Chrome(service=Service(driver_path), options=chrome_options)
+            else:
                 # 如果没安装 webdriver-manager，使用系统的 chromedriver
                 driver = webdriver.Chrome(options=chrome_options)
-                print("✅ 使用系统 chromedriver")
             
+            driver.set_page_load_timeout(DYNAMIC_PAGE_LOAD_TIMEOUT)
             return driver
         except Exception as e:
             print(f"⚠️ Chrome驱动初始化失败: {e}")
@@ -45,85 +191,143 @@ class DynamicCrawler:
             return None
     
     @classmethod
-    def crawl_article(cls, url, wait_time=3):
+    def crawl_article(cls, url, max_wait=DYNAMIC_READY_TIMEOUT, use_cache=True):
         """
         爬取动态网页
         
         Args:
             url: 网页URL
-            wait_time: 等待JavaScript加载的时间（秒）
+            max_wait: 等待JavaScript加载的上限（秒），页面提前就绪时立即返回
+            use_cache: 是否使用爬取缓存（渲染结果没有校验信息，只按有效期判断）
         """
-        driver = None
-        try:
-            print(f" [→] 正在爬取（动态）: {url}")
-            
-            driver = cls.setup_driver()
+        start = time.perf_counter()
+        with Metrics.span("crawl", strategy="dynamic", host=HostLimiter.host_of(url)) as span:
+            article = cls._fetch_article(url, max_wait, use_cache, span)
+        DomainRouter.record(url, "dynamic", span.get("outcome"), article, time.perf_counter() - start)
+        if span.get("outcome") == "ok":
+            ArticleStore.save(article)
+        return article
+    
+    @classmethod
+    def _fetch_article(cls, url, max_wait, use_cache, span):
+        """渲染并提取文章，span 中记录结果类型"""
+        cache = CrawlCache.default() if use_cache and CRAWL_CACHE_ENABLED else None
+        cached = cache.lookup(url, "dynamic") if cache else None
+        if cached:
+            ttl = CRAWL_CACHE_TTL if cached["status"] == "ok" else CRAWL_CACHE_NEGATIVE_TTL
+            if cached["age"] < ttl:
+                cache.record(True)
+                span["outcome"] = "cache"
+                if cached["status"] != "ok":
+                    print(f" [!] 跳过近期失败的链接（动态，{cached['status']}）: {url}")
+                    return None
+                print(f" [✓] 缓存命中（动态）: {cached['title'][:50]}...")
+                return {
+                    "url": url,
+                    "title": cached["title"],
+                    "text": cached["text"],
+                    "publish_date": cached["publish_date"]
+                }
+        
+        with cls.pool().lease() as driver:
             if not driver:
+                span["outcome"] = "no_driver"
                 return None
+            status, article = cls._crawl_with_driver(driver, url, max_wait)
+        
+        span["outcome"] = status
+        if cache:
+            cache.record(False)
+            cache.store(url, "dynamic", status, article)
+        return article
+    
+    @classmethod
+    def wait_until_ready(cls, driver, max_wait=DYNAMIC_READY_TIMEOUT):
+        """
+        自适应等待页面就绪
+        
+        满足以下任一条件即返回：
+        1. 文档已解析且正文长度在 DYNAMIC_READY_STABLE 秒内不再增长
+        2. 文档加载完成且 DYNAMIC_READY_STABLE 秒内没有新的网络请求
+        
+        Returns:
+            (耗时秒数, 就绪原因)
+        """
+        start = time.monotonic()
+        last_text, last_resources = -1, -1
+        text_since = resources_since = start
+        
+        while True:
+            now = time.monotonic()
+            elapsed = now - start
+            if elapsed >= max_wait:
+                return elapsed, "超时"
             
-            # 访问页面
-            driver.get(url)
+            try:
+                state, text_length, resources = driver.execute_script(READY_PROBE_SCRIPT)
+            except Exception:
+                state, text_length, resources = "loading", 0, 0
             
-            # 等待页面加载
-            time.sleep(wait_time)
+            if text_length != last_text:
+                last_text, text_since = text_length, now
+            if resources != last_resources:
+                last_resources, resources_since = resources, now
             
-            # 尝试等待主要内容加载（多种可能的标签）
-            try:
-                WebDriverWait(driver, 10).until(
-                    lambda d: d.find_element(By.TAG_NAME, "article") or 
-                             d.find_element(By.TAG_NAME, "main") or
-                             d.find_elements(By.TAG_NAME, "p")
-                )
-            except:
-                pass  # 继续
+            if state != "loading" and text_length > 0 and now - text_since >= DYNAMIC_READY_STABLE:
+                return elapsed, "正文稳定"
+            if state == "complete" and now - resources_since >= DYNAMIC_READY_STABLE:
+                return elapsed, "网络空闲"
+            
+            time.sleep(DYNAMIC_READY_POLL)
+    
+    @staticmethod
+    def ready_stats():
+        """
+        当前运行的页面就绪耗时统计（页面数、p50、p95、最大值），用于调整等待上限
+        
+        就绪耗时以 dynamic_ready 记录在运行指标中，随 metrics.json 一起输出；不在运行指标上下文中时为空。
+        """
+        run = Metrics.current()
+        stats = run.span_summary().get("dynamic_ready") if run is not None else None
+        if not stats:
+            return {"pages": 0, "p50": 0.0, "p95": 0.0, "max": 0.0}
+        return {"pages": stats["count"], "p50": stats["p50"], "p95": stats["p95"], "max": stats["max"]}
+    
+    @classmethod
+    def _crawl_with_driver(cls, driver, url, max_wait):
+        """
+        使用租用的驱动爬取页面
+        
+        Returns:
+            (状态, 文章)，状态含义与 CrawlCache 相同，失败时文章为 None
+        """
+        try:
+            print(f" [→] 正在爬取（动态）: {url}")
+            
+            # 访问页面
+            driver.get(url)
             
-            # 额外等待，确保动态内容加载完成
-            time.sleep(2)
+            # 等待页面就绪（正文不再增长或网络空闲，最多 max_wait 秒）
+            elapsed, reason = cls.wait_until_ready(driver, max_wait)
+            Metrics.observe("dynamic_ready", elapsed)
+            Metrics.incr("dynamic_ready_seconds", round(elapsed, 3), reason=reason)
+            print(f"     ⏱️ 页面就绪 {elapsed:.2f}s（{reason}）")
             
             # 获取页面源码
             html = driver.page_source
+            Metrics.incr("crawl_bytes", len(html.encode("utf-8")), strategy="dynamic")
             
             # 调试：保存HTML看看
             # with open('/tmp/debug_page.html', 'w', encoding='utf-8') as f:
             #     f.write(html)
             # print(f"     调试：HTML已保存到 /tmp/debug_page.html")
             
-            soup = BeautifulSoup(html, 'html.parser')
-            
-            # 提取标题
-            title = ""
-            title_tags = ['h1', 'h2', 'title']
-            for tag in title_tags:
-                title_elem = soup.find(tag)
-                if title_elem and title_elem.get_text().strip():
-                    title = title_elem.get_text().strip()
-                    break
-            
-            # 提取正文 - 简单粗暴的方法
-            text = ""
-            
-            # 方法1：获取所有段落
-            paragraphs = soup.find_all('p')
-            if paragraphs:
-                para_text = '\n'.join([p.get_text(strip=True) for p in paragraphs])
-                if len(para_text) > 200:
-                    text = para_text
-            
-            # 方法2：如果段落不够，直接获取body
-            if len(text) < 200:
-                body = soup.find('body')
-                if body:
-                    # 只移除script和style
-                    for script in body(['script', 'style']):
-                        script.decompose()
-                    text = body.get_text(separator=' ', strip=True)
-            
-            # 简单清理：移除多余空格
-            text = ' '.join(text.split())
+            # 提取标题和正文（优先拼接所有段落，不够时退回整个 body）
+            title, text = extract_article(html)
             
             if len(text) > 200:
                 print(f" [✓] 成功（动态）: {title[:50]}... ({len(text)} 字)")
-                return {
+                return "ok", {
                     "url": url,
                     "title": title or "无标题",
                     "text": text
@@ -133,24 +337,23 @@ class DynamicCrawler:
                 # 调试：显示抓到的内容前100字
                 if text:
                     print(f"     抓到的内容: {text[:100]}...")
-                return None
+                return "short", None
                 
         except Exception as e:
             print(f" [!] 动态爬取失败: {url}")
             print(f"     错误: {str(e)[:100]}")
-            return None
-        finally:
-            if driver:
-                driver.quit()
+            # 出错后浏览器状态不可信，归还时重建
+            cls.pool().mark_broken(driver)
+            return "failed", None
     
     @classmethod
-    def crawl_articles(cls, urls, wait_time=3):
-        """批量爬取动态网页"""
-        articles = []
+    def crawl_articles(cls, urls, max_wait=DYNAMIC_READY_TIMEOUT):
+        """批量爬取动态网页（并发数等于驱动池大小，结果按输入顺序返回）"""
+        with ThreadPoolExecutor(max_workers=cls.pool().size) as executor:
+            results = list(executor.map(Metrics.bind(lambda url: cls.crawl_article(url, max_wait)), urls))
         
-        for url in urls:
-            article = cls.crawl_article(url, wait_time)
-            if article:
-                articles.append(article)
+        stats = cls.ready_stats()
+        if stats["pages"]:
+            print(f"⏱️ [Dynamic] 页面就绪耗时: p50 {stats['p50']}s, p95 {stats['p95']}s, 最大 {stats['max']}s（{stats['pages']} 页）")
         
-        return articles
+        return [article for article in results if article]
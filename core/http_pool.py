@@ -0,0 +1,101 @@
+"""
+HTTP 连接池模块
+搜索器和爬虫共享同一个 keep-alive 会话，重复访问同一主机时复用 TCP/TLS 连接
+"""
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlparse
+from config import SEARCH_HEADERS, HTTP_POOL_HOSTS, HTTP_POOL_MAXSIZE, HTTP_MAX_RETRIES
+
+
+class HttpPool:
+    """共享的 HTTP 连接池"""
+    
+    _session = None
+    _lock = threading.Lock()
+    
+    @classmethod
+    def session(cls):
+        """获取共享会话（首次调用时创建）"""
+        if cls._session is None:
+            with cls._lock:
+                if cls._session is None:
+                    cls._session = cls._create_session()
+        return cls._session
+    
+    @staticmethod
+    def _create_session():
+        """基于 SEARCH_HEADERS 创建带连接池的会话"""
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util import make_headers
+        
+        session = requests.Session()
+        session.headers.update(SEARCH_HEADERS)
+        # 由 urllib3 决定支持的压缩格式（安装了 brotli 时自动包含 br）
+        session.headers.update(make_headers(keep_alive=True, accept_encoding=True))
+        
+        adapter = HTTPAdapter(
+            pool_connections=HTTP_POOL_HOSTS,
+            pool_maxsize=HTTP_POOL_MAXSIZE,
+            max_retries=HTTP_MAX_RETRIES,
+            pool_block=False
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+    
+    @classmethod
+    def get(cls, url, headers=None, timeout=10, **kwargs):
+        """
+        通过连接池发送 GET 请求
+        
+        Args:
+            url: 请求地址
+            headers: 额外请求头（覆盖默认的 SEARCH_HEADERS）
+            timeout: 超时时间（秒）
+        """
+        return cls.session().get(url, headers=headers, timeout=timeout, **kwargs)
+    
+    @staticmethod
+    def decode(response):
+        """解码响应文本，服务器未声明编码时按内容猜测（避免中文页面乱码）"""
+        if 'charset' not in response.headers.get('Content-Type', '').lower():
+            response.encoding = response.apparent_encoding
+        return response.text
+    
+    @classmethod
+    def close(cls):
+        """关闭连接池"""
+        with cls._lock:
+            if cls._session is not None:
+                cls._session.close()
+                cls._session = None
+
+
+class HostLimiter:
+    """按站点限制并发数，避免对单个网站造成压力"""
+    
+    def __init__(self, per_host_limit):
+        self.per_host_limit = per_host_limit
+        self._semaphores = {}
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def host_of(url):
+        """提取 URL 的主机名（去掉 www. 前缀）"""
+        host = urlparse(url).netloc.lower()
+        return host[4:] if host.startswith('www.') else host
+    
+    @contextmanager
+    def limit(self, url):
+        """占用该 URL 所在站点的一个并发名额"""
+        host = self.host_of(url)
+        with self._lock:
+            semaphore = self._semaphores.get(host)
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(self.per_host_limit)
+                self._semaphores[host] = semaphore
+        
+        with semaphore:
+            yield
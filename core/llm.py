@@ -0,0 +1,210 @@
+"""
+LLM 调用模块
+统一的 DeepSeek 调用入口：429 / 5xx 时指数退避重试，限流状态在所有线程间共享；
+可选流式输出，生成中的内容通过回调实时转发（如 GUI 日志）
+"""
+import random
+import re
+import threading
+import time
+from core.metrics import Metrics
+from config import get_client, AI_MODEL, LLM_MAX_RETRIES, LLM_BACKOFF_BASE, LLM_BACKOFF_MAX, STREAM_LINE_CHARS
+
+
+# 中日韩字符
+CJK_PATTERN = re.compile(r'[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af]')
+
+
+class LLM:
+    """带限流感知的 DeepSeek 调用封装"""
+    
+    _client = None
+    _pause_until = 0.0  # 收到 429 后所有线程暂停到这个时间点
+    _lock = threading.Lock()
+    
+    @classmethod
+    def _get_client(cls):
+        """获取关闭了 SDK 内置重试的客户端（重试由本模块统一处理）"""
+        if cls._client is None:
+            cls._client = get_client().with_options(max_retries=0)
+        return cls._client
+    
+    @classmethod
+    def chat(cls, prompt, temperature, purpose="llm", on_token=None, **kwargs):
+        """
+        发送单轮对话请求，返回回复文本
+        
+        Args:
+            prompt: 用户消息
+            temperature: 采样温度
+            purpose: 调用用途（map / reduce / merge），用于区分运行指标
+            on_token: 流式回调，提供时以流式请求，每收到一段内容就调用 on_token(text)；
+                      重试时会从头重新输出
+            **kwargs: 透传给 chat.completions.create 的参数（如 response_format）
+        
+        Raises:
+            重试耗尽或不可重试的错误时抛出原始异常
+        """
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            cls._wait_if_paused()
+            try:
+                with Metrics.span("llm", purpose=purpose) as span:
+                    if on_token is None:
+                        response = cls._get_client().chat.completions.create(
+                            model=AI_MODEL,
+                            messages=[{"role": "user", "content": prompt}],
+                            temperature=temperature,
+                            **kwargs
+                        )
+                        content = response.choices[0].message.content
+                    else:
+                        content, response = cls._stream(prompt, temperature, purpose, on_token, **kwargs)
+                    span["outcome"] = "ok"
+                cls._record_usage(response, purpose)
+                return content.strip()
+            except Exception as e:
+                if attempt >= LLM_MAX_RETRIES or not cls._is_retryable(e):
+                    raise
+                
+                from openai import RateLimitError
+                delay = cls._backoff_delay(e, attempt)
+                if isinstance(e, RateLimitError):
+                    # 触发限流时让所有线程一起暂停，而不是各自继续撞墙
+                    cls._pause(delay)
+                Metrics.incr("llm_retries", purpose=purpose, reason=cls._describe(e))
+                print(f" [!] DeepSeek 请求失败（{cls._describe(e)}），{delay:.1f}s 后第 {attempt + 1} 次重试...")
+                time.sleep(delay)
+    
+    @classmethod
+    def _stream(cls, prompt, temperature, purpose, on_token, **kwargs):
+        """
+        流式请求
+        
+        Returns:
+            (完整回复, 带 usage 的最后一个分块)
+        """
+        start = time.perf_counter()
+        stream = cls._get_client().chat.completions.create(
+            model=AI_MODEL,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=temperature,
+            stream=True,
+            stream_options={"include_usage": True},
+            **kwargs
+        )
+        parts, usage_chunk = [], None
+        try:
+            for chunk in stream:
+                if getattr(chunk, "usage", None) is not None:
+                    usage_chunk = chunk
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    if not parts:
+                        Metrics.observe("llm_first_token", time.perf_counter() - start, purpose=purpose)
+                    parts.append(delta)
+                    on_token(delta)
+        finally:
+            stream.close()
+        return "".join(parts), usage_chunk
+    
+    @staticmethod
+    def _record_usage(response, purpose):
+        """记录 token 用量"""
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            Metrics.incr("llm_prompt_tokens", usage.prompt_tokens or 0, purpose=purpose)
+            Metrics.incr("llm_completion_tokens", usage.completion_tokens or 0, purpose=purpose)
+    
+    @staticmethod
+    def estimate_tokens(text):
+        """
+        估算文本的 token 数（不依赖分词器）
+        
+        按 DeepSeek 的经验值：1 个中文字符约 0.6 token，1 个英文字符约 0.3 token。
+        """
+        cjk = len(CJK_PATTERN.findall(text))
+        return int(cjk * 0.6 + (len(text) - cjk) * 0.3) + 1
+    
+    @staticmethod
+    def _is_retryable(error):
+        """429、5xx 和网络错误可以重试"""
+        from openai import APIConnectionError, APIStatusError
+        if isinstance(error, APIStatusError):
+            return error.status_code == 429 or error.status_code >= 500
+        return isinstance(error, APIConnectionError)
+    
+    @staticmethod
+    def _backoff_delay(error, attempt):
+        """计算退避时间：优先使用服务器的 Retry-After，否则指数退避加随机抖动"""
+        from openai import APIStatusError
+        if isinstance(error, APIStatusError):
+            retry_after = error.response.headers.get("retry-after")
+            try:
+                return min(float(retry_after), LLM_BACKOFF_MAX)
+            except (TypeError, ValueError):
+                pass
+        
+        delay = min(LLM_BACKOFF_BASE * (2 ** attempt), LLM_BACKOFF_MAX)
+        return delay * random.uniform(0.5, 1.0)
+    
+    @staticmethod
+    def _describe(error):
+        """简短描述错误"""
+        from openai import APIStatusError
+        if isinstance(error, APIStatusError):
+            return f"HTTP {error.status_code}"
+        return type(error).__name__
+    
+    @classmethod
+    def _pause(cls, delay):
+        """设置全局暂停时间"""
+        with cls._lock:
+            cls._pause_until = max(cls._pause_until, time.monotonic() + delay)
+    
+    @classmethod
+    def pause_remaining(cls):
+        """全局暂停还剩多少秒（异步调用方据此 await asyncio.sleep）"""
+        with cls._lock:
+            return cls._pause_until - time.monotonic()
+    
+    @classmethod
+    def _wait_if_paused(cls):
+        """如果处于全局暂停期，等待暂停结束"""
+        remaining = cls.pause_remaining()
+        if remaining > 0:
+            time.sleep(remaining)
+
+
+class TokenRelay:
+    """
+    把流式输出按行转发到日志回调（作为 LLM.chat 的 on_token 使用）
+    
+    模型输出的换行处断行，没有换行的长输出（如 JSON）每 STREAM_LINE_CHARS 个字符断一行，
+    结束后调用 close() 输出剩余内容。
+    """
+    
+    def __init__(self, log, prefix=""):
+        self.log = log
+        self.prefix = prefix
+        self._buffer = ""
+        self._lock = threading.Lock()
+    
+    def __call__(self, text):
+        with self._lock:
+            lines = (self._buffer + text).split("\n")
+            self._buffer = lines.pop()
+            while len(self._buffer) >= STREAM_LINE_CHARS:
+                lines.append(self._buffer[:STREAM_LINE_CHARS])
+                self._buffer = self._buffer[STREAM_LINE_CHARS:]
+        self._emit(lines)
+    
+    def close(self):
+        """输出缓冲中剩余的内容"""
+        with self._lock:
+            lines, self._buffer = [self._buffer], ""
+        self._emit(lines)
+    
+    def _emit(self, lines):
+        for line in lines:
+            if line.strip():
+                self.log(f"{self.prefix}{line.rstrip()}")
@@ -0,0 +1,293 @@
+"""
+运行指标模块
+记录每个阶段的耗时（span）和计数器（counter），按运行导出为 JSON 或 Prometheus 文本格式
+
+当前运行保存在 contextvars 中，同一进程内并行的多个运行互不干扰；
+提交到线程池的任务需要用 Metrics.bind 包装，才能记录到发起它的运行中。
+没有活动的运行时，所有记录操作都是空操作。
+"""
+import contextvars
+import json
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+_current_run = contextvars.ContextVar("news_metrics_run", default=None)
+
+
+def _percentile(sorted_values, p):
+    """取已排序列表的百分位数"""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(p * len(sorted_values)))]
+
+
+def _stats(values):
+    """计算一组耗时的统计信息"""
+    values = sorted(values)
+    return {
+        "count": len(values),
+        "total": round(sum(values), 3),
+        "p50": round(_percentile(values, 0.50), 3),
+        "p95": round(_percentile(values, 0.95), 3),
+        "max": round(values[-1], 3) if values else 0.0
+    }
+
+
+class RunMetrics:
+    """单次运行的指标集合"""
+    
+    def __init__(self, name):
+        self.name = name
+        self.started_at = datetime.now()
+        self._start = time.perf_counter()
+        self._stages = {}  # 阶段名 -> [开始偏移, 结束偏移]
+        self._spans = []
+        self._counters = {}
+        self._lock = threading.Lock()
+    
+    def stage_started(self, stage):
+        """记录阶段开始时间（同名阶段以第一次开始为准）"""
+        offset = time.perf_counter() - self._start
+        with self._lock:
+            self._stages.setdefault(stage, [offset, None])
+    
+    def stage_finished(self, stage):
+        """记录阶段结束时间（同名阶段以最后一次结束为准）"""
+        offset = time.perf_counter() - self._start
+        with self._lock:
+            self._stages.setdefault(stage, [offset, None])[1] = offset
+    
+    def record_span(self, name, seconds, labels):
+        """记录一次操作的耗时"""
+        with self._lock:
+            self._spans.append({"name": name, "seconds": round(seconds, 4), "labels": dict(labels)})
+    
+    def incr(self, name, value=1, **labels):
+        """累加计数器"""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+    
+    def counter_total(self, name):
+        """计数器在所有标签组合上的合计"""
+        with self._lock:
+            return sum(value for (counter, _), value in self._counters.items() if counter == name)
+    
+    def compression_summary(self):
+        """
+        Map 输入压缩情况
+        
+        Returns:
+            {"input_tokens", "compressed_tokens", "ratio", "saved_tokens"}，本次运行没有调用 Map 时返回 None
+        """
+        original = self.counter_total("map_input_tokens")
+        if not original:
+            return None
+        compressed = self.counter_total("map_compressed_tokens")
+        return {
+            "input_tokens": original,
+            "compressed_tokens": compressed,
+            "ratio": round(compressed / original, 3),
+            "saved_tokens": original - compressed
+        }
+    
+    def stage_breakdown(self):
+        """
+        各阶段耗时（流式流水线中阶段会重叠，各阶段之和可能大于总耗时）
+        
+        Returns:
+            [{"stage", "start", "seconds"}]，按开始时间排序
+        """
+        with self._lock:
+            stages = sorted(self._stages.items(), key=lambda item: item[1][0])
+        return [
+            {"stage": stage, "start": round(start, 3), "seconds": round((end if end is not None else start) - start, 3)}
+            for stage, (start, end) in stages
+        ]
+    
+    def span_summary(self):
+        """按操作名以及「操作名 + 单个标签」分组的耗时统计"""
+        groups = {}
+        with self._lock:
+            spans = list(self._spans)
+        for span in spans:
+            groups.setdefault(span["name"], []).append(span["seconds"])
+            for key, value in span["labels"].items():
+                groups.setdefault(f'{span["name"]}{{{key}="{value}"}}', []).append(span["seconds"])
+        return {group: _stats(values) for group, values in sorted(groups.items())}
+    
+    def to_dict(self):
+        """导出为可 JSON 序列化的字典"""
+        with self._lock:
+            counters = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(self._counters.items())
+            ]
+            spans = list(self._spans)
+        return {
+            "run": self.name,
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "elapsed": round(time.perf_counter() - self._start, 3),
+            "stages": self.stage_breakdown(),
+            "compression": self.compression_summary(),
+            "spans": self.span_summary(),
+            "counters": counters,
+            "events": spans
+        }
+    
+    def to_prometheus(self, prefix="news"):
+        """导出为 Prometheus 文本格式"""
+        lines = [f"# TYPE {prefix}_stage_seconds gauge"]
+        for stage in self.stage_breakdown():
+            lines.append(f'{prefix}_stage_seconds{_label_text({"stage": stage["stage"]})} {stage["seconds"]}')
+        
+        grouped = {}
+        with self._lock:
+            for span in self._spans:
+                key = (span["name"], tuple(sorted(span["labels"].items())))
+                grouped.setdefault(key, []).append(span["seconds"])
+            counters = sorted(self._counters.items())
+        
+        lines.append(f"# TYPE {prefix}_span_seconds summary")
+        for (name, labels), values in sorted(grouped.items()):
+            text = _label_text({"span": name, **dict(labels)})
+            lines.append(f"{prefix}_span_seconds_count{text} {len(values)}")
+            lines.append(f"{prefix}_span_seconds_sum{text} {round(sum(values), 4)}")
+        
+        declared = set()
+        for (name, labels), value in counters:
+            metric = f"{prefix}_{_metric_name(name)}_total"
+            if metric not in declared:
+                lines.append(f"# TYPE {metric} counter")
+                declared.add(metric)
+            lines.append(f"{metric}{_label_text(dict(labels))} {value}")
+        
+        return "\n".join(lines) + "\n"
+    
+    def format_breakdown(self):
+        """生成便于阅读的阶段耗时文本（每个阶段一行）"""
+        lines = [f"⏱️ Stage timing (total {round(time.perf_counter() - self._start, 2)}s):"]
+        for stage in self.stage_breakdown():
+            lines.append(f"   {stage['stage']:<8} {stage['seconds']:>7.2f}s  (starts at {stage['start']:.2f}s)")
+        return lines
+    
+    def save(self, directory, basename, prometheus=False):
+        """
+        写入 <basename>.metrics.json（以及可选的 <basename>.prom）
+        
+        Returns:
+            写入的文件路径列表
+        """
+        os.makedirs(directory, exist_ok=True)
+        json_path = os.path.join(directory, f"{basename}.metrics.json")
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        paths = [json_path]
+        
+        if prometheus:
+            prom_path = os.path.join(directory, f"{basename}.prom")
+            with open(prom_path, "w", encoding="utf-8") as f:
+                f.write(self.to_prometheus())
+            paths.append(prom_path)
+        return paths
+
+
+def _metric_name(name):
+    """转换为合法的 Prometheus 指标名"""
+    return re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+def _label_text(labels):
+    """格式化 Prometheus 标签"""
+    if not labels:
+        return ""
+    
+    def escape(value):
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    
+    return "{" + ",".join(f'{_metric_name(key)}="{escape(value)}"' for key, value in sorted(labels.items())) + "}"
+
+
+class Metrics:
+    """访问当前运行指标的入口"""
+    
+    @staticmethod
+    def current():
+        """当前活动的运行，没有时返回 None"""
+        return _current_run.get()
+    
+    @staticmethod
+    @contextmanager
+    def activate(run):
+        """在当前上下文中激活一个运行"""
+        token = _current_run.set(run)
+        try:
+            yield run
+        finally:
+            _current_run.reset(token)
+    
+    @staticmethod
+    def bind(fn):
+        """包装要提交到其他线程的函数，使其记录到当前运行"""
+        run = _current_run.get()
+        if run is None:
+            return fn
+        
+        def wrapper(*args, **kwargs):
+            token = _current_run.set(run)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _current_run.reset(token)
+        return wrapper
+    
+    @staticmethod
+    @contextmanager
+    def stage(name):
+        """记录一个流水线阶段的起止时间"""
+        run = _current_run.get()
+        if run is None:
+            yield
+            return
+        run.stage_started(name)
+        try:
+            yield
+        finally:
+            run.stage_finished(name)
+    
+    @staticmethod
+    @contextmanager
+    def span(name, **labels):
+        """
+        记录一次操作的耗时
+        
+        返回的标签字典可以在操作过程中补充（例如 outcome），异常退出时 outcome 记为 error。
+        """
+        run = _current_run.get()
+        start = time.perf_counter()
+        try:
+            yield labels
+        except BaseException:
+            labels.setdefault("outcome", "error")
+            raise
+        finally:
+            if run is not None:
+                run.record_span(name, time.perf_counter() - start, labels)
+    
+    @staticmethod
+    def observe(name, seconds, **labels):
+        """记录一次已经测得的耗时（与 span 一起汇总），用于无法包成 with 块的时间点，如首个 token 到达"""
+        run = _current_run.get()
+        if run is not None:
+            run.record_span(name, seconds, labels)
+    
+    @staticmethod
+    def incr(name, value=1, **labels):
+        """累加当前运行的计数器"""
+        run = _current_run.get()
+        if run is not None:
+            run.incr(name, value, **labels)
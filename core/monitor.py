@@ -0,0 +1,166 @@
+"""
+关键词监控状态模块
+同一关键词定期重复分析时，保存已处理过的链接、摘要和上一次的整合结果，
+下一次只爬取和总结新出现的链接，再把新摘要合并进上一次的结果，每次运行的开销与新增新闻量成正比
+"""
+import json
+import os
+import threading
+import time
+from core.cache import SqliteCache
+from config import CACHE_DIR, MONITOR_MAX_MB
+
+
+class MonitorState(SqliteCache):
+    """
+    监控状态
+
+    monitor_articles 以 (关键词, URL) 为键保存处理过的文章，status 取值：
+        summarized  已总结，参与整合
+        duplicate   与已收录的文章重复，只记录链接避免重复爬取
+    monitor_reports 保存每个关键词最近一次的整合结果（JSON）。
+    爬取失败的链接不记录，下次运行时重新尝试（失败结果由爬取缓存兜底，不会反复请求）。
+    超出大小上限时按关键词整体淘汰（见 _evict），不会只丢掉某个关键词的部分文章。
+    """
+
+    TABLE = "monitor_articles"
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS monitor_articles (
+        keyword TEXT NOT NULL,
+        url TEXT NOT NULL,
+        status TEXT NOT NULL,
+        title TEXT,
+        text TEXT,
+        summary TEXT,
+        first_seen REAL NOT NULL,
+        size INTEGER NOT NULL,
+        last_access REAL NOT NULL,
+        PRIMARY KEY (keyword, url)
+    );
+    CREATE INDEX IF NOT EXISTS idx_monitor_access ON monitor_articles(last_access);
+    CREATE TABLE IF NOT EXISTS monitor_reports (
+        keyword TEXT PRIMARY KEY,
+        data TEXT NOT NULL,
+        updated_at REAL NOT NULL
+    );
+    """
+
+    SUMMARIZED = "summarized"
+    DUPLICATE = "duplicate"
+
+    _default = None
+    _default_lock = threading.Lock()
+
+    @classmethod
+    def default(cls):
+        """获取进程内共享的实例"""
+        with cls._default_lock:
+            if cls._default is None:
+                cls._default = cls(os.path.join(CACHE_DIR, "monitor.db"), MONITOR_MAX_MB * 1024 * 1024)
+            return cls._default
+
+    def seen_urls(self, keyword):
+        """该关键词处理过的全部链接（包括重复文章）"""
+        rows = self._execute("SELECT url FROM monitor_articles WHERE keyword = ?", (keyword,))
+        return {url for url, in rows}
+
+    def articles(self, keyword, limit=None):
+        """
+        该关键词已总结的文章（按首次出现的顺序）
+
+        Args:
+            keyword: 关键词
+            limit: 只返回最近的多少篇，None 表示全部
+
+        Returns:
+            [{"url", "title", "text", "summary"}, ...]
+        """
+        with self._lock:
+            rows = self._execute(
+                "SELECT url, title, text, summary FROM monitor_articles "
+                "WHERE keyword = ? AND status = ? ORDER BY first_seen DESC, rowid DESC LIMIT ?",
+                (keyword, self.SUMMARIZED, -1 if limit is None else limit)
+            )
+            if rows:
+                self._execute("UPDATE monitor_articles SET last_access = ? WHERE keyword = ?", (time.time(), keyword))
+        return [
+            {"url": url, "title": title or "", "text": text or "", "summary": summary}
+            for url, title, text, summary in reversed(rows)
+        ]
+
+    def last_result(self, keyword):
+        """上一次的整合结果，没有时返回 None"""
+        rows = self._execute("SELECT data FROM monitor_reports WHERE keyword = ?", (keyword,))
+        return json.loads(rows[0][0]) if rows else None
+
+    def save_run(self, keyword, articles, summaries, duplicates, data):
+        """
+        记录一次运行的结果
+
+        Args:
+            keyword: 关键词
+            articles: 本次新总结的文章
+            summaries: 与 articles 一一对应的摘要
+            duplicates: 本次判定为重复的文章
+            data: 本次的整合结果
+        """
+        now = time.time()
+        rows = [
+            (keyword, article['url'], self.SUMMARIZED, article['title'], article['text'], summary)
+            for article, summary in zip(articles, summaries)
+        ] + [
+            (keyword, article['url'], self.DUPLICATE, article['title'], None, None)
+            for article in duplicates
+        ]
+        payload = json.dumps(data, ensure_ascii=False)
+
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute("BEGIN")
+                conn.executemany(
+                    "INSERT OR REPLACE INTO monitor_articles "
+                    "(keyword, url, status, title, text, summary, first_seen, size, last_access) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        row + (now, sum(len((value or "").encode("utf-8")) for value in row[1:]), now)
+                        for row in rows
+                    ]
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO monitor_reports (keyword, data, updated_at) VALUES (?, ?, ?)",
+                    (keyword, payload, now)
+                )
+            self._evict()
+
+    def _evict(self):
+        """
+        总大小超过上限时，按关键词整体清除最久未使用的监控状态，直到降到上限的 90%
+
+        监控状态不是缓存：只删掉部分文章会让这些链接在下次运行时被当成新链接，
+        重新总结后再次合并进整合结果，因此文章和整合结果总是一起删除。
+        """
+        with self._lock:
+            total = self._execute("SELECT COALESCE(SUM(size), 0) FROM monitor_articles")[0][0]
+            if total <= self.max_bytes:
+                return
+            
+            target = total - int(self.max_bytes * 0.9)
+            freed, keywords = 0, []
+            for keyword, size in self._execute(
+                "SELECT keyword, SUM(size) FROM monitor_articles GROUP BY keyword ORDER BY MAX(last_access)"
+            ):
+                if freed >= target:
+                    break
+                keywords.append(keyword)
+                freed += size
+            
+            for keyword in keywords:
+                self.forget(keyword)
+        print(f"🧹 [Monitor] 超出大小上限，清除了 {len(keywords)} 个关键词的监控状态，下次运行时重新完整分析")
+    
+    def forget(self, keyword):
+        """清除关键词的监控状态，下次运行重新完整分析"""
+        with self._lock:
+            self._execute("DELETE FROM monitor_articles WHERE keyword = ?", (keyword,))
+            self._execute("DELETE FROM monitor_reports WHERE keyword = ?", (keyword,))
@@ -0,0 +1,194 @@
+"""
+HTML 解析模块
+搜索结果页和动态页面只需要少数容器和锚点：优先使用 lxml 解析整个文档（C 实现，比 html.parser 快一个数量级），
+未安装时回退到 BeautifulSoup + SoupStrainer，只构建需要的标签，不生成完整的文档树
+"""
+import re
+from urllib.parse import unquote
+
+# 不计入正文的标签
+SKIPPED_TAGS = ("script", "style", "noscript", "template")
+
+_lxml_html = None
+
+
+def _lxml():
+    """延迟导入 lxml.html，未安装时返回 None"""
+    global _lxml_html
+    if _lxml_html is None:
+        try:
+            import lxml.html
+            _lxml_html = lxml.html
+        except ImportError:
+            _lxml_html = False
+    return _lxml_html or None
+
+
+def backend():
+    """当前使用的解析后端名称"""
+    return "lxml" if _lxml() else "html.parser"
+
+
+def _parse(html):
+    """用 lxml 解析文档，空文档返回 None"""
+    lxml_html = _lxml()
+    if not html or not html.strip():
+        return None
+    try:
+        return lxml_html.document_fromstring(html)
+    except ValueError:
+        # 带 <?xml encoding=...?> 声明的 Unicode 字符串不能直接解析，按字节重新解析
+        try:
+            return lxml_html.document_fromstring(html.encode("utf-8"))
+        except Exception:
+            return None
+    except Exception:
+        return None
+
+
+def _class_xpath(tag, css_class):
+    """匹配 class 属性中包含某个类名的 XPath（与 BeautifulSoup 的 class_ 语义一致）"""
+    return f"//{tag}[contains(concat(' ', normalize-space(@class), ' '), ' {css_class} ')]"
+
+
+def container_links(html, selectors):
+    """
+    依次尝试多组结果容器，返回第一组命中容器中各自第一个链接的 href
+
+    Args:
+        html: 页面源码
+        selectors: [(tag, css_class, href_only), ...]；
+                   href_only 为 True 时取容器中第一个带 href 的 <a>，否则取第一个 <a>（没有 href 则跳过该容器）
+
+    Returns:
+        href 列表（保持页面顺序）
+    """
+    if _lxml():
+        doc = _parse(html)
+        if doc is None:
+            return []
+        for tag, css_class, href_only in selectors:
+            containers = doc.xpath(_class_xpath(tag, css_class))
+            if not containers:
+                continue
+            links = []
+            for container in containers:
+                anchors = container.xpath("(.//a[@href])[1]" if href_only else "(.//a)[1]")
+                href = anchors[0].get("href") if anchors else None
+                if href:
+                    links.append(href)
+            return links
+        return []
+
+    from bs4 import BeautifulSoup, SoupStrainer
+    # 多值 class（如 "result c-container"）需按单词边界匹配
+    classes = "|".join(re.escape(css_class) for _, css_class, _ in selectors)
+    strainer = SoupStrainer(
+        [tag for tag, _, _ in selectors],
+        class_=re.compile(rf"(^|\s)({classes})(\s|$)")
+    )
+    soup = BeautifulSoup(html or "", "html.parser", parse_only=strainer)
+    for tag, css_class, href_only in selectors:
+        containers = soup.find_all(tag, class_=css_class)
+        if not containers:
+            continue
+        links = []
+        for container in containers:
+            anchor = container.find("a", href=True) if href_only else container.find("a")
+            if anchor and anchor.get("href"):
+                links.append(anchor.get("href"))
+        return links
+    return []
+
+
+def anchor_hrefs(html, prefix=""):
+    """返回页面中所有以 prefix 开头的 <a href>"""
+    if _lxml():
+        doc = _parse(html)
+        if doc is None:
+            return []
+        return [href for href in doc.xpath("//a/@href") if href.startswith(prefix)]
+
+    from bs4 import BeautifulSoup, SoupStrainer
+    soup = BeautifulSoup(html or "", "html.parser", parse_only=SoupStrainer("a", href=True))
+    return [a["href"] for a in soup.find_all("a", href=True) if a["href"].startswith(prefix)]
+
+
+def parse_baidu_results(html):
+    """百度新闻结果页：div.result，找不到时退回 div.c-container"""
+    return container_links(html, [("div", "result", False), ("div", "c-container", False)])
+
+
+def parse_google_results(html):
+    """Google 结果页：div.yuRUbf"""
+    return container_links(html, [("div", "yuRUbf", True)])
+
+
+def parse_google_redirects(html):
+    """Google 结果页的备用解析：提取 /url?q= 跳转链接中的目标地址"""
+    return [unquote(href.split("/url?q=")[1].split("&")[0]) for href in anchor_hrefs(html, "/url?q=")]
+
+
+def parse_bing_results(html):
+    """Bing 结果页：li.b_algo"""
+    return container_links(html, [("li", "b_algo", True)])
+
+
+def extract_article(html, min_length=200):
+    """
+    从渲染后的页面中提取标题和正文（动态爬虫使用）
+
+    标题取第一个非空的 h1 / h2 / title；正文优先拼接所有 <p>，不足 min_length 时退回整个 body 的文本
+
+    Returns:
+        (title, text)，text 已合并多余空白
+    """
+    if _lxml():
+        doc = _parse(html)
+        if doc is None:
+            return "", ""
+        title = ""
+        for tag in ("h1", "h2", "title"):
+            elements = doc.xpath(f"(//{tag})[1]")
+            if elements and elements[0].text_content().strip():
+                title = elements[0].text_content().strip()
+                break
+
+        for element in doc.xpath("|".join(f"//{tag}" for tag in SKIPPED_TAGS)):
+            element.drop_tree()
+
+        text = ""
+        paragraphs = doc.xpath("//p")
+        if paragraphs:
+            para_text = "\n".join("".join(s.strip() for s in p.itertext()) for p in paragraphs)
+            if len(para_text) > min_length:
+                text = para_text
+        if len(text) < min_length:
+            body = doc.find("body")
+            if body is not None:
+                text = " ".join(s.strip() for s in body.itertext() if s.strip())
+        return title, " ".join(text.split())
+
+    from bs4 import BeautifulSoup, SoupStrainer
+    soup = BeautifulSoup(html or "", "html.parser", parse_only=SoupStrainer(["h1", "h2", "title", "p"]))
+    title = ""
+    for tag in ("h1", "h2", "title"):
+        element = soup.find(tag)
+        if element and element.get_text().strip():
+            title = element.get_text().strip()
+            break
+
+    text = ""
+    paragraphs = soup.find_all("p")
+    if paragraphs:
+        # 只构建了上面几种标签，<p> 内嵌的 script / style 文本由 get_text 跳过
+        para_text = "\n".join(p.get_text(strip=True) for p in paragraphs)
+        if len(para_text) > min_length:
+            text = para_text
+    if len(text) < min_length:
+        body = BeautifulSoup(html or "", "html.parser", parse_only=SoupStrainer("body")).find("body")
+        if body:
+            for element in body(list(SKIPPED_TAGS)):
+                element.decompose()
+            text = body.get_text(separator=" ", strip=True)
+    return title, " ".join(text.split())
@@ -0,0 +1,433 @@
+"""
+流式分析流水线
+搜索 → 爬取 → 增量去重 → Map 各阶段通过有界队列衔接，爬到一篇就去重并送去总结，
+最后一篇摘要完成后立即开始 Reduce；增量模式下只处理上次运行之后新出现的链接；
+文章也可以直接取自本地文章库（不联网），或先取本地文章再用搜索结果补足；
+渐进模式下模型输出实时写入日志，报告预览随摘要完成逐步更新，整合完成后在原位置写入最终报告
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from core.searcher import NewsSearcher, TIMELIMIT_SECONDS
+from core.crawler import NewsCrawler
+from core.dedup import NearDuplicateIndex
+from core.cluster import StoryClusters
+from core.analyzer import NewsAnalyzer
+from core.llm import LLM, TokenRelay
+from core.cache import SummaryCache
+from core.monitor import MonitorState
+from core.store import ArticleStore
+from core.metrics import Metrics, RunMetrics
+from core.reporter import ReportGenerator
+from config import (
+    MAP_MAX_WORKERS, PIPELINE_QUEUE_SIZE,
+    SUMMARY_CACHE_ENABLED, METRICS_ENABLED, METRICS_PROMETHEUS,
+    MAP_BATCH_WAIT, MAP_BATCH_TOKEN_BUDGET, MAP_BATCH_MAX_ARTICLES, PREVIEW_REFRESH_INTERVAL,
+    MONITOR_SEED_ARTICLES
+)
+
+# 爬取阶段结束的标记
+_DONE = object()
+
+
+class PipelineError(Exception):
+    """流水线无法继续（没有搜索结果、全部爬取失败等），消息可直接展示给用户"""
+
+
+class StreamingPipeline:
+    """流式 Map-Reduce 流水线"""
+    
+    # 文章来源：web 搜索并爬取；store 只用本地文章库；both 先取本地文章，不足 max_links 时用搜索结果补足
+    WEB = "web"
+    STORE = "store"
+    BOTH = "both"
+    SOURCES = (WEB, STORE, BOTH)
+    
+    def __init__(self, keyword, max_links, timelimit='a', use_dynamic=True, log=print, incremental=False, source=WEB,
+                 progressive=False, on_preview=None):
+        """
+        Args:
+            keyword: 事件关键词
+            max_links: 搜索的链接数量
+            timelimit: 时间范围
+            use_dynamic: 静态爬取失败时是否回退到动态爬虫
+            log: 日志回调（GUI 中为 log_signal.emit）
+            incremental: 监控模式，跳过上次运行已处理的链接，把新摘要合并进上一次的结果
+            source: 文章来源（WEB / STORE / BOTH）
+            progressive: 渐进模式，单篇总结和整合的模型输出实时写入日志，并在搜索完成后写出报告预览，
+                         之后随摘要完成更新，generate_report 在同一位置写入最终报告
+            on_preview: 预览首次写出时以其路径调用（如 GUI 打开浏览器）
+        """
+        if source not in self.SOURCES:
+            raise ValueError(f"Unknown article source: {source}")
+        self.keyword = keyword
+        self.max_links = max_links
+        self.timelimit = timelimit
+        self.use_dynamic = use_dynamic
+        self.log = log
+        self.incremental = incremental
+        self.source = source
+        self.metrics = RunMetrics(keyword)
+        self.progressive = progressive
+        self.on_preview = on_preview
+        self.report_path = None  # 渐进模式下预览与最终报告的路径
+        self._crawled = queue.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+        self._stop = threading.Event()  # 去重/Map 阶段异常退出时通知爬取阶段停止
+        self._known_articles = []
+        self._sources = []  # 预览中列出的来源链接
+        self._summarized = {}  # 预览中已完成的摘要：编号 → {"url", "title", "summary"}
+        self._preview_lock = threading.Lock()
+        self._preview_at = 0.0
+        self._preview_final = False
+        self._started = None
+    
+    def run(self):
+        """
+        执行流水线
+        
+        Returns:
+            结构化分析结果（已附带 sources）
+        
+        Raises:
+            PipelineError: 流水线无法产出结果
+        """
+        self._started = time.monotonic()
+        with Metrics.activate(self.metrics):
+            try:
+                return self._run()
+            except Exception as e:
+                # 已打开的预览页面会一直自动刷新，写入不再刷新的最终预览，说明运行失败
+                if self.report_path is not None:
+                    self._preview(f"Analysis failed: {e}", final=True)
+                raise
+    
+    def generate_report(self, data):
+        """生成 HTML 报告（附带阶段耗时），并在报告旁写入本次运行的指标"""
+        self.log("📝 Generating HTML report...")
+        with Metrics.activate(self.metrics), Metrics.stage("report"):
+            data["timings"] = self.metrics.stage_breakdown()
+            report_path = ReportGenerator.generate(self.keyword, data, self.report_path)
+        
+        if METRICS_ENABLED:
+            basename = os.path.splitext(os.path.basename(report_path))[0]
+            self.metrics.save(os.path.dirname(report_path), basename, prometheus=METRICS_PROMETHEUS)
+        
+        for line in self.metrics.format_breakdown():
+            self.log(line)
+        return report_path
+    
+    def _run(self):
+        """按阶段执行流水线（在指标上下文中调用）"""
+        # 1. Seed from the local article store and/or search news
+        seeded, links = [], []
+        if self.source != self.WEB:
+            with Metrics.stage("store"):
+                seeded = ArticleStore.default().search(
+                    self.keyword, self.max_links, TIMELIMIT_SECONDS.get(self.timelimit)
+                )
+            self.log(f"📚 Found {len(seeded)} matching articles in the local store")
+            if self.source == self.STORE and not seeded:
+                raise PipelineError("No stored articles match this keyword. Run a web search first.")
+        
+        if self.source != self.STORE and len(seeded) < self.max_links:
+            self.log(f"🔍 Searching for '{self.keyword}'...")
+            with Metrics.stage("search"):
+                links = NewsSearcher.search(self.keyword, self.max_links, self.timelimit)
+            if not links and not seeded:
+                raise PipelineError("No news links found")
+            
+            stored = {article['url'] for article in seeded}
+            links = [link for link in links if link not in stored][:self.max_links - len(seeded)]
+            self.log(f"✅ Found {len(links)} links")
+            for i, link in enumerate(links, 1):
+                self.log(f"   [{i}] {link}")
+        
+        state, previous = None, None
+        if self.incremental:
+            state = MonitorState.default()
+            previous = state.last_result(self.keyword)
+            seen = state.seen_urls(self.keyword)
+            links = [link for link in links if link not in seen]
+            seeded = [article for article in seeded if article['url'] not in seen]
+            self.log(f"🔁 Monitor mode: {len(links) + len(seeded)} new articles/links ({len(seen)} processed in earlier runs)")
+            if previous and not links and not seeded:
+                self.log("✅ No new articles since the last run, reusing the previous analysis")
+                return dict(previous, new_sources=[])
+            # 新文章也要和之前收录的文章去重、聚类；只取最近的文章，开销不随关键词的历史增长
+            self._known_articles = state.articles(self.keyword, MONITOR_SEED_ARTICLES)
+        
+        self._sources = [article['url'] for article in seeded] + links
+        self._preview("Crawling and summarizing articles...", force=True)
+        
+        # 2. Crawl in the background, feeding the bounded queue
+        self.log("📄 Crawling, deduplicating and summarizing as articles arrive...")
+        crawler = threading.Thread(target=Metrics.bind(self._crawl_stage), args=(links, seeded), daemon=True)
+        crawler.start()
+        
+        # 3 + 4. Deduplicate incrementally and dispatch to the Map stage
+        try:
+            articles, summaries, clusters, duplicates, earlier_followers, crawled_count = self._dedup_and_map_stage()
+        finally:
+            # 正常结束时爬取已完成；异常退出时让爬取停止，并清空队列使阻塞在 put 上的爬取线程退出
+            self._stop.set()
+            while crawler.is_alive():
+                try:
+                    self._crawled.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            crawler.join()
+        
+        # 并入之前运行已总结报道的新文章：不再总结，链接计入来源
+        earlier_sources = [article['url'] for article in earlier_followers]
+        if previous and not articles:
+            # 新链接全部失败、重复或属于已总结的报道：记录链接，沿用上一次的结果
+            self.log(f"✅ No new unique articles ({crawled_count} crawled), reusing the previous analysis")
+            data = dict(previous, sources=list(dict.fromkeys(previous.get("sources", []) + earlier_sources)))
+            state.save_run(self.keyword, [], [], duplicates + earlier_followers, data)
+            return dict(data, new_sources=earlier_sources)
+        if not crawled_count:
+            raise PipelineError(f"Failed to crawl articles. All {len(links)} links failed. Check if they are blocked domains or have anti-crawling protection.")
+        if not articles:
+            raise PipelineError("No articles after deduplication")
+        
+        unique_count = sum(len(members) for members in clusters)
+        if unique_count > len(articles):
+            self.log(f"✅ Crawled {crawled_count} articles, {unique_count} unique in {len(articles)} story clusters, "
+                     f"one summary per cluster")
+        else:
+            self.log(f"✅ Crawled {crawled_count} articles, {len(articles)} unique, all summarized")
+        if SUMMARY_CACHE_ENABLED:
+            stats = SummaryCache.default().stats()
+            self.log(f"💾 Summary cache: {stats['hits']} hits, {stats['misses']} misses")
+        compression = self.metrics.compression_summary()
+        if compression:
+            self.log(f"✂️ Map input compressed to {compression['ratio']:.0%} "
+                     f"({compression['input_tokens']} → {compression['compressed_tokens']} tokens, "
+                     f"{compression['saved_tokens']} saved)")
+        
+        # 5. Reduce starts as soon as the last summary lands
+        if previous:
+            self.log(f"✨ Merging {len(articles)} new summaries into the previous analysis...")
+        else:
+            self.log("✨ Consolidating summaries...")
+        self._sources = NewsAnalyzer.cluster_sources(articles, clusters)
+        self._preview(f"All {len(articles)} articles summarized, consolidating...", force=True)
+        relay = TokenRelay(self.log, "   ✍️ ") if self.progressive else None
+        try:
+            with Metrics.stage("reduce"):
+                if previous:
+                    data = NewsAnalyzer.update(previous, articles, summaries, self.keyword, clusters, relay)
+                else:
+                    data = NewsAnalyzer.reduce(articles, summaries, self.keyword, clusters, relay)
+        finally:
+            if relay:
+                relay.close()
+        if isinstance(data, str):
+            raise PipelineError(f"AI analysis failed: {data}")
+        
+        if state:
+            # 未单独总结的簇成员与重复文章一样只记录链接
+            followers = [member for members in clusters for member in members[1:]]
+            data["sources"] = list(dict.fromkeys(data["sources"] + earlier_sources))
+            state.save_run(self.keyword, articles, summaries, duplicates + followers + earlier_followers, data)
+            if previous:
+                data["new_sources"] = NewsAnalyzer.cluster_sources(articles, clusters) + earlier_sources
+        if self.progressive:
+            # 最终报告保留预览中的单篇摘要（不写入监控状态）
+            data["article_summaries"] = self._article_summaries()
+        
+        self.log("✅ AI analysis complete")
+        return data
+    
+    def _article_summaries(self):
+        """已完成的单篇摘要（按搜索结果顺序）"""
+        with self._preview_lock:
+            return [self._summarized[index] for index in sorted(self._summarized)]
+    
+    def _on_summarized(self, items, future):
+        """总结任务完成的回调（在 Map 线程中执行）：记录摘要并刷新预览"""
+        if future.exception() is not None:
+            return
+        with self._preview_lock:
+            if not self._summarized:
+                Metrics.observe("first_summary", time.monotonic() - self._started)
+            for (link_index, article, _), summary in zip(items, future.result()):
+                self._summarized[link_index] = {"url": article['url'], "title": article['title'], "summary": summary}
+            count = len(self._summarized)
+        self._preview(f"{count} articles summarized so far...")
+    
+    def _preview(self, status, force=False, final=False):
+        """
+        写入渐进式报告的预览（非渐进模式时忽略）
+        
+        摘要密集完成时按 PREVIEW_REFRESH_INTERVAL 节流，force 时总是写入。
+        final 时写入不再自动刷新的预览（运行失败时使用），之后的更新都被忽略。预览写入失败只记录日志。
+        """
+        if not self.progressive:
+            return
+        with self._preview_lock:
+            now = time.monotonic()
+            if self._preview_final or (not force and not final and now - self._preview_at < PREVIEW_REFRESH_INTERVAL):
+                return
+            self._preview_at = now
+            self._preview_final = final
+            first = self.report_path is None
+            data = {
+                "status": status,
+                "sources": list(self._sources),
+                "article_summaries": [self._summarized[index] for index in sorted(self._summarized)]
+            }
+            if not final:
+                data["refresh"] = PREVIEW_REFRESH_INTERVAL
+            try:
+                if first:
+                    self.report_path = ReportGenerator.report_path(self.keyword)
+                ReportGenerator.preview(self.report_path, self.keyword, data)
+            except OSError as e:
+                self.log(f"⚠️ Failed to write the report preview: {e}")
+                return
+        
+        if first:
+            self.log(f"🌐 Live report preview (refreshes as summaries arrive): {self.report_path}")
+            if self.on_preview:
+                self.on_preview(self.report_path)
+    
+    def _crawl_stage(self, links, seeded=()):
+        """
+        先放入文章库中的文章，再按站点路由爬取所有链接（NewsCrawler.crawl_routed），每完成一篇就放入队列
+        
+        队列中的编号：文章库中的文章在前，链接按搜索结果顺序排在其后。
+        """
+        offset = len(seeded)
+        try:
+            for index, article in enumerate(seeded):
+                if self._stop.is_set():
+                    return
+                self._crawled.put((index, article))
+            
+            with Metrics.stage("crawl"):
+                NewsCrawler.crawl_routed(
+                    links,
+                    lambda index, article: self._crawled.put((offset + index, article)),
+                    use_dynamic=self.use_dynamic,
+                    log=self.log,
+                    stop=self._stop
+                )
+        except Exception as e:
+            self.log(f"⚠️ Crawl stage error: {e}")
+        finally:
+            self._crawled.put(_DONE)
+    
+    def _dedup_and_map_stage(self):
+        """
+        从队列取出文章，增量去重后立即提交总结
+        
+        与已有事件簇代表足够相似的文章并入该簇，不再单独总结；增量模式下之前运行已总结的文章也作为簇代表，
+        并入这些簇的新文章不再总结，单独返回。
+        短文章先攒成一批再合并总结（攒够 token 预算或篇数、等待超过 MAP_BATCH_WAIT、爬取结束时提交），
+        其余文章单独提交。在途的总结任务数有上限，Map 跟不上时停止取队列，爬取阶段随之被阻塞。
+        
+        Returns:
+            (按搜索结果顺序排列的簇代表, 对应的摘要, 对应的簇成员列表, 重复的文章,
+             并入之前运行已总结报道的文章, 爬取成功的文章数)
+        """
+        index = NearDuplicateIndex()
+        clusters = StoryClusters()
+        known_clusters = set()  # 之前运行已总结过的报道
+        for article in self._known_articles:
+            index.add(article)
+            known_clusters.add(clusters.assign(article)[0])
+        positions = {}
+        duplicates = []
+        earlier_followers = []
+        in_flight = threading.BoundedSemaphore(MAP_MAX_WORKERS + PIPELINE_QUEUE_SIZE)
+        pending = []
+        batch, batch_tokens = [], 0
+        crawled_count = 0
+        
+        def summarize(texts, relay=None):
+            try:
+                with Metrics.stage("map"):
+                    if len(texts) == 1:
+                        return [NewsAnalyzer.summarize_article(texts[0], on_token=relay)]
+                    return NewsAnalyzer.summarize_batch(texts)
+            finally:
+                if relay:
+                    relay.close()
+                in_flight.release()
+        
+        def submit(items, number=None):
+            in_flight.acquire()
+            # 单篇总结的输出以日志中的文章编号为前缀，几篇并行输出时也能区分
+            relay = TokenRelay(self.log, f"      ✍️ [{number}] ") if self.progressive and number else None
+            future = executor.submit(Metrics.bind(summarize), [article['text'] for _, article, _ in items], relay)
+            for slot, (link_index, article, cluster_id) in enumerate(items):
+                pending.append((link_index, article, future, slot, cluster_id))
+            if self.progressive:
+                future.add_done_callback(Metrics.bind(lambda done: self._on_summarized(items, done)))
+        
+        def flush():
+            nonlocal batch, batch_tokens
+            if batch:
+                if len(batch) > 1:
+                    self.log(f"   📦 Summarizing {len(batch)} short articles in one request")
+                submit(batch)
+                batch, batch_tokens = [], 0
+        
+        with ThreadPoolExecutor(max_workers=MAP_MAX_WORKERS) as executor:
+            while True:
+                try:
+                    item = self._crawled.get(timeout=MAP_BATCH_WAIT if batch else None)
+                except queue.Empty:
+                    # 爬取暂时没有新文章，不再等待凑批
+                    flush()
+                    continue
+                if item is _DONE:
+                    flush()
+                    break
+                
+                link_index, article = item
+                crawled_count += 1
+                with Metrics.stage("dedup"), Metrics.span("dedup"):
+                    duplicate = index.check_and_add(article)
+                if duplicate:
+                    self.log(f"   🔄 Duplicate skipped ({duplicate[1]}%): {article['title'][:40]}")
+                    duplicates.append(article)
+                    continue
+                
+                positions[id(article)] = link_index
+                with Metrics.stage("cluster"):
+                    cluster_id, is_new = clusters.assign(article)
+                if cluster_id in known_clusters:
+                    self.log(f"   🧩 Same story as an earlier run: {clusters.members[cluster_id][0]['title'][:40]}, not summarized again")
+                    earlier_followers.append(article)
+                    continue
+                if not is_new:
+                    members = clusters.members[cluster_id]
+                    self.log(f"   🧩 Same story as: {members[0]['title'][:40]} (cluster of {len(members)}), not summarized separately")
+                    continue
+                
+                self.log(f"   📄 [{crawled_count}] {article['title'][:40]} → summarizing")
+                if not NewsAnalyzer.is_batchable(article['text']):
+                    submit([(link_index, article, cluster_id)], crawled_count)
+                    continue
+                
+                tokens = LLM.estimate_tokens(article['text'])
+                if batch and (batch_tokens + tokens > MAP_BATCH_TOKEN_BUDGET or len(batch) >= MAP_BATCH_MAX_ARTICLES):
+                    flush()
+                batch.append((link_index, article, cluster_id))
+                batch_tokens += tokens
+            
+            # 按搜索结果顺序排列，摘要编号与单次运行保持一致
+            pending.sort(key=lambda item: item[0])
+            articles = [article for _, article, _, _, _ in pending]
+            summaries = [future.result()[slot] for _, _, future, slot, _ in pending]
+            # 簇成员按搜索结果顺序排在代表之后
+            members = [
+                [article] + sorted(clusters.members[cluster_id][1:], key=lambda member: positions[id(member)])
+                for _, article, _, _, cluster_id in pending
+            ]
+        
+        return articles, summaries, members, duplicates, earlier_followers, crawled_count
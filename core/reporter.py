@@ -1,8 +1,10 @@
 """
 报告生成模块
+渐进式报告先写入预览（来源和已完成的单篇摘要，页面自动刷新），整合结果完成后在同一位置写入最终报告
 """
 import os
 from datetime import datetime
+from core.metrics import Metrics
 from templates.report_template import generate_html_content
 
 
@@ -20,22 +22,39 @@ class ReportGenerator:
             print(f"📁 创建报告目录: {cls.OUTPUT_DIR}/")
     
     @classmethod
-    def generate(cls, keyword, data):
-        """生成 HTML 报告"""
-        # 确保输出目录存在
+    def report_path(cls, keyword):
+        """新报告的文件路径（文件名包含时间戳避免覆盖）"""
         cls._ensure_output_dir()
-        
-        # 生成文件名（包含时间戳避免覆盖）
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"{keyword}_{timestamp}.html".replace(" ", "_")
-        filepath = os.path.join(cls.OUTPUT_DIR, filename)
+        return os.path.abspath(os.path.join(cls.OUTPUT_DIR, filename))
+    
+    @staticmethod
+    def _write(filepath, html_content):
+        """先写临时文件再替换，浏览器刷新时不会读到写了一半的页面"""
+        temp_path = f"{filepath}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(html_content)
+        os.replace(temp_path, filepath)
+    
+    @classmethod
+    def generate(cls, keyword, data, filepath=None):
+        """
+        生成 HTML 报告
         
-        # 生成 HTML 内容
-        html_content = generate_html_content(keyword, data)
+        Args:
+            filepath: 报告路径，None 时生成新文件名；渐进式报告传入预览的路径，在原位置写入最终版本
+        """
+        filepath = filepath or cls.report_path(keyword)
         
-        # 写入文件
-        with open(filepath, "w", encoding="utf-8") as f:
-            f.write(html_content)
+        with Metrics.span("report"):
+            cls._write(filepath, generate_html_content(keyword, data))
         
         print(f"✅ 报告已保存: {filepath}")
-        return os.path.abspath(filepath)
+        return filepath
+    
+    @classmethod
+    def preview(cls, filepath, keyword, data):
+        """写入渐进式报告的预览（data 需带 status，页面按 data['refresh'] 秒自动刷新）"""
+        with Metrics.span("preview"):
+            cls._write(filepath, generate_html_content(keyword, data))
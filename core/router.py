@@ -0,0 +1,187 @@
+"""
+站点爬取策略路由模块
+按站点记录静态 / 动态爬取的成功率、正文长度和耗时，之后直接把链接交给最可能成功的方式，
+两种方式都几乎必然失败的站点直接跳过；被绕开的站点按一定概率重新试探，避免站点恢复后一直被绕开
+"""
+import os
+import random
+import threading
+import time
+from core.cache import SqliteCache
+from core.http_pool import HostLimiter
+from core.metrics import Metrics
+from config import (
+    CACHE_DIR, ROUTER_ENABLED, ROUTER_MIN_TRIALS, ROUTER_MIN_SUCCESS, ROUTER_LENGTH_RATIO,
+    ROUTER_REPROBE, ROUTER_DECAY, ROUTER_MAX_MB
+)
+
+# 参与统计的爬取结果（缓存命中、304、无可用驱动等不反映站点本身的情况）
+OBSERVED_STATUSES = ("ok", "short", "blocked", "failed")
+
+
+class DomainProfiles(SqliteCache):
+    """
+    站点统计
+
+    以 (站点, 爬取方式) 为键，保存按 ROUTER_DECAY 衰减的尝试次数和成功次数，
+    以及成功时正文长度和每次耗时的指数移动平均。
+    """
+
+    TABLE = "domains"
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS domains (
+        host TEXT NOT NULL,
+        strategy TEXT NOT NULL,
+        trials REAL NOT NULL,
+        successes REAL NOT NULL,
+        avg_length REAL NOT NULL,
+        avg_seconds REAL NOT NULL,
+        updated_at REAL NOT NULL,
+        size INTEGER NOT NULL,
+        last_access REAL NOT NULL,
+        PRIMARY KEY (host, strategy)
+    );
+    CREATE INDEX IF NOT EXISTS idx_domains_access ON domains(last_access);
+    """
+
+    _default = None
+    _default_lock = threading.Lock()
+
+    @classmethod
+    def default(cls):
+        """获取进程内共享的实例"""
+        with cls._default_lock:
+            if cls._default is None:
+                cls._default = cls(os.path.join(CACHE_DIR, "domains.db"), ROUTER_MAX_MB * 1024 * 1024)
+            return cls._default
+
+    def profile(self, host):
+        """
+        查询站点统计
+
+        Returns:
+            {strategy: {"trials", "successes", "success_rate", "avg_length", "avg_seconds"}}
+        """
+        with self._lock:
+            rows = self._execute(
+                "SELECT strategy, trials, successes, avg_length, avg_seconds FROM domains WHERE host = ?",
+                (host,)
+            )
+            if rows:
+                self._execute("UPDATE domains SET last_access = ? WHERE host = ?", (time.time(), host))
+        return {
+            strategy: {
+                "trials": trials,
+                "successes": successes,
+                "success_rate": successes / trials if trials else 0.0,
+                "avg_length": avg_length,
+                "avg_seconds": avg_seconds
+            }
+            for strategy, trials, successes, avg_length, avg_seconds in rows
+        }
+
+    def observe(self, host, strategy, success, length, seconds):
+        """记录一次爬取结果"""
+        now = time.time()
+        with self._lock:
+            rows = self._execute(
+                "SELECT trials, successes, avg_length, avg_seconds FROM domains WHERE host = ? AND strategy = ?",
+                (host, strategy)
+            )
+            if rows:
+                trials, successes, avg_length, avg_seconds = rows[0]
+                weight = 1 - ROUTER_DECAY
+                avg_seconds += weight * (seconds - avg_seconds)
+                if success:
+                    avg_length = length if not successes else avg_length + weight * (length - avg_length)
+                trials = trials * ROUTER_DECAY + 1
+                successes = successes * ROUTER_DECAY + (1 if success else 0)
+            else:
+                trials, successes = 1.0, (1.0 if success else 0.0)
+                avg_length, avg_seconds = (length if success else 0.0), seconds
+
+            self._execute(
+                "INSERT OR REPLACE INTO domains "
+                "(host, strategy, trials, successes, avg_length, avg_seconds, updated_at, size, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (host, strategy, trials, successes, avg_length, avg_seconds, now, len(host) + 64, now)
+            )
+            self._evict()
+
+
+class DomainRouter:
+    """按站点统计选择爬取方式"""
+
+    STATIC = "static"
+    DYNAMIC = "dynamic"
+    SKIP = "skip"
+
+    @staticmethod
+    def _usable(stats):
+        """
+        判断一种爬取方式在站点上是否可用
+
+        Returns:
+            None 表示尝试次数不足（需要继续试探），否则为 True / False
+        """
+        if not stats or stats["trials"] < ROUTER_MIN_TRIALS:
+            return None
+        return stats["success_rate"] >= ROUTER_MIN_SUCCESS
+
+    @staticmethod
+    def _prefer_dynamic(static, dynamic):
+        """
+        两种方式都可用时，判断是否直接动态渲染
+
+        - 正文长度：动态的平均正文长度达到静态的 ROUTER_LENGTH_RATIO 倍，说明静态只取到了片段
+        - 耗时：比较每得到一篇文章的期望耗时，静态优先的流程包括静态失败后再动态渲染的时间
+        """
+        if dynamic["avg_length"] >= ROUTER_LENGTH_RATIO * max(static["avg_length"], 1.0):
+            return True
+        static_rate, dynamic_rate = static["success_rate"], max(dynamic["success_rate"], 1e-6)
+        static_first = (
+            (static["avg_seconds"] + (1 - static_rate) * dynamic["avg_seconds"])
+            / (static_rate + (1 - static_rate) * dynamic_rate)
+        )
+        return dynamic["avg_seconds"] / dynamic_rate < static_first
+
+    @classmethod
+    def route(cls, url, use_dynamic=True):
+        """
+        为链接选择爬取方式
+
+        - static：先静态爬取，失败再交给动态爬虫（原有流程，也是没有统计时的默认值）
+        - dynamic：静态爬取在该站点基本失败，或两种方式都可用而动态渲染的正文明显更完整
+                   或每篇的期望耗时更短（见 _prefer_dynamic），直接动态渲染
+        - skip：两种方式都基本失败，不再浪费请求
+
+        被绕开或跳过的站点按 ROUTER_REPROBE 的概率重新走 static 流程，以便发现站点恢复。
+        """
+        if not ROUTER_ENABLED:
+            return cls.STATIC
+
+        profile = DomainProfiles.default().profile(HostLimiter.host_of(url))
+        static_usable = cls._usable(profile.get(cls.STATIC))
+        dynamic_usable = use_dynamic and cls._usable(profile.get(cls.DYNAMIC))
+        if static_usable and dynamic_usable and cls._prefer_dynamic(profile[cls.STATIC], profile[cls.DYNAMIC]):
+            decision = cls.DYNAMIC
+        elif static_usable is not False:
+            decision = cls.STATIC
+        elif use_dynamic and cls._usable(profile.get(cls.DYNAMIC)) is not False:
+            decision = cls.DYNAMIC
+        else:
+            decision = cls.SKIP
+
+        if decision != cls.STATIC and random.random() < ROUTER_REPROBE:
+            Metrics.incr("route_reprobes")
+            decision = cls.STATIC
+        Metrics.incr("routes", decision=decision)
+        return decision
+
+    @classmethod
+    def record(cls, url, strategy, status, article, seconds):
+        """记录一次爬取结果（status 取值与 CrawlCache 相同，其他结果类型忽略）"""
+        if not ROUTER_ENABLED or status not in OBSERVED_STATUSES:
+            return
+        length = len(article["text"]) if article else 0
+        DomainProfiles.default().observe(HostLimiter.host_of(url), strategy, status == "ok", length, seconds)
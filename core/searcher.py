@@ -1,48 +1,146 @@
 """
 新闻搜索模块
 """
-import requests
 import time
-from bs4 import BeautifulSoup
-from config import SEARCH_HEADERS, GOOGLE_COOKIE
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from urllib.parse import quote
+from core.http_pool import HttpPool
+from core.parsing import parse_baidu_results, parse_google_results, parse_google_redirects, parse_bing_results
+from core.cache import SearchCache
+from core.metrics import Metrics
+from config import (
+    GOOGLE_COOKIE, SEARCH_CONCURRENT, SEARCH_DEADLINE,
+    SEARCH_CACHE_ENABLED, SEARCH_CACHE_TTL
+)
+
+# 时间范围（timelimit）对应的秒数，'a' 表示不限
+TIMELIMIT_SECONDS = {
+    'd': 24 * 3600,
+    'w': 7 * 24 * 3600,
+    'm': 30 * 24 * 3600,
+    'y': 365 * 24 * 3600,
+}
 
 
 class NewsSearcher:
     """新闻搜索器"""
     
+    # 搜索引擎地址
+    BAIDU_URL = "https://www.baidu.com/s"
+    GOOGLE_URL = "https://www.google.com.hk/search"
+    BING_URL = "https://www.bing.com/search"
+    
+    # 难以爬取的网站黑名单
+    BLOCKED_DOMAINS = [
+        'zhihu.com', 'weibo.com', 'twitter.com', 'facebook.com',
+        'instagram.com', 'youtube.com', 'bilibili.com', 'douyin.com'
+    ]
+    
+    # 各引擎结果中需要排除的站内链接
+    EXCLUDED_LINKS = {
+        'google': ['google.com', 'youtube.com', 'webcache.googleusercontent.com'],
+        'bing': ['bing.com', 'microsoft.com', 'youtube.com'],
+    }
+    
+    @staticmethod
+    def engine_headers(engine):
+        """各引擎请求时附加的浏览器请求头（百度使用连接池的默认请求头）"""
+        if engine == 'google':
+            return {
+                'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
+                'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
+                'Cookie': GOOGLE_COOKIE,
+                'Referer': 'https://www.google.com/',
+                'Sec-Fetch-Dest': 'document',
+                'Sec-Fetch-Mode': 'navigate',
+                'Sec-Fetch-Site': 'same-origin',
+                'Sec-Fetch-User': '?1',
+                'Upgrade-Insecure-Requests': '1',
+                'Cache-Control': 'max-age=0'
+            }
+        if engine == 'bing':
+            return {
+                'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+                'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
+                'Referer': 'https://www.bing.com/'
+            }
+        return None
+    
+    @classmethod
+    def accept_link(cls, engine, url):
+        """判断引擎结果页中的链接是否是外部新闻链接"""
+        if engine == 'baidu':
+            return 'baidu.com' not in url or 'baijiahao.baidu.com' in url
+        return url.startswith('http') and not any(x in url for x in cls.EXCLUDED_LINKS[engine])
+    
     @staticmethod
-    def search_baidu(keyword, max_results=10):
+    def _time_range(timelimit):
+        """把 timelimit 转换为 (起始时间戳, 结束时间戳)，不限时间时返回 None"""
+        seconds = TIMELIMIT_SECONDS.get(timelimit)
+        if not seconds:
+            return None
+        end = int(time.time())
+        return end - seconds, end
+    
+    @classmethod
+    def build_baidu_url(cls, keyword, timelimit='a'):
+        """构造百度新闻搜索地址（时间范围使用 gpc 参数）"""
+        url = f"{cls.BAIDU_URL}?tn=news&rtt=1&bsst=1&cl=2&wd={keyword}"
+        time_range = cls._time_range(timelimit)
+        if time_range:
+            url += "&gpc=" + quote(f"stf={time_range[0]},{time_range[1]}|stftype=1")
+        return url
+    
+    @classmethod
+    def build_google_url(cls, keyword, max_results, timelimit='a'):
+        """构造 Google 搜索地址（时间范围使用 tbs=qdr 参数）"""
+        search_query = f"{keyword} 新闻"
+        url = f"{cls.GOOGLE_URL}?q={quote(search_query)}&num={max_results}&hl=zh-CN"
+        if timelimit in TIMELIMIT_SECONDS:
+            url += f"&tbs=qdr:{timelimit}"
+        return url
+    
+    @classmethod
+    def build_bing_url(cls, keyword, max_results, timelimit='a'):
+        """构造 Bing 搜索地址（时间范围使用 filters=ex1 参数）"""
+        search_query = f"{keyword} 新闻"
+        url = f"{cls.BING_URL}?q={quote(search_query)}&count={max_results * 2}&setlang=zh-CN"
+        
+        # ez1/ez2/ez3 分别为过去一天/一周/一月，一年没有预设值，用 ez5 自定义区间（单位：天）
+        presets = {'d': 'ez1', 'w': 'ez2', 'm': 'ez3'}
+        if timelimit in presets:
+            url += "&filters=" + quote(f'ex1:"{presets[timelimit]}"')
+        elif timelimit == 'y':
+            start, end = cls._time_range(timelimit)
+            url += "&filters=" + quote(f'ex1:"ez5_{start // 86400}_{end // 86400}"')
+        return url
+    
+    @staticmethod
+    def search_baidu(keyword, max_results=10, timelimit='a'):
         """使用百度新闻搜索"""
         news_links = []
         
         try:
             print(f"🔍 [Baidu] 正在搜索: {keyword}")
             
-            search_url = f"https://www.baidu.com/s?tn=news&rtt=1&bsst=1&cl=2&wd={keyword}"
-            response = requests.get(search_url, headers=SEARCH_HEADERS, timeout=10)
+            search_url = NewsSearcher.build_baidu_url(keyword, timelimit)
+            response = HttpPool.get(search_url, timeout=10)
             response.encoding = 'utf-8'
             
             if response.status_code != 200:
                 return []
             
-            soup = BeautifulSoup(response.text, 'html.parser')
-            results = soup.find_all('div', class_='result')
-            
-            if not results:
-                results = soup.find_all('div', class_='c-container')
-            
             count = 0
-            for result in results:
+            for url in parse_baidu_results(response.text):
                 if count >= max_results:
                     break
                 
-                link_tag = result.find('a')
-                if link_tag and link_tag.get('href'):
-                    url = link_tag.get('href')
-                    if 'baidu.com' not in url or 'baijiahao.baidu.com' in url:
-                        news_links.append(url)
-                        print(f"✅ 找到链接 {count + 1}: {url[:80]}...")
-                        count += 1
+                if NewsSearcher.accept_link('baidu', url):
+                    news_links.append(url)
+                    print(f"✅ 找到链接 {count + 1}: {url[:80]}...")
+                    count += 1
             
             return news_links
             
@@ -51,7 +149,7 @@ class NewsSearcher:
             return []
     
     @staticmethod
-    def search_google(keyword, max_results=10):
+    def search_google(keyword, max_results=10, timelimit='a'):
         """使用 Google 搜索（支持 Cookie）"""
         news_links = []
         
@@ -63,75 +161,37 @@ class NewsSearcher:
             print(f"🔍 [Google] 正在搜索: {keyword}")
             
             # Google 搜索 URL
-            search_query = f"{keyword} 新闻"
-            search_url = f"https://www.google.com.hk/search?q={requests.utils.quote(search_query)}&num={max_results}&hl=zh-CN"
+            search_url = NewsSearcher.build_google_url(keyword, max_results, timelimit)
             
-            # 模拟浏览器请求头（包含 Cookie）
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
-                'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
-                'Accept-Encoding': 'gzip, deflate, br',
-                'Cookie': GOOGLE_COOKIE,
-                'Referer': 'https://www.google.com/',
-                'Sec-Fetch-Dest': 'document',
-                'Sec-Fetch-Mode': 'navigate',
-                'Sec-Fetch-Site': 'same-origin',
-                'Sec-Fetch-User': '?1',
-                'Upgrade-Insecure-Requests': '1',
-                'Cache-Control': 'max-age=0'
-            }
-            
-            # 发送请求
-            response = requests.get(search_url, headers=headers, timeout=15)
+            # 发送请求（模拟浏览器请求头，包含 Cookie）
+            response = HttpPool.get(search_url, headers=NewsSearcher.engine_headers('google'), timeout=15)
             
             if response.status_code != 200:
                 print(f"⚠️ Google 返回状态码: {response.status_code}")
                 return []
             
-            # 解析 HTML
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
             # 方法1：查找 class="yuRUbf" 的 div（Google 搜索结果容器）
             count = 0
-            for div in soup.find_all('div', class_='yuRUbf'):
+            for url in parse_google_results(response.text):
                 if count >= max_results:
                     break
                 
-                a_tag = div.find('a', href=True)
-                if a_tag:
-                    url = a_tag['href']
-                    if url.startswith('http') and not any(x in url for x in [
-                        'google.com',
-                        'youtube.com',
-                        'webcache.googleusercontent.com'
-                    ]):
-                        news_links.append(url)
-                        print(f"✅ 找到链接 {count + 1}: {url[:80]}...")
-                        count += 1
+                if NewsSearcher.accept_link('google', url):
+                    news_links.append(url)
+                    print(f"✅ 找到链接 {count + 1}: {url[:80]}...")
+                    count += 1
             
-            # 方法2：如果方法1没找到，尝试查找所有 <a> 标签
+            # 方法2：如果方法1没找到，提取所有 /url?q= 跳转链接
             if not news_links:
                 print("⚠️ 尝试备用解析方式...")
-                for link in soup.find_all('a', href=True):
+                for url in parse_google_redirects(response.text):
                     if count >= max_results:
                         break
                     
-                    href = link['href']
-                    
-                    # 提取以 /url?q= 开头的链接
-                    if href.startswith('/url?q='):
-                        url = href.split('/url?q=')[1].split('&')[0]
-                        url = requests.utils.unquote(url)
-                        
-                        if url.startswith('http') and not any(x in url for x in [
-                            'google.com',
-                            'youtube.com',
-                            'webcache.googleusercontent.com'
-                        ]):
-                            news_links.append(url)
-                            print(f"✅ 找到链接 {count + 1}: {url[:80]}...")
-                            count += 1
+                    if NewsSearcher.accept_link('google', url):
+                        news_links.append(url)
+                        print(f"✅ 找到链接 {count + 1}: {url[:80]}...")
+                        count += 1
             
             return news_links
             
@@ -140,7 +200,7 @@ class NewsSearcher:
             return []
     
     @staticmethod
-    def search_bing(keyword, max_results=10):
+    def search_bing(keyword, max_results=10, timelimit='a'):
         """使用 Bing 搜索（更友好的反爬虫策略）"""
         news_links = []
         
@@ -148,48 +208,27 @@ class NewsSearcher:
             print(f"🔍 [Bing] 正在搜索: {keyword}")
             
             # Bing 搜索 URL
-            search_query = f"{keyword} 新闻"
-            search_url = f"https://www.bing.com/search?q={requests.utils.quote(search_query)}&count={max_results * 2}&setlang=zh-CN"
-            
-            # 模拟浏览器请求头
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-                'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
-                'Referer': 'https://www.bing.com/'
-            }
+            search_url = NewsSearcher.build_bing_url(keyword, max_results, timelimit)
             
-            # 发送请求
-            response = requests.get(search_url, headers=headers, timeout=10)
+            # 发送请求（模拟浏览器请求头）
+            response = HttpPool.get(search_url, headers=NewsSearcher.engine_headers('bing'), timeout=10)
             response.encoding = 'utf-8'
             
             if response.status_code != 200:
                 print(f"⚠️ Bing 返回状态码: {response.status_code}")
                 return []
             
-            # 解析 HTML
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
             # Bing 搜索结果通常在 <li class="b_algo"> 中
             count = 0
-            for result in soup.find_all('li', class_='b_algo'):
+            for url in parse_bing_results(response.text):
                 if count >= max_results:
                     break
                 
-                # 查找链接
-                link = result.find('a', href=True)
-                if link:
-                    url = link['href']
-                    
-                    # 过滤掉不相关的链接
-                    if url and url.startswith('http') and not any(x in url for x in [
-                        'bing.com',
-                        'microsoft.com',
-                        'youtube.com'
-                    ]):
-                        news_links.append(url)
-                        print(f"✅ 找到链接 {count + 1}: {url[:80]}...")
-                        count += 1
+                # 过滤掉不相关的链接
+                if NewsSearcher.accept_link('bing', url):
+                    news_links.append(url)
+                    print(f"✅ 找到链接 {count + 1}: {url[:80]}...")
+                    count += 1
             
             return news_links
             
@@ -199,7 +238,7 @@ class NewsSearcher:
 
 
     @classmethod
-    def search(cls, keyword, max_results=10, timelimit='a'):
+    def search(cls, keyword, max_results=10, timelimit='a', concurrent=SEARCH_CONCURRENT, deadline=SEARCH_DEADLINE, use_cache=True):
         """
         综合搜索（智能组合多个搜索引擎）
         
@@ -208,19 +247,21 @@ class NewsSearcher:
         2. 如果数量不够，用百度补充
         3. 如果还不够，用 Bing 补充
         4. 自动去重，确保链接唯一
+        
+        Args:
+            keyword: 搜索关键词
+            max_results: 目标链接数量
+            timelimit: 时间范围（'a' 不限，'d' / 'w' / 'm' / 'y' 为过去一天/一周/一月/一年）
+            concurrent: 是否同时请求所有引擎（结果仍按 Google > 百度 > Bing 合并）
+            deadline: 并发模式下的全局截止时间（秒），超时的引擎结果被丢弃
+            use_cache: 是否使用搜索结果缓存（SEARCH_CACHE_TTL 内不重复请求同一引擎）
         """
         all_links = []
         seen_urls = set()  # 用于去重
         
-        # 难以爬取的网站黑名单
-        blocked_domains = [
-            'zhihu.com', 'weibo.com', 'twitter.com', 'facebook.com',
-            'instagram.com', 'youtube.com', 'bilibili.com', 'douyin.com'
-        ]
-        
         def is_valid_url(url):
             """检查URL是否有效（不在黑名单中）"""
-            return not any(domain in url for domain in blocked_domains)
+            return not any(domain in url for domain in cls.BLOCKED_DOMAINS)
         
         def add_unique_links(new_links):
             """添加链接并去重"""
@@ -234,10 +275,57 @@ class NewsSearcher:
                     print(f"   ⚠️ 过滤黑名单网站: {url[:50]}...")
             return added
         
+        def search_engine(engine, count):
+            """请求单个引擎，优先读取缓存"""
+            return cls._search_engine(engine, keyword, count, timelimit, use_cache)
+        
+        if concurrent:
+            cls._search_concurrent(max_results, deadline, all_links, add_unique_links, search_engine)
+        else:
+            cls._search_sequential(max_results, all_links, add_unique_links, search_engine)
+        
+        # 最终结果
+        if all_links:
+            print(f"\n🎉 搜索完成！共找到 {len(all_links)} 篇文章")
+        else:
+            print("\n❌ 所有搜索引擎都未找到结果")
+        
+        return all_links
+    
+    @classmethod
+    def _search_engine(cls, engine, keyword, count, timelimit, use_cache):
+        """
+        请求单个搜索引擎
+        
+        Args:
+            engine: 'google' / 'baidu' / 'bing'
+            count: 请求的结果数量
+        """
+        cache = SearchCache.default() if use_cache and SEARCH_CACHE_ENABLED else None
+        with Metrics.span("search", engine=engine) as span:
+            links = cache.get(engine, keyword, timelimit, count, SEARCH_CACHE_TTL) if cache else None
+            span["outcome"] = "cache" if links is not None else "fetched"
+            
+            if links is not None:
+                print(f"💾 [{engine}] 使用缓存的搜索结果（{len(links)} 条）")
+            else:
+                search_fn = getattr(cls, f"search_{engine}")
+                links = search_fn(keyword, count, timelimit)
+                
+                # 空结果可能是临时失败，不缓存
+                if cache and links:
+                    cache.put(engine, keyword, timelimit, count, links)
+        
+        Metrics.incr("search_results", len(links), engine=engine)
+        return links
+    
+    @classmethod
+    def _search_sequential(cls, max_results, all_links, add_unique_links, search_engine):
+        """依次请求各引擎，数量足够即停止"""
         # 1. 如果配置了 Google Cookie，优先使用 Google
         if GOOGLE_COOKIE:
             print(f"🔍 [1/3] 使用 Google 搜索（目标: {max_results} 篇）...")
-            google_links = cls.search_google(keyword, max_results)
+            google_links = search_engine("google", max_results)
             added = add_unique_links(google_links)
             print(f"   ✅ Google 找到 {added} 篇，当前总数: {len(all_links)}/{max_results}")
         
@@ -245,7 +333,7 @@ class NewsSearcher:
         if len(all_links) < max_results:
             remaining = max_results - len(all_links)
             print(f"🔍 [2/3] 使用百度补充（还需: {remaining} 篇）...")
-            baidu_links = cls.search_baidu(keyword, remaining * 2)  # 多搜一些，因为可能有重复
+            baidu_links = search_engine("baidu", remaining * 2)  # 多搜一些，因为可能有重复
             added = add_unique_links(baidu_links)
             print(f"   ✅ 百度补充 {added} 篇，当前总数: {len(all_links)}/{max_results}")
         
@@ -253,14 +341,50 @@ class NewsSearcher:
         if len(all_links) < max_results:
             remaining = max_results - len(all_links)
             print(f"🔍 [3/3] 使用 Bing 补充（还需: {remaining} 篇）...")
-            bing_links = cls.search_bing(keyword, remaining * 2)
+            bing_links = search_engine("bing", remaining * 2)
             added = add_unique_links(bing_links)
             print(f"   ✅ Bing 补充 {added} 篇，当前总数: {len(all_links)}/{max_results}")
+    
+    @staticmethod
+    def engine_plan(max_results):
+        """并发请求时的引擎列表，按合并优先级排列：[(显示名, 引擎, 请求数量), ...]"""
+        engines = []
+        if GOOGLE_COOKIE:
+            engines.append(("Google", "google", max_results))
+        engines.append(("百度", "baidu", max_results * 2))  # 多搜一些，因为可能有重复
+        engines.append(("Bing", "bing", max_results * 2))
+        return engines
+    
+    @classmethod
+    def _search_concurrent(cls, max_results, deadline, all_links, add_unique_links, search_engine):
+        """
+        同时请求各引擎，再按 Google > 百度 > Bing 的优先级合并
         
-        # 最终结果
-        if all_links:
-            print(f"\n🎉 搜索完成！共找到 {len(all_links)} 篇文章")
-        else:
-            print("\n❌ 所有搜索引擎都未找到结果")
+        无法预知前序引擎的数量，因此百度和 Bing 都按 max_results * 2 请求；
+        耗时约等于最慢的引擎，且不超过 deadline。
+        """
+        engines = cls.engine_plan(max_results)
         
-        return all_links
+        print(f"🔍 [并发] 同时请求 {len(engines)} 个搜索引擎（截止: {deadline}s）...")
+        end_time = time.monotonic() + deadline
+        executor = ThreadPoolExecutor(max_workers=len(engines))
+        try:
+            futures = [
+                (name, executor.submit(Metrics.bind(search_engine), engine, count))
+                for name, engine, count in engines
+            ]
+            
+            # 按优先级依次取结果，前面的引擎没返回时后面的结果也要等它
+            for name, future in futures:
+                remaining_time = end_time - time.monotonic()
+                try:
+                    links = future.result(timeout=max(remaining_time, 0))
+                except FutureTimeoutError:
+                    print(f"   ⚠️ {name} 超过截止时间，结果已丢弃")
+                    continue
+                
+                added = add_unique_links(links)
+                print(f"   ✅ {name} 贡献 {added} 篇，当前总数: {len(all_links)}/{max_results}")
+        finally:
+            # 不等待超时的引擎线程，它们会在各自的请求超时后自行结束
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,219 @@
+"""
+本地文章库模块
+爬取成功的文章（URL、标题、正文、抓取时间、发布日期）保存在 SQLite 中，并用 FTS5 建立全文索引，
+换提示词或换关键词重新分析时可以直接从本地检索文章，不再请求搜索引擎和新闻站点
+"""
+import os
+import sqlite3
+import threading
+import time
+from core.cache import SqliteCache
+from core.metrics import Metrics
+from config import CACHE_DIR, ARTICLE_STORE_ENABLED, ARTICLE_STORE_MAX_MB
+
+# 全文索引分词器，按顺序尝试：trigram 按三字符切分，中文无需分词（SQLite 3.34+）；
+# unicode61 只能可靠地检索空格分隔的语言，中文检索词退回 LIKE 扫描
+TOKENIZERS = ("trigram", "unicode61")
+
+
+class ArticleStore(SqliteCache):
+    """
+    文章库
+
+    articles 表以 URL 为键保存文章，articles_fts 是与之同步的外部内容全文索引（由触发器维护）。
+    当前 SQLite 不支持 FTS5 时不建索引，检索退回 LIKE 扫描。
+    """
+
+    TABLE = "articles"
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS articles (
+        url TEXT PRIMARY KEY,
+        title TEXT NOT NULL,
+        text TEXT NOT NULL,
+        fetched_at REAL NOT NULL,
+        publish_date TEXT,
+        size INTEGER NOT NULL,
+        last_access REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_articles_access ON articles(last_access);
+    CREATE INDEX IF NOT EXISTS idx_articles_fetched ON articles(fetched_at);
+    """
+
+    INDEX_SCHEMA = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5(
+        title, text, content='articles', content_rowid='rowid', tokenize='{tokenizer}'
+    );
+    CREATE TRIGGER IF NOT EXISTS articles_ai AFTER INSERT ON articles BEGIN
+        INSERT INTO articles_fts(rowid, title, text) VALUES (new.rowid, new.title, new.text);
+    END;
+    CREATE TRIGGER IF NOT EXISTS articles_ad AFTER DELETE ON articles BEGIN
+        INSERT INTO articles_fts(articles_fts, rowid, title, text) VALUES ('delete', old.rowid, old.title, old.text);
+    END;
+    CREATE TRIGGER IF NOT EXISTS articles_au AFTER UPDATE OF title, text ON articles BEGIN
+        INSERT INTO articles_fts(articles_fts, rowid, title, text) VALUES ('delete', old.rowid, old.title, old.text);
+        INSERT INTO articles_fts(rowid, title, text) VALUES (new.rowid, new.title, new.text);
+    END;
+    """
+
+    _default = None
+    _default_lock = threading.Lock()
+
+    def __init__(self, path, max_bytes):
+        super().__init__(path, max_bytes)
+        self.tokenizer = None
+
+    @classmethod
+    def default(cls):
+        """获取进程内共享的实例"""
+        with cls._default_lock:
+            if cls._default is None:
+                cls._default = cls(os.path.join(CACHE_DIR, "articles.db"), ARTICLE_STORE_MAX_MB * 1024 * 1024)
+            return cls._default
+
+    @classmethod
+    def save(cls, article):
+        """保存新抓取的文章（ARTICLE_STORE_ENABLED 关闭时忽略）"""
+        if ARTICLE_STORE_ENABLED and article:
+            cls.default().put(article)
+
+    def _connection(self):
+        """获取数据库连接（首次调用时建表和全文索引）"""
+        if self._conn is None:
+            conn = super()._connection()
+            self.tokenizer = self._create_index(conn)
+        return self._conn
+
+    def _create_index(self, conn):
+        """
+        建立全文索引
+
+        Returns:
+            使用的分词器名称，不支持 FTS5 时返回 None
+        """
+        rows = conn.execute("SELECT sql FROM sqlite_master WHERE name = 'articles_fts'").fetchall()
+        if rows:
+            # 已有索引沿用建库时的分词器
+            return next((name for name in TOKENIZERS if f"'{name}'" in rows[0][0]), TOKENIZERS[-1])
+
+        for tokenizer in TOKENIZERS:
+            try:
+                conn.executescript(self.INDEX_SCHEMA.format(tokenizer=tokenizer))
+            except sqlite3.OperationalError:
+                continue
+            # 为建索引之前已保存的文章补建索引
+            conn.execute("INSERT INTO articles_fts(articles_fts) VALUES ('rebuild')")
+            return tokenizer
+        print("⚠️ [Store] 当前 SQLite 不支持 FTS5，文章检索退回逐条扫描")
+        return None
+
+    def put(self, article, publish_date=None):
+        """
+        保存文章（同一 URL 覆盖旧内容，已知的发布日期不会被空值覆盖）
+
+        Args:
+            article: 包含 url、title、text 的文章字典（可带 publish_date）
+            publish_date: 发布日期（ISO 格式字符串），优先于 article 中的值
+        """
+        title, text = article.get("title") or "", article.get("text") or ""
+        publish_date = publish_date or article.get("publish_date")
+        size = len(article["url"]) + len(title.encode("utf-8")) + len(text.encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            self._execute(
+                "INSERT INTO articles (url, title, text, fetched_at, publish_date, size, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(url) DO UPDATE SET "
+                "title = excluded.title, text = excluded.text, fetched_at = excluded.fetched_at, "
+                "publish_date = COALESCE(excluded.publish_date, articles.publish_date), "
+                "size = excluded.size, last_access = excluded.last_access",
+                (article["url"], title, text, now, publish_date, size, now)
+            )
+            self._evict()
+
+    def _term_clause(self, term):
+        """
+        单个检索词的查询条件
+
+        Returns:
+            (是否使用全文索引, SQL 片段, 参数)
+        """
+        usable = (
+            (self.tokenizer == "trigram" and len(term) >= 3)
+            or (self.tokenizer == "unicode61" and term.isascii())
+        )
+        if usable:
+            return True, "articles_fts MATCH ?", ('"' + term.replace('"', '""') + '"',)
+        pattern = "%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        return False, "(a.title LIKE ? ESCAPE '\\' OR a.text LIKE ? ESCAPE '\\')", (pattern, pattern)
+
+    def search(self, query, limit=20, max_age=None):
+        """
+        全文检索文章
+
+        检索词按空白切分，文章需同时包含所有检索词（标题或正文）。
+        能走全文索引的检索词按 bm25 相关度排序，否则按抓取时间从新到旧排序。
+
+        Args:
+            query: 检索词
+            limit: 最多返回的文章数
+            max_age: 只返回最近 max_age 秒内发布的文章，None 表示不限（没有可解析的发布日期时按抓取时间判断）
+
+        Returns:
+            [{"url", "title", "text", "fetched_at", "publish_date"}, ...]
+        """
+        terms = query.split()
+        if not terms:
+            return []
+
+        with Metrics.span("store_query"), self._lock:
+            self._connection()
+            match_terms, like_clauses, params = [], [], []
+            for term in terms:
+                indexed, clause, term_params = self._term_clause(term)
+                if indexed:
+                    match_terms.extend(term_params)
+                else:
+                    like_clauses.append(clause)
+                    params.extend(term_params)
+            if max_age is not None:
+                # 发布日期为 ISO 格式，换算成 Unix 时间戳；缺失或无法解析时 julianday 返回 NULL，退回抓取时间
+                like_clauses.append("COALESCE((julianday(a.publish_date) - 2440587.5) * 86400.0, a.fetched_at) >= ?")
+                params.append(time.time() - max_age)
+
+            if match_terms:
+                # 多个检索词合并为一次 MATCH（FTS5 中空格分隔的短语为 AND 关系）
+                sql = (
+                    "SELECT a.url, a.title, a.text, a.fetched_at, a.publish_date "
+                    "FROM articles_fts JOIN articles a ON a.rowid = articles_fts.rowid "
+                    "WHERE articles_fts MATCH ?"
+                )
+                params = [" ".join(match_terms)] + params
+                order = "bm25(articles_fts)"
+            else:
+                sql = "SELECT a.url, a.title, a.text, a.fetched_at, a.publish_date FROM articles a WHERE 1 = 1"
+                order = "a.fetched_at DESC"
+            for clause in like_clauses:
+                sql += f" AND {clause}"
+            sql += f" ORDER BY {order} LIMIT ?"
+            rows = self._execute(sql, params + [limit])
+
+            if rows:
+                now = time.time()
+                self._connection().executemany(
+                    "UPDATE articles SET last_access = ? WHERE url = ?", [(now, row[0]) for row in rows]
+                )
+
+        return [
+            {"url": url, "title": title, "text": text, "fetched_at": fetched_at, "publish_date": publish_date}
+            for url, title, text, fetched_at, publish_date in rows
+        ]
+
+    def get(self, url):
+        """按 URL 查询文章，未找到返回 None"""
+        rows = self._execute(
+            "SELECT url, title, text, fetched_at, publish_date FROM articles WHERE url = ?", (url,)
+        )
+        if not rows:
+            return None
+        url, title, text, fetched_at, publish_date = rows[0]
+        return {"url": url, "title": title, "text": text, "fetched_at": fetched_at, "publish_date": publish_date}
@@ -6,7 +6,7 @@ import subprocess
 import webbrowser
 from PyQt6.QtWidgets import (
     QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-    QLineEdit, QPushButton, QTextEdit, QLabel, QSpinBox, QComboBox
+    QLineEdit, QPushButton, QTextEdit, QLabel, QSpinBox, QComboBox, QCheckBox
 )
 from PyQt6.QtCore import Qt
 from .worker import AnalysisWorker
@@ -15,6 +15,12 @@ from .worker import AnalysisWorker
 class NewsAnalyzerWindow(QMainWindow):
     """新闻分析器主窗口"""
     
+    # 与 timelimit_combo 的选项一一对应：Any Time / Past Week / Past Month
+    TIMELIMITS = ['a', 'w', 'm']
+    
+    # 与 source_combo 的选项一一对应：Web / Local Store / Local + Web
+    SOURCES = ['web', 'store', 'both']
+    
     def __init__(self):
         super().__init__()
         self.init_ui()
@@ -67,8 +73,20 @@ class NewsAnalyzerWindow(QMainWindow):
         options_layout.addSpacing(20)
         options_layout.addWidget(time_label)
         options_layout.addWidget(self.timelimit_combo)
+        
+        source_label = QLabel("Source:")
+        self.source_combo = QComboBox()
+        self.source_combo.addItems(["Web", "Local Store", "Local + Web"])
+        self.source_combo.setToolTip("Local Store re-analyzes previously crawled articles without going online")
+        options_layout.addSpacing(20)
+        options_layout.addWidget(source_label)
+        options_layout.addWidget(self.source_combo)
         main_layout.addLayout(options_layout)
         
+        self.live_check = QCheckBox("Live preview: stream model output and open the report early")
+        self.live_check.setChecked(True)
+        main_layout.addWidget(self.live_check)
+        
         # Button
         self.generate_btn = QPushButton("🚀 Start Analysis")
         self.generate_btn.setCursor(Qt.CursorShape.PointingHandCursor)
@@ -110,14 +128,18 @@ class NewsAnalyzerWindow(QMainWindow):
         self.log_text.append("=" * 50)
         self.log_text.append(f"🎯 Target: {keyword}")
         self.log_text.append("=" * 50)
+        self.preview_opened = False
         
         # 启动工作线程
         self.worker = AnalysisWorker(
             keyword, 
             self.num_spin.value(), 
-            'a'
+            self.TIMELIMITS[self.timelimit_combo.currentIndex()],
+            self.SOURCES[self.source_combo.currentIndex()],
+            self.live_check.isChecked()
         )
         self.worker.log_signal.connect(self.update_log)
+        self.worker.preview_signal.connect(self.on_preview)
         self.worker.success_signal.connect(self.on_success)
         self.worker.fail_signal.connect(self.on_fail)
         self.worker.start()
@@ -128,19 +150,33 @@ class NewsAnalyzerWindow(QMainWindow):
         scrollbar = self.log_text.verticalScrollBar()
         scrollbar.setValue(scrollbar.maximum())
     
-    def on_success(self, report_path):
-        """Analysis successful"""
-        self.log_text.append("-" * 30)
-        self.log_text.append(f"🎉 Task completed! Report generated:\n{report_path}")
-        self.log_text.append("Opening browser...")
-        
+    def open_in_browser(self, path):
+        """在浏览器中打开报告"""
         try:
             if sys.platform == 'darwin':
-                subprocess.run(['open', report_path], check=True)
+                subprocess.run(['open', path], check=True)
             else:
-                webbrowser.open(f"file://{report_path}")
+                webbrowser.open(f"file://{path}")
+            return True
         except Exception as e:
             self.log_text.append(f" [!] Cannot open browser: {e}")
+            return False
+    
+    def on_preview(self, report_path):
+        """Live preview written for the first time"""
+        self.log_text.append("Opening live preview in the browser...")
+        self.preview_opened = self.open_in_browser(report_path)
+    
+    def on_success(self, report_path):
+        """Analysis successful"""
+        self.log_text.append("-" * 30)
+        self.log_text.append(f"🎉 Task completed! Report generated:\n{report_path}")
+        if self.preview_opened:
+            # 预览页面自动刷新，最终报告写在同一位置，不再另开窗口
+            self.log_text.append("The open preview tab now shows the final report.")
+        else:
+            self.log_text.append("Opening browser...")
+            self.open_in_browser(report_path)
         
         self.reset_ui()
     
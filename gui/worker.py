@@ -2,7 +2,7 @@
 后台工作线程
 """
 from PyQt6.QtCore import QThread, pyqtSignal
-from core import NewsSearcher, NewsCrawler, NewsAnalyzer, ReportGenerator
+from core.pipeline import StreamingPipeline, PipelineError
 
 
 class AnalysisWorker(QThread):
@@ -11,66 +11,38 @@ class AnalysisWorker(QThread):
     log_signal = pyqtSignal(str)
     success_signal = pyqtSignal(str)
     fail_signal = pyqtSignal(str)
+    preview_signal = pyqtSignal(str)  # 渐进式报告预览首次写出（参数为路径）
     
-    def __init__(self, keyword, max_links, timelimit):
+    def __init__(self, keyword, max_links, timelimit, source=StreamingPipeline.WEB, progressive=True):
         super().__init__()
         self.keyword = keyword
         self.max_links = max_links
         self.timelimit = timelimit
+        self.source = source
+        self.progressive = progressive
     
     def run(self):
         """Execute analysis workflow"""
         try:
-            # 1. Search news
-            self.log_signal.emit(f"🔍 Searching for '{self.keyword}'...")
-            links = NewsSearcher.search(self.keyword, self.max_links, self.timelimit)
-            
-            if not links:
-                self.fail_signal.emit("No news links found")
-                return
-            
-            self.log_signal.emit(f"✅ Found {len(links)} links")
-            
-            # 2. Crawl articles
-            self.log_signal.emit("📄 Crawling articles...")
-            self.log_signal.emit(f"   Links to crawl: {len(links)}")
-            for i, link in enumerate(links, 1):
-                self.log_signal.emit(f"   [{i}] {link}")
-            
-            # 尝试使用动态爬虫（如果静态爬虫失败）
-            articles = NewsCrawler.crawl_articles(links, use_dynamic=True)
-            
-            if not articles:
-                self.fail_signal.emit(f"Failed to crawl articles. All {len(links)} links failed. Check if they are blocked domains or have anti-crawling protection.")
-                return
-            
-            self.log_signal.emit(f"✅ Crawled {len(articles)} articles")
-            
-            # 3. Deduplication
-            self.log_signal.emit("🔄 Deduplicating...")
-            unique_articles = NewsCrawler.deduplicate(articles)
-            
-            if not unique_articles:
-                self.fail_signal.emit("No articles after deduplication")
-                return
-            
-            self.log_signal.emit(f"✅ Deduplication complete, {len(unique_articles)} articles remaining")
-            
-            # 4. AI Analysis
-            self.log_signal.emit("✨ Running AI analysis...")
-            data = NewsAnalyzer.analyze(unique_articles, self.keyword)
-            
-            if isinstance(data, str):
-                self.fail_signal.emit(f"AI analysis failed: {data}")
-                return
-            
-            self.log_signal.emit("✅ AI analysis complete")
-            
-            # 5. Generate report
-            self.log_signal.emit("📝 Generating HTML report...")
-            report_path = ReportGenerator.generate(self.keyword, data)
+            # 1-4. Search, crawl, deduplicate and summarize as a streaming pipeline
+            pipeline = StreamingPipeline(
+                self.keyword,
+                self.max_links,
+                self.timelimit,
+                use_dynamic=True,  # 尝试使用动态爬虫（如果静态爬虫失败）
+                log=self.log_signal.emit,
+                source=self.source,
+                progressive=self.progressive,  # 模型输出实时写入日志，报告预览随摘要完成更新
+                on_preview=self.preview_signal.emit
+            )
+            data = pipeline.run()
+            
+            # 5. Generate report (also writes run metrics and logs the stage timing)
+            report_path = pipeline.generate_report(data)
             
             self.success_signal.emit(report_path)
             
+        except PipelineError as e:
+            self.fail_signal.emit(str(e))
         except Exception as e:
             self.fail_signal.emit(f"Exception: {str(e)}")
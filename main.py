@@ -4,13 +4,13 @@ AI 新闻事件摘要生成器
 """
 import sys
 from PyQt6.QtWidgets import QApplication, QTextEdit
-from config import client
+from config import API_KEY
 from gui import NewsAnalyzerWindow
 
 
 def check_api_key():
     """Check API Key configuration"""
-    if not client.api_key:
+    if not API_KEY:
         app = QApplication.instance() or QApplication(sys.argv)
         error_box = QTextEdit()
         error_box.setReadOnly(True)
@@ -2,16 +2,38 @@
 HTML Report Template
 """
 from datetime import datetime
+from html import escape
 
 
 def generate_html_content(keyword, data):
-    """Generate HTML content"""
+    """
+    Generate HTML content
     
-    summary = data.get('main_summary', 'No summary data available')
+    Besides the Reduce fields, data may carry:
+        article_summaries: [{"url", "title", "summary"}, ...] shown as per-article cards
+        status: progress message; marks the page as a live preview (analysis cards are hidden
+                until the consolidated result arrives)
+        refresh: seconds between automatic reloads of a live preview; a status without refresh
+                 marks a preview whose run ended without a result
+    """
+    
+    status = data.get('status')
+    refresh = data.get('refresh')
+    if not status:
+        placeholder = 'No summary data available'
+    elif refresh:
+        placeholder = ('The consolidated analysis will appear here once all articles are summarized. '
+                       'This page refreshes automatically.')
+    else:
+        placeholder = 'The analysis did not complete. The article summaries below are all that was produced.'
+    summary = data.get('main_summary', placeholder)
     themes = data.get('key_sub_themes', [])
     entities = data.get('key_entities', [])
     timeline = data.get('timeline', [])
     sources = data.get('sources', [])
+    new_sources = set(data.get('new_sources', []))
+    timings = data.get('timings', [])
+    article_summaries = data.get('article_summaries', [])
     
     # Format time in English
     now = datetime.now()
@@ -45,16 +67,95 @@ def generate_html_content(keyword, data):
         <a href="{url}" target="_blank" class="source-link">
             <span class="source-icon">🌐</span>
             <span class="source-text">{url}</span>
+            {'<span class="source-new">NEW</span>' if url in new_sources else ''}
         </a>
         ''' for url in sources
     ])
     
+    # Generate per-article summaries (titles and summaries come from crawled pages and the model)
+    articles_card = ''
+    if article_summaries:
+        article_rows = ''.join([
+            f'''
+            <div class="article-item">
+                <a href="{escape(item['url'], quote=True)}" target="_blank" class="article-title">{escape(item.get('title') or item['url'])}</a>
+                <div class="article-summary">{escape(item.get('summary') or '')}</div>
+            </div>
+            ''' for item in article_summaries
+        ])
+        articles_card = f'''
+        <div class="card">
+            <div class="card-header">
+                <div class="icon">📰</div>
+                <div class="card-title">Article Summaries</div>
+            </div>
+            <div>{article_rows}</div>
+        </div>
+        '''
+    
+    # Cards filled by the Reduce stage (a live preview shows them once the result arrives)
+    analysis_cards = ''
+    if not status:
+        analysis_cards = f'''
+        <div class="grid">
+            <div class="card">
+                <div class="card-header">
+                    <div class="icon">🎯</div>
+                    <div class="card-title">Key Themes</div>
+                </div>
+                <div>{themes_html}</div>
+            </div>
+            
+            <div class="card">
+                <div class="card-header">
+                    <div class="icon">🏢</div>
+                    <div class="card-title">Related Entities</div>
+                </div>
+                <div>{entities_html}</div>
+            </div>
+        </div>
+        
+        <div class="card">
+            <div class="card-header">
+                <div class="icon">📅</div>
+                <div class="card-title">Event Timeline</div>
+            </div>
+            <div class="timeline">{timeline_html}</div>
+        </div>
+        '''
+    
+    # Generate stage timing breakdown (stages overlap in the streaming pipeline)
+    timings_card = ''
+    if timings:
+        longest = max(max(item['start'] + item['seconds'] for item in timings), 0.001)
+        timing_rows = ''.join([
+            f'''
+            <div class="timing-row">
+                <span class="timing-stage">{item['stage']}</span>
+                <div class="timing-track">
+                    <div class="timing-bar" style="margin-left: {item['start'] / longest * 100:.1f}%; width: {max(item['seconds'] / longest * 100, 0.5):.1f}%;"></div>
+                </div>
+                <span class="timing-value">{item['seconds']:.2f}s</span>
+            </div>
+            ''' for item in timings
+        ])
+        timings_card = f'''
+        <div class="card">
+            <div class="card-header">
+                <div class="icon">⏱️</div>
+                <div class="card-title">Run Timing</div>
+            </div>
+            <div>{timing_rows}</div>
+        </div>
+        '''
+    
     return f"""
 <!DOCTYPE html>
 <html lang="en">
 <head>
     <meta charset="UTF-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    {f'<meta http-equiv="refresh" content="{refresh:g}">' if refresh else ''}
     <link href="https://fonts.googleapis.com/css2?family=Inter:wght@300;400;500;700&display=swap" rel="stylesheet">
     <style>
         * {{ margin: 0; padding: 0; box-sizing: border-box; }}
@@ -210,7 +311,19 @@ def generate_html_content(keyword, data):
         }}
         .source-link:hover {{ background: var(--primary); color: white; transform: translateX(5px); border-color: var(--primary); }}
         .source-icon {{ font-size: 1.2rem; }}
+        .source-new {{ font-size: 0.75rem; font-weight: 700; padding: 2px 8px; border-radius: 10px; background: var(--accent); color: white; }}
         .source-text {{ flex: 1; overflow: hidden; text-overflow: ellipsis; white-space: nowrap; font-size: 0.9rem; }}
+        .article-item {{ padding: 15px 0; border-bottom: 1px solid var(--border); }}
+        .article-item:last-child {{ border-bottom: none; }}
+        .article-title {{ color: var(--text-primary); font-weight: 600; text-decoration: none; }}
+        .article-title:hover {{ color: var(--primary); }}
+        .article-summary {{ margin-top: 8px; color: var(--text-secondary); font-size: 0.95rem; white-space: pre-line; }}
+        .status {{ display: inline-block; margin-top: 15px; padding: 6px 16px; border-radius: 20px; background: rgba(0,0,0,0.25); font-size: 0.85rem; }}
+        .timing-row {{ display: flex; align-items: center; gap: 15px; padding: 8px 0; }}
+        .timing-stage {{ width: 80px; color: var(--text-secondary); font-size: 0.9rem; text-transform: capitalize; }}
+        .timing-track {{ flex: 1; height: 10px; background: var(--bg-hover); border-radius: 5px; overflow: hidden; }}
+        .timing-bar {{ height: 100%; background: linear-gradient(90deg, var(--primary), var(--secondary)); border-radius: 5px; }}
+        .timing-value {{ width: 70px; text-align: right; color: var(--text-muted); font-size: 0.85rem; }}
         footer {{ text-align: center; padding: 40px 20px; color: var(--text-muted); font-size: 0.85rem; }}
         @media (max-width: 768px) {{
             .main-title {{ font-size: 2.5rem; }}
@@ -223,7 +336,8 @@ def generate_html_content(keyword, data):
         <div class="header-content">
             <h1 class="main-title">{keyword}</h1>
 
-            <div class="meta-info">Generated: {current_time} | Sources: {len(sources)} articles</div>
+            <div class="meta-info">Generated: {current_time} | Sources: {len(sources)} articles{f' ({len(new_sources)} new)' if 'new_sources' in data else ''}</div>
+            {f'<div class="status">{"⏳" if refresh else "❌"} {escape(status)}</div>' if status else ''}
         </div>
     </div>
     
@@ -236,31 +350,9 @@ def generate_html_content(keyword, data):
             <p class="summary">{summary}</p>
         </div>
         
-        <div class="grid">
-            <div class="card">
-                <div class="card-header">
-                    <div class="icon">🎯</div>
-                    <div class="card-title">Key Themes</div>
-                </div>
-                <div>{themes_html}</div>
-            </div>
-            
-            <div class="card">
-                <div class="card-header">
-                    <div class="icon">🏢</div>
-                    <div class="card-title">Related Entities</div>
-                </div>
-                <div>{entities_html}</div>
-            </div>
-        </div>
+        {analysis_cards}
         
-        <div class="card">
-            <div class="card-header">
-                <div class="icon">📅</div>
-                <div class="card-title">Event Timeline</div>
-            </div>
-            <div class="timeline">{timeline_html}</div>
-        </div>
+        {articles_card}
         
         <div class="card">
             <div class="card-header">
@@ -269,6 +361,8 @@ def generate_html_content(keyword, data):
             </div>
             <div>{sources_html}</div>
         </div>
+        
+        {timings_card}
     </div>
     
     <footer>